@@ -0,0 +1,154 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmarks des calculs du tableau de bord NPS, sans serveur Streamlit.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --threshold 0.2
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import pandas as pd  # noqa: E402
+from utils.metrics import (  # noqa: E402
+    build_trend_chart_data,
+    calculate_nps_metrics,
+    compute_trend_buckets,
+    prepare_data_for_period
+)
+from utils.comparison import compare_service_metrics, midpoint_split  # noqa: E402
+from utils.config import DEFAULT_CONFIG  # noqa: E402
+from utils.rollup import build_daily_rollup, day_slice  # noqa: E402
+from utils.segments import build_segment_index  # noqa: E402
+from utils.synthetic import generate_responses  # noqa: E402
+from utils.windows import period_window  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+
+
+def measure(fn: Callable, repeat: int) -> Dict:
+    """
+    Meilleur temps sur `repeat` exécutions, puis pic mémoire sur une exécution
+    supplémentaire (tracemalloc ralentit le code mesuré, d'où deux passes)
+    """
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'wall_time_s': min(timings), 'peak_memory_mb': peak / 2**20}
+
+
+def run_benchmarks(sizes: List[int], repeat: int = 3, seed: int = 42) -> Dict:
+    """
+    Mesure chaque étape de calcul pour chaque taille de jeu et chaque période
+    """
+    results = {}
+    for size in sizes:
+        df = generate_responses(n_responses=size, days=3 * 365, seed=seed)
+
+        def build():
+            rollup = build_daily_rollup(df)
+            rollup.prefix_sums
+            return rollup
+
+        results[f"{size}/load/build_daily_rollup"] = measure(build, 1)
+        rollup = build()
+
+        # Filtres de répondants : bitmaps combinés puis agrégat de la sélection
+        results[f"{size}/load/build_segment_index"] = measure(lambda: build_segment_index(df), 1)
+        index = build_segment_index(df)
+        filters = {'Abonnement': ['Annuel', 'Famille'], 'Tranche_Age': ['18-25 ans']}
+        results[f"{size}/segments/select_rollup"] = measure(lambda: index.rollup(index.select(filters)), repeat)
+
+        for label, period in DEFAULT_CONFIG['PERIODS'].items():
+            start_date, end_date = period_window(period)
+            period_counts = day_slice(rollup.counts, start_date, end_date)
+            agg_data = prepare_data_for_period(period_counts, period)
+
+            steps = {
+                'calculate_nps_metrics': lambda: calculate_nps_metrics(rollup, period),
+                'prepare_data_for_period': lambda: prepare_data_for_period(period_counts, period),
+                'build_trend_chart_data': lambda: build_trend_chart_data(agg_data),
+                'trend_buckets_bootstrap': lambda: compute_trend_buckets(rollup, period, method='bootstrap'),
+                'metrics_grid': lambda: compare_service_metrics(rollup, midpoint_split(period))
+            }
+            for step, fn in steps.items():
+                results[f"{size}/{period}/{step}"] = measure(fn, repeat)
+
+        del df, rollup, index
+
+    return {
+        'meta': {
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare_to_baseline(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Liste des mesures dont le temps dépasse la référence de plus de `threshold` (ratio)
+    """
+    regressions = []
+    for key, reference in baseline.get('results', {}).items():
+        measured = current['results'].get(key)
+        if measured is None or reference['wall_time_s'] <= 0:
+            continue
+        ratio = measured['wall_time_s'] / reference['wall_time_s']
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{key}: {reference['wall_time_s'] * 1000:.2f} ms -> "
+                f"{measured['wall_time_s'] * 1000:.2f} ms (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks des calculs NPS")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Nombres de réponses")
+    parser.add_argument('--repeat', type=int, default=3, help="Exécutions par mesure")
+    parser.add_argument('--output', default='bench_results.json', help="Fichier JSON des résultats")
+    parser.add_argument('--baseline', help="Résultats de référence à comparer")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Régression tolérée (0.2 = +20 %%)")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.sizes, repeat=args.repeat)
+    Path(args.output).write_text(json.dumps(current, indent=2))
+
+    for key, values in current['results'].items():
+        print(f"{key:<55} {values['wall_time_s'] * 1000:>10.2f} ms {values['peak_memory_mb']:>10.2f} Mo")
+
+    if args.baseline:
+        regressions = compare_to_baseline(current, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressions:
+            print("\nRégressions détectées :")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nAucune régression par rapport à la référence.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
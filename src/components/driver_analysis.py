@@ -0,0 +1,74 @@
+# driver_analysis
+import streamlit as st
+import pandas as pd
+import altair as alt
+from utils.config import get_config
+from utils.drivers import DriverAnalysis
+from utils.network import NETWORK_LABEL
+
+def display_driver_importance(analysis: DriverAnalysis, club: str, period: str):
+    """
+    Affiche l'importance relative de chaque levier et le détail des coefficients
+    """
+    fit = analysis.fit[(analysis.fit['Club'] == club) & (analysis.fit['Period'] == period)].iloc[0]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Réponses analysées", f"{int(fit['n'])}")
+    with col2:
+        st.metric(
+            "Part du NPS expliquée (R²)",
+            "—" if pd.isna(fit['r2']) else f"{fit['r2']:.0%}",
+            help="Régression ridge sur les notes standardisées (notes manquantes remplacées par la moyenne)"
+        )
+
+    view = analysis.view(club, period).dropna(subset=['importance'])
+    if len(view) == 0:
+        st.info("Pas assez de réponses pour analyser les leviers sur cette période.")
+        return
+
+    chart = alt.Chart(view).mark_bar(color='#2ab7ca').encode(
+        x=alt.X('importance:Q', title='Importance relative', axis=alt.Axis(format='%')),
+        y=alt.Y('display_name:N', sort=alt.SortField('rank', order='ascending'), title=None),
+        tooltip=[
+            alt.Tooltip('display_name:N', title='Service'),
+            alt.Tooltip('importance:Q', title='Importance', format='.1%'),
+            alt.Tooltip('correlation:Q', title='Corrélation avec le NPS', format='.2f'),
+            alt.Tooltip('coefficient:Q', title='Coefficient standardisé', format='.3f'),
+            alt.Tooltip('n:Q', title='Réponses')
+        ]
+    ).properties(height=30 * len(view))
+    st.altair_chart(chart, use_container_width=True)
+
+    st.dataframe(
+        view.set_index('rank')[['display_name', 'importance', 'correlation', 'coefficient', 'n']].rename(columns={
+            'display_name': 'Service',
+            'importance': 'Importance',
+            'correlation': 'Corrélation',
+            'coefficient': 'Coefficient',
+            'n': 'Réponses'
+        }).round(3),
+        use_container_width=True
+    )
+
+def render_driver_analysis(analysis: DriverAnalysis):
+    """
+    Onglet Analyses : leviers du NPS par club et par période
+    """
+    st.header("Analyses détaillées")
+    st.markdown("### Leviers du NPS")
+    st.caption("Contribution de chaque note de service au NPS (corrélations et régression ridge)")
+
+    periods = get_config('PERIODS', {})
+    clubs = list(dict.fromkeys(analysis.fit['Club']))
+    col1, col2 = st.columns(2)
+    with col1:
+        period_label = st.selectbox("Période d'analyse", list(periods), index=0, key='drivers_period')
+    with col2:
+        club = st.selectbox(
+            "Club",
+            clubs,
+            index=clubs.index(NETWORK_LABEL) if NETWORK_LABEL in clubs else 0,
+            key='drivers_club'
+        )
+
+    display_driver_importance(analysis, club, periods[period_label])
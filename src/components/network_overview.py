@@ -0,0 +1,71 @@
+# network_overview
+import streamlit as st
+import pandas as pd
+from typing import Callable, Optional
+from utils.config import get_config
+from utils.network import NETWORK_LABEL, NetworkJob, rank_clubs
+from utils.schema import SERVICE_METRICS
+
+def display_network_ranking(table: pd.DataFrame):
+    """
+    Affiche la ligne réseau et le classement des clubs
+    """
+    network = table.loc[NETWORK_LABEL]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("NPS réseau", f"{network['NPS']:.1f}")
+    with col2:
+        st.metric("Réponses", f"{int(network['total'])}")
+    
+    # Critère de classement : NPS ou une métrique de service
+    criteria = {'NPS': 'NPS'}
+    criteria.update({m.display_name: m.metric_id for m in SERVICE_METRICS if m.metric_id in table.columns})
+    criterion = st.selectbox("Classer par", list(criteria), index=0, key='network_criterion')
+    
+    ranking = rank_clubs(table, criteria[criterion])
+    columns = ['Rang', 'total', 'NPS'] + [m.metric_id for m in SERVICE_METRICS if m.metric_id in table.columns]
+    st.dataframe(
+        ranking[columns].rename(columns={
+            'total': 'Réponses',
+            **{m.metric_id: m.display_name for m in SERVICE_METRICS}
+        }).round(2),
+        use_container_width=True
+    )
+
+def display_pending_job(job: NetworkJob):
+    """
+    Suit l'avancement du calcul sans bloquer le reste de la page
+    """
+    @st.fragment(run_every=1)
+    def poll():
+        if job.done():
+            st.rerun()
+        st.progress(job.progress, text=f"Calcul par club en cours ({len(job.futures)} clubs)…")
+    
+    poll()
+
+def render_network_overview(submit_job: Callable[[str], NetworkJob],
+                            discard_job: Optional[Callable[[str], None]] = None):
+    """
+    Vue réseau : métriques de chaque club calculées en parallèle puis classées.
+    Un calcul en échec n'est pas conservé : `discard_job` l'oublie pour le relancer.
+    """
+    st.markdown("### 🌐 Vue réseau")
+    
+    periods = get_config('PERIODS', {})
+    period_label = st.selectbox("Période d'analyse", list(periods), index=0, key='network_period')
+    
+    job = submit_job(periods[period_label])
+    if not job.futures:
+        st.info("Aucun club dans les données.")
+        return
+    if not job.done():
+        display_pending_job(job)
+        return
+    
+    try:
+        display_network_ranking(job.result())
+    except Exception as e:
+        st.error(f"Erreur lors du calcul par club : {str(e)}")
+        if discard_job is not None and job.failed():
+            st.button("Relancer le calcul", key='network_retry', on_click=lambda: discard_job(periods[period_label]))
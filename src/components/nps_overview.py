@@ -2,57 +2,39 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from typing import Dict, Tuple
-from utils.config import get_config
+from typing import Callable, Dict, List, Optional
+from utils.anomalies import NPS_SERIES, Alert
+from utils.config import get_config, update_config
+from utils.cache import LRUCache, cached_call
+from utils.comparison import COMPARISON_MODES
+from utils.metrics import (
+    CHART_CATEGORIES,
+    HeaderMetrics,
+    ServiceDelta,
+    TrendBuckets,
+    apply_threshold,
+    calculate_nps_metrics,
+    compute_rolling_nps,
+    compute_service_grid,
+    compute_trend_buckets,
+    group_by_category
+)
+from utils.instrumentation import NULL_TRACER, Tracer
+from utils.network import NETWORK_LABEL
+from utils.rollup import DailyRollup
+from utils.schema import METRICS_BY_ID
+from utils.snapshot import Snapshot
+from utils.windows import as_of_day, period_window
 
-def calculate_nps_metrics(df: pd.DataFrame, period: str = '28D') -> Dict:
-    """
-    Calcule les métriques NPS pour la période spécifiée
-    """
-    try:
-        # Filtrer sur la période
-        end_date = pd.Timestamp.now()
-        start_date = end_date - pd.Timedelta(days=int(period[:-1]))
-        period_df = df[df['Horodateur'].between(start_date, end_date)]
-        
-        # Calculer les pourcentages
-        total = len(period_df)
-        
-        # Retourner des valeurs par défaut si pas de données
-        if total == 0:
-            return {
-                'nps_score': 0,
-                'promoters_pct': 0,
-                'passive_pct': 0,
-                'detractors_pct': 0,
-                'total_responses': 0
-            }
-        
-        # Calculer les métriques
-        promoters = len(period_df[period_df['NPS_Category'] == 'Promoteur'])
-        passives = len(period_df[period_df['NPS_Category'] == 'Passif'])
-        detractors = len(period_df[period_df['NPS_Category'] == 'Détracteur'])
-        
-        return {
-            'nps_score': round((promoters/total * 100) - (detractors/total * 100), 1),
-            'promoters_pct': round(promoters/total * 100, 1),
-            'passive_pct': round(passives/total * 100, 1),
-            'detractors_pct': round(detractors/total * 100, 1),
-            'total_responses': total
-        }
-    
-    except Exception as e:
-        print(f"Error in calculate_nps_metrics: {str(e)}")
-        # Retourner des valeurs par défaut en cas d'erreur
-        return {
-            'nps_score': 0,
-            'promoters_pct': 0,
-            'passive_pct': 0,
-            'detractors_pct': 0,
-            'total_responses': 0
-        }
+# Regroupements proposés pour le graphique d'évolution
+TREND_FREQUENCIES = {
+    'Automatique': None,
+    'Jour': 'D',
+    'Semaine': 'W',
+    'Mois': 'M'
+}
 
-def display_nps_header(metrics: Dict):
+def display_nps_header(metrics: HeaderMetrics):
     """
     Affiche l'en-tête avec les métriques NPS principales
     """
@@ -61,162 +43,104 @@ def display_nps_header(metrics: Dict):
     with col1:
         st.metric(
             "Score NPS",
-            f"{metrics['nps_score']}",
+            f"{metrics.nps_score}",
             help="Net Promoter Score = % Promoteurs - % Détracteurs"
         )
+        if metrics.nps_low is not None:
+            level = get_config('CONFIDENCE_LEVEL', 0.95)
+            st.caption(f"IC {level:.0%} : {metrics.nps_low} à {metrics.nps_high}")
     
     with col2:
         st.metric(
             "Promoteurs",
-            f"{metrics['promoters_pct']}%",
-            help=f"{int(metrics['total_responses'] * metrics['promoters_pct']/100)} répondants"
+            f"{metrics.promoters_pct}%",
+            help=f"{metrics.promoters} répondants"
         )
     
     with col3:
         st.metric(
             "Passifs",
-            f"{metrics['passive_pct']}%",
-            help=f"{int(metrics['total_responses'] * metrics['passive_pct']/100)} répondants"
+            f"{metrics.passive_pct}%",
+            help=f"{metrics.passives} répondants"
         )
     
     with col4:
         st.metric(
             "Détracteurs",
-            f"{metrics['detractors_pct']}%",
-            help=f"{int(metrics['total_responses'] * metrics['detractors_pct']/100)} répondants"
+            f"{metrics.detractors_pct}%",
+            help=f"{metrics.detractors} répondants"
         )
-def prepare_data_for_period(df: pd.DataFrame, period: str):
+
+def display_alerts(alerts: List[Alert], limit: int = 3):
     """
-    Prépare et agrège les données selon la période sélectionnée
+    Affiche les dernières baisses significatives détectées (NPS ou note de service)
     """
-    # Copie pour éviter les modifications sur le DataFrame original
-    df = df.copy()
-    
-    # Conversion des dates
-    df['Date'] = pd.to_datetime(df['Horodateur'])
-    
-    # Définition de la période d'agrégation
-    if period in ['28D', '56D']:  # 4 ou 8 semaines
-        # Grouper par semaine
-        df['Period_Start'] = df['Date'].dt.to_period('W').dt.start_time
-        format_str = '%d %b'
-    else:  # 4 ou 12 mois
-        # Grouper par mois
-        df['Period_Start'] = df['Date'].dt.to_period('M').dt.start_time
-        format_str = '%b %Y'
-    
-    # Créer l'agrégation
-    grouped = df.groupby('Period_Start').agg(
-        total=('NPS_Category', 'count'),
-        promoteurs=('NPS_Category', lambda x: sum(x == 'Promoteur')),
-        passifs=('NPS_Category', lambda x: sum(x == 'Passif')),
-        detracteurs=('NPS_Category', lambda x: sum(x == 'Détracteur'))
-    ).reset_index()
-    
-    # Calculer les métriques
-    grouped['Display_Date'] = grouped['Period_Start'].dt.strftime(format_str)
-    grouped['Sort_Key'] = grouped['Period_Start'].dt.strftime('%Y-%m-%d')
-    grouped['NPS_Score'] = (grouped['promoteurs']/grouped['total'] * 100) - (grouped['detracteurs']/grouped['total'] * 100)
-    grouped['Est_Representatif'] = grouped['total'] >= get_config('NPS_THRESHOLD', 35)
-    
-    # Trier chronologiquement
-    return grouped.sort_values('Period_Start')
+    if not alerts:
+        return
+    for alert in alerts[:limit]:
+        unit = " pts" if alert.metric_id == NPS_SERIES else "/5"
+        st.warning(
+            f"Baisse détectée le {pd.Timestamp(alert.day):%d/%m} — {alert.label} : "
+            f"{alert.value:.1f}{unit} (attendu {alert.expected:.1f}{unit}, {alert.responses} réponses)",
+            icon="📉"
+        )
+    if len(alerts) > limit:
+        st.caption(f"{len(alerts) - limit} autres alertes sur la période")
 
-def display_nps_trend(df: pd.DataFrame, period: str):
+def build_trend_spec(trend: TrendBuckets, threshold: int) -> Dict:
     """
-    Affiche le graphique d'évolution du NPS avec les données pré-agrégées
+    Spécification Vega-Lite du graphique d'évolution : les agrégats sont embarqués
+    une seule fois (jeu de données nommé partagé par les couches), les catégories
+    sont dépliées par transformation et le score NPS filtré depuis la même source
     """
-    # Filtrer et agréger les données
-    end_date = pd.Timestamp.now()
-    start_date = end_date - pd.Timedelta(period)
-    period_df = df[df['Horodateur'].between(start_date, end_date)]
-    
-    if len(period_df) == 0:
-        st.warning("Aucune donnée disponible pour la période sélectionnée.")
-        return
-        
-    # Préparer les données agrégées
-    agg_data = prepare_data_for_period(period_df, period)
-    
-    # Créer les données pour le graphique
-    chart_data = []
-    for _, row in agg_data.iterrows():
-        # Ajouter les trois catégories pour chaque période
-        for cat, count in [
-            ('Détracteur', row['detracteurs']),
-            ('Passif', row['passifs']),
-            ('Promoteur', row['promoteurs'])
-        ]:
-            chart_data.append({
-                'Period': row['Display_Date'],
-                'Sort_Key': row['Sort_Key'],
-                'Catégorie': cat,
-                'Count': count,
-                'Total': row['total'],
-                'Est_Représentatif': row['Est_Representatif'],
-                'NPS': round(row['NPS_Score'], 1)
-            })
-    
-    # Convertir en DataFrame pour Altair
-    chart_df = pd.DataFrame(chart_data)
+    chart_df = trend.chart_data
+    x = alt.X('Period:N', sort=alt.SortField('Sort_Key', order='ascending'), title=None)
+    opacity = alt.condition('datum.Est_Représentatif', alt.value(1), alt.value(0.5))
     
     # Barres empilées
-    bars = alt.Chart(chart_df).mark_bar().encode(
-        x=alt.X('Period:N',
-                sort=alt.SortField('Sort_Key', order='ascending'),
-                title=None),
+    bars = alt.Chart().transform_fold(
+        CHART_CATEGORIES,
+        as_=['Catégorie', 'Count']
+    ).mark_bar().encode(
+        x=x,
         y=alt.Y('Count:Q',
                 stack=True,
                 title='Nombre de réponses'),
         color=alt.Color('Catégorie:N',
                        scale=alt.Scale(
-                           domain=['Détracteur', 'Passif', 'Promoteur'],
+                           domain=CHART_CATEGORIES,
                            range=['#ff4b4b', '#ffd166', '#2ab7ca']
                        )),
-        opacity=alt.condition(
-            'datum.Est_Représentatif',
-            alt.value(1),
-            alt.value(0.5)
-        ),
+        opacity=opacity,
         tooltip=[
             alt.Tooltip('Period:N', title='Période'),
             alt.Tooltip('Total:Q', title='Total réponses'),
             alt.Tooltip('Count:Q', title='Nombre de réponses'),
-            alt.Tooltip('NPS:Q', title='Score NPS', format='.1f')
+            alt.Tooltip('NPS:Q', title='Score NPS', format='.1f'),
+            alt.Tooltip('NPS_Bas:Q', title='IC bas', format='.1f'),
+            alt.Tooltip('NPS_Haut:Q', title='IC haut', format='.1f')
         ]
     ).properties(height=300)
     
     # Score NPS sous les barres
-    text = alt.Chart(chart_df[chart_df['Catégorie'] == 'Promoteur']).mark_text(
+    text = alt.Chart().mark_text(
         align='center',
         baseline='top',
         dy=5,
         fontSize=11,
         color='white'
     ).encode(
-        x=alt.X('Period:N',
-                sort=alt.SortField('Sort_Key', order='ascending')),
+        x=x,
         text=alt.Text('NPS:Q', format='.1f'),
-        opacity=alt.condition(
-            'datum.Est_Représentatif',
-            alt.value(1),
-            alt.value(0.5)
-        )
+        opacity=opacity
     )
     
-    # Légende du seuil
-    threshold = get_config('NPS_THRESHOLD', 35)
-    legend = alt.Chart({'values': [{'text': f'* Les barres grisées indiquent moins de {threshold} réponses'}]}).mark_text(
-        dx=150,
-        dy=30,
-        color='gray',
-        fontSize=11
-    ).encode(text='text:N')
-    
-    # Graphique final
-    final_chart = (bars + text + legend).properties(
+    # Graphique final, la légende du seuil en sous-titre
+    final_chart = alt.layer(bars, text, data=chart_df).properties(
         title={
             'text': 'Évolution du NPS',
+            'subtitle': f"* Les barres grisées indiquent un intervalle de confiance de plus de {threshold} points",
+            'subtitleColor': 'gray',
             'anchor': 'start',
             'fontSize': 16
         }
@@ -225,140 +149,243 @@ def display_nps_trend(df: pd.DataFrame, period: str):
         gridOpacity=0.1
     )
     
-    st.altair_chart(final_chart, use_container_width=True)
+    return final_chart.to_dict()
 
-def display_metrics_grid(df: pd.DataFrame, period: str):
+def display_nps_trend(trend: TrendBuckets, threshold: int, cache: Optional[LRUCache] = None):
     """
-    Affiche la grille des métriques avec leurs évolutions
+    Affiche le graphique d'évolution du NPS avec les données pré-agrégées.
+    La spécification est mise en cache par empreinte des agrégats et seuil.
     """
-    st.markdown("### Satisfaction par service")
+    if trend.is_empty:
+        st.warning("Aucune donnée disponible pour la période sélectionnée.")
+        return
     
-    # Réorganisation des métriques par catégorie
-    service_categories = {
-        "Général": [
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant l'ambiance générale",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant la propreté générale"
-        ],
-        "Expériences": [
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant l'expérience à la salle de sport",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant l'expérience piscine",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant la disponibilité des équipements sportifs",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant les vestiaires (douches / sauna/ serviettes..)"
-        ],
-        "Personnel": [
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant les coachs",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant les maitres nageurs",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant le personnel d'accueil",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant Le commercial"
-        ],
-        "Services": [
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant La qualité des coaching en groupe",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant la disponibilité des cours sur le planning",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant la restauration",
-            "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant les événements"
+    spec = cached_call(
+        cache,
+        ('trend_spec', trend.fingerprint, threshold),
+        lambda: build_trend_spec(trend, threshold)
+    )
+    st.vega_lite_chart(spec, use_container_width=True)
+
+def select_club(clubs: List[str]) -> str:
+    """
+    Sélecteur du club affiché (le réseau, tous clubs confondus, par défaut)
+    """
+    return st.selectbox(
+        "Club",
+        clubs,
+        index=clubs.index(NETWORK_LABEL) if NETWORK_LABEL in clubs else 0,
+        format_func=lambda club: "Tous les clubs" if club == NETWORK_LABEL else club
+    )
+
+def select_trend_frequency() -> Optional[str]:
+    """
+    Sélecteur du regroupement du graphique d'évolution (None : selon la période)
+    """
+    label = st.selectbox("Regroupement", list(TREND_FREQUENCIES), index=0)
+    return TREND_FREQUENCIES[label]
+
+def compact_html(html: str) -> str:
+    """
+    Supprime l'indentation et les retours à la ligne d'un fragment HTML
+    """
+    return "".join(line.strip() for line in html.splitlines())
+
+def select_rolling_windows() -> List[int]:
+    """
+    Sélecteur des fenêtres du NPS glissant
+    """
+    return st.multiselect(
+        "Fenêtres du NPS glissant (jours)",
+        get_config('ROLLING_WINDOWS', [7, 28, 90]),
+        default=[28]
+    )
+
+def display_rolling_nps(rolling_df: pd.DataFrame):
+    """
+    Affiche le NPS glissant jour par jour pour plusieurs longueurs de fenêtre
+    """
+    if rolling_df is None or len(rolling_df) == 0:
+        return
+    
+    chart = alt.Chart(rolling_df.dropna(subset=['NPS_Score'])).mark_line().encode(
+        x=alt.X('Date:T', title=None),
+        y=alt.Y('NPS_Score:Q', title='NPS glissant'),
+        color=alt.Color('Fenêtre:N', title='Fenêtre'),
+        tooltip=[
+            alt.Tooltip('Date:T', title='Date'),
+            alt.Tooltip('Fenêtre:N', title='Fenêtre'),
+            alt.Tooltip('total:Q', title='Total réponses'),
+            alt.Tooltip('NPS_Score:Q', title='Score NPS', format='.1f')
         ]
-    }
+    ).properties(
+        height=250,
+        title={
+            'text': 'NPS glissant',
+            'anchor': 'start',
+            'fontSize': 16
+        }
+    )
+    
+    st.altair_chart(chart, use_container_width=True)
+
+def render_service_card(delta: ServiceDelta) -> str:
+    """
+    Carte HTML d'une métrique de service
+    """
+    evolution = delta.delta
+    
+    # Détermination de la couleur et icône selon l'évolution
+    if abs(evolution) < 0.1:
+        icon = "―"
+        color = "gray"
+    elif evolution > 0:
+        icon = "▲"
+        color = "green"
+    else:
+        icon = "▼"
+        color = "red"
+    
+    # Demi-largeur de l'intervalle de confiance de la moyenne actuelle
+    margin = f"<br>± {delta.margin:.2f}" if pd.notna(delta.margin) else ""
+    
+    card = f"""
+    <div style="
+        padding: 8px;
+        border-radius: 4px;
+        background-color: rgba(255,255,255,0.05);
+        margin-bottom: 8px;
+    ">
+        <div style="
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+        ">
+            <div>
+                <div style="font-size: 0.9em;">{delta.metric.display_name}</div>
+                <div style="font-size: 1.2em; font-weight: bold;">
+                    {delta.current_mean:.1f}
+                    <span style="
+                        color: {color};
+                        font-size: 0.8em;
+                        margin-left: 5px;
+                    ">
+                        {icon} {abs(evolution):.1f}
+                    </span>
+                </div>
+            </div>
+            <div style="
+                font-size: 0.7em;
+                color: gray;
+                text-align: right;
+            ">
+                {delta.current_n} rép.{margin}
+            </div>
+        </div>
+    </div>
+    """
+    # HTML sur une ligne : pas d'indentation interprétée comme du code Markdown
+    return compact_html(card)
 
-    # Calcul des périodes
-    end_date = pd.Timestamp.now()
-    period_days = int(period[:-1])
-    start_date = end_date - pd.Timedelta(days=period_days)
-    mid_date = start_date + pd.Timedelta(days=period_days/2)
+def display_service_trend(trend: TrendBuckets):
+    """
+    Affiche l'évolution de la moyenne d'un service, avec son intervalle de confiance par période
+    """
+    services = trend.services
+    if services is None or len(services) == 0:
+        return
+    metric_ids = [m for m in services.loc[services['n'] > 0, 'metric_id'].unique() if m in METRICS_BY_ID]
+    if not metric_ids:
+        return
+    metric_id = st.selectbox(
+        "Évolution du service",
+        metric_ids,
+        format_func=lambda m: f"{METRICS_BY_ID[m].category} — {METRICS_BY_ID[m].display_name}"
+    )
 
-    # Affichage par catégorie
-    cols = st.columns(4)
-    for idx, (category, metrics) in enumerate(service_categories.items()):
-        with cols[idx]:
-            st.markdown(f"#### {category}")
-            
-            for metric in metrics:
-                try:
-                    # Calcul période actuelle
-                    current_data = df[
-                        (df['Horodateur'] >= mid_date) & 
-                        (df['Horodateur'] <= end_date) &
-                        (df[metric].notna())
-                    ][metric].astype(float)
-                    
-                    # Calcul période précédente
-                    previous_data = df[
-                        (df['Horodateur'] >= start_date) & 
-                        (df['Horodateur'] < mid_date) &
-                        (df[metric].notna())
-                    ][metric].astype(float)
-                    
-                    if len(current_data) > 0 and len(previous_data) > 0:
-                        current_avg = current_data.mean()
-                        previous_avg = previous_data.mean()
-                        evolution = current_avg - previous_avg
-                        
-                        # Nom court de la métrique
-                        metric_short_name = metric.split("concernant ")[-1].split("]")[-1].strip()
-                        if metric_short_name.startswith("l'"):
-                            metric_short_name = metric_short_name[2:]
-                        if metric_short_name.startswith("la "):
-                            metric_short_name = metric_short_name[3:]
-                        if metric_short_name.startswith("le "):
-                            metric_short_name = metric_short_name[3:]
-                        if metric_short_name.startswith("les "):
-                            metric_short_name = metric_short_name[4:]
-                        
-                        # Détermination de la couleur et icône selon l'évolution
-                        if abs(evolution) < 0.1:
-                            icon = "―"
-                            color = "gray"
-                        elif evolution > 0:
-                            icon = "▲"
-                            color = "green"
-                        else:
-                            icon = "▼"
-                            color = "red"
-                        
-                        # Affichage de la métrique
-                        st.markdown(
-                            f"""
-                            <div style="
-                                padding: 8px;
-                                border-radius: 4px;
-                                background-color: rgba(255,255,255,0.05);
-                                margin-bottom: 8px;
-                            ">
-                                <div style="
-                                    display: flex;
-                                    justify-content: space-between;
-                                    align-items: center;
-                                ">
-                                    <div>
-                                        <div style="font-size: 0.9em;">{metric_short_name}</div>
-                                        <div style="font-size: 1.2em; font-weight: bold;">
-                                            {current_avg:.1f}
-                                            <span style="
-                                                color: {color};
-                                                font-size: 0.8em;
-                                                margin-left: 5px;
-                                            ">
-                                                {icon} {abs(evolution):.1f}
-                                            </span>
-                                        </div>
-                                    </div>
-                                    <div style="
-                                        font-size: 0.7em;
-                                        color: gray;
-                                    ">
-                                        {len(current_data)} rép.
-                                    </div>
-                                </div>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-                except Exception as e:
-                    st.error(f"Erreur pour la métrique {metric}: {str(e)}")
+    # Mêmes libellés de période que le graphique d'évolution du NPS
+    chart_df = services[(services['metric_id'] == metric_id) & (services['n'] > 0)].merge(
+        trend.table[['Period_Start', 'Display_Date', 'Sort_Key']], on='Period_Start'
+    ).rename(columns={'Display_Date': 'Period', 'mean': 'Moyenne', 'low': 'IC_Bas', 'high': 'IC_Haut'})
+    x = alt.X('Period:N', sort=alt.SortField('Sort_Key', order='ascending'), title=None)
+    tooltip = [
+        alt.Tooltip('Period:N', title='Période'),
+        alt.Tooltip('n:Q', title='Réponses'),
+        alt.Tooltip('Moyenne:Q', title='Moyenne', format='.2f'),
+        alt.Tooltip('IC_Bas:Q', title='IC bas', format='.2f'),
+        alt.Tooltip('IC_Haut:Q', title='IC haut', format='.2f')
+    ]
 
-def render_nps_overview(df: pd.DataFrame):
+    band = alt.Chart().mark_errorbar(ticks=True).encode(
+        x=x,
+        y=alt.Y('IC_Bas:Q', title='Note moyenne', scale=alt.Scale(zero=False)),
+        y2='IC_Haut:Q',
+        tooltip=tooltip
+    )
+    line = alt.Chart().mark_line(point=True).encode(
+        x=x,
+        y='Moyenne:Q',
+        tooltip=tooltip
+    )
+    chart = alt.layer(band, line, data=chart_df).properties(height=220)
+    st.altair_chart(chart, use_container_width=True)
+
+def select_comparison() -> str:
+    """
+    Sélecteur du mode de comparaison de la grille des services
+    """
+    return st.selectbox(
+        "Comparer à",
+        list(COMPARISON_MODES),
+        index=0
+    )
+
+def display_metrics_grid(deltas: List[ServiceDelta]):
+    """
+    Affiche la grille des métriques avec leurs évolutions
+    """
+    # Construction de la grille par catégorie, émise en un seul bloc HTML
+    columns_html = []
+    for category, category_deltas in group_by_category(deltas).items():
+        cards = [f"<h4>{category}</h4>"]
+        for delta in category_deltas:
+            if delta.is_comparable:
+                cards.append(render_service_card(delta))
+        if len(cards) == 1:
+            cards.append('<div style="font-size: 0.8em; color: gray;">Pas de données de comparaison</div>')
+        columns_html.append(f"<div>{''.join(cards)}</div>")
+    
+    grid = f"""
+    <div style="
+        display: grid;
+        grid-template-columns: repeat({len(columns_html)}, 1fr);
+        gap: 16px;
+    ">
+        {''.join(columns_html)}
+    </div>
     """
-    Composant principal qui affiche la vue d'ensemble du NPS
+    st.markdown(compact_html(grid), unsafe_allow_html=True)
+
+def render_nps_overview(version: str, load_rollup: Callable[[], DailyRollup], cache: Optional[LRUCache] = None,
+                        tracer: Optional[Tracer] = None, snapshot: Optional[Snapshot] = None,
+                        as_of: Optional[pd.Timestamp] = None, club: str = NETWORK_LABEL,
+                        alerts: Optional[List[Alert]] = None) -> Optional[str]:
+    """
+    Composant principal qui affiche la vue d'ensemble du NPS au jour `as_of`.
+    Les vues couvertes par l'instantané y sont lues ; l'agrégat journalier
+    n'est chargé (load_rollup) que pour les autres. Les alertes de baisse du club
+    sur la période sont affichées sous l'en-tête.
+    Retourne le code de la période sélectionnée.
     """
+    tracer = tracer or NULL_TRACER
+    as_of = as_of_day(as_of)
+
+    def rollup() -> DailyRollup:
+        with tracer.span('load/rollup') as span:
+            loaded = load_rollup()
+            span.set_rows(len(loaded.counts))
+        return loaded
+
     try:
         # Sélecteur de période
         period = st.selectbox(
@@ -375,23 +402,92 @@ def render_nps_overview(df: pd.DataFrame):
             '12 derniers mois': '365D'
         }
         
-        # Calcul des métriques avec vérification
-        metrics = calculate_nps_metrics(df, period_mapping[period])
-        if metrics is None:
-            metrics = {
-                'nps_score': 0,
-                'promoters_pct': 0,
-                'passive_pct': 0,
-                'detractors_pct': 0,
-                'total_responses': 0
-            }
+        period_code = period_mapping[period]
+        threshold = get_config('NPS_MAX_CI_WIDTH', 50)
+        confidence = (get_config('CONFIDENCE_LEVEL', 0.95), get_config('CI_METHOD', 'analytic'))
+        # Instantané utilisable s'il a été calculé sur ces données, à cette date, avec ces intervalles
+        covered = snapshot is not None and snapshot.covers(club, version, as_of, confidence)
+        st.caption(f"Données au {as_of:%d/%m/%Y}" + (" (instantané précalculé)" if covered else ""))
+        
+        def from_snapshot(view, compute):
+            result = view() if covered else None
+            return compute() if result is None else result
+        
+        # Calculs purs, mis en cache par version des données et date de référence
+        with tracer.span('compute/metrics') as span:
+            metrics = cached_call(
+                cache,
+                ('metrics', version, period_code, confidence, as_of),
+                lambda: from_snapshot(
+                    lambda: snapshot.header(club, period_code),
+                    lambda: calculate_nps_metrics(rollup(), period_code, *confidence, as_of=as_of)
+                )
+            )
+            span.set_rows(metrics.total_responses)
         
         # Affichage
-        display_nps_header(metrics)
+        with tracer.span('render/header'):
+            display_nps_header(metrics)
+            start = period_window(period_code, as_of)[0]
+            display_alerts([a for a in alerts or [] if a.club == club and pd.Timestamp(a.day) >= start])
         st.divider()
-        display_nps_trend(df, period_mapping[period])
+        
+        frequency = select_trend_frequency()
+        with tracer.span('compute/trend') as span:
+            # L'instantané ne contient que le regroupement automatique
+            buckets = cached_call(
+                cache,
+                ('trend', version, period_code, confidence, frequency, as_of),
+                lambda: from_snapshot(
+                    lambda: snapshot.trend(club, period_code, threshold) if frequency is None else None,
+                    lambda: compute_trend_buckets(rollup(), period_code, threshold, *confidence, frequency, as_of=as_of)
+                )
+            )
+            # Le seuil ne dérive que le drapeau de représentativité des agrégats en cache
+            trend = cached_call(
+                cache,
+                ('trend_flags', version, period_code, confidence, frequency, as_of, threshold),
+                lambda: apply_threshold(buckets, threshold)
+            )
+            span.set_rows(len(trend.table))
+        if frequency is not None and trend.frequency != frequency:
+            st.caption("Regroupement élargi : trop de barres pour la période sélectionnée")
+        with tracer.span('render/trend'):
+            display_nps_trend(trend, threshold, cache)
+        
+        windows = select_rolling_windows()
+        if windows:
+            with tracer.span('compute/rolling') as span:
+                rolling_df = cached_call(
+                    cache,
+                    ('rolling', version, tuple(sorted(windows)), as_of),
+                    lambda: from_snapshot(
+                        lambda: snapshot.rolling(club, windows, as_of),
+                        lambda: compute_rolling_nps(rollup(), windows, as_of)
+                    )
+                )
+                span.set_rows(len(rolling_df))
+            with tracer.span('render/rolling'):
+                display_rolling_nps(rolling_df)
         st.divider()
-        display_metrics_grid(df, period_mapping[period])
+        
+        st.markdown("### Satisfaction par service")
+        comparison = select_comparison()
+        with tracer.span('compute/grid') as span:
+            deltas = cached_call(
+                cache,
+                ('grid', version, period_code, comparison, as_of),
+                lambda: from_snapshot(
+                    lambda: snapshot.grid(club, period_code, comparison),
+                    lambda: compute_service_grid(rollup(), period_code, comparison, as_of=as_of)
+                )
+            )
+            span.set_rows(len(deltas))
+        with tracer.span('render/grid'):
+            display_metrics_grid(deltas)
+            display_service_trend(trend)
+        
+        return period_code
         
     except Exception as e:
         st.error(f"Une erreur s'est produite: {str(e)}")
@@ -410,18 +506,18 @@ def render_config():
                 "Seuil de représentativité",
                 min_value=10,
                 max_value=100,
-                value=get_config('NPS_THRESHOLD', 35),
-                help="Nombre minimum de réponses nécessaires pour considérer une période comme représentative"
+                value=get_config('NPS_MAX_CI_WIDTH', 50),
+                help="Largeur maximale (en points NPS) de l'intervalle de confiance d'une période représentative"
             )
             
-            if new_threshold != get_config('NPS_THRESHOLD', 35):
-                update_config('NPS_THRESHOLD', new_threshold)
-                st.success(f"Seuil mis à jour : {new_threshold} réponses")
+            if new_threshold != get_config('NPS_MAX_CI_WIDTH', 50):
+                update_config('NPS_MAX_CI_WIDTH', new_threshold)
+                st.success(f"Seuil mis à jour : {new_threshold} points")
 
         with col2:
             st.markdown("""
             **À propos du seuil de représentativité**
             
-            Ce seuil détermine le nombre minimum de réponses nécessaires pour qu'une période soit considérée comme statistiquement significative. 
+            Une période est considérée comme statistiquement significative si l'intervalle de confiance de son NPS est plus étroit que ce seuil. 
             Les périodes n'atteignant pas ce seuil seront affichées en transparence dans les graphiques.
             """)
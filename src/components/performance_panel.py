@@ -0,0 +1,30 @@
+# performance_panel
+import streamlit as st
+from utils.instrumentation import Tracer, summarize_history
+
+def render_performance_panel(tracer: Tracer):
+    """
+    Affiche les durées par étape et les volumes traités des dernières exécutions
+    """
+    history = tracer.history_frame()
+    if len(history) == 0:
+        st.info("Aucune exécution mesurée pour l'instant : interagissez avec le tableau de bord.")
+        return
+
+    summary = summarize_history(history)
+    last = tracer.runs[-1]
+    st.caption(f"Session {tracer.session} — {len(tracer.runs)} exécutions conservées, dernière : {last.total_ms:.1f} ms")
+
+    st.markdown("**Par étape**")
+    st.dataframe(
+        summary['stats'].rename(columns={
+            'median_ms': 'Médiane (ms)',
+            'max_ms': 'Max (ms)',
+            'last_ms': 'Dernière (ms)',
+            'rows': 'Lignes'
+        }).round(2),
+        use_container_width=True
+    )
+
+    st.markdown("**Par exécution (ms)**")
+    st.dataframe(summary['durations'].round(2), use_container_width=True)
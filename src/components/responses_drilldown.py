@@ -0,0 +1,31 @@
+# responses_drilldown
+import streamlit as st
+import pandas as pd
+from typing import Optional
+from utils.parquet_store import ParquetResponseStore
+from utils.schema import METRICS_BY_ID
+
+def render_responses_drilldown(store: ParquetResponseStore, period: str, end_date: Optional[pd.Timestamp] = None):
+    """
+    Affiche les réponses brutes de la période se terminant à end_date, lues depuis le stockage Parquet
+    """
+    with st.expander("Réponses détaillées", expanded=False):
+        columns = ['Horodateur', 'NPS_Score', 'NPS_Category'] + st.multiselect(
+            "Questions affichées",
+            list(METRICS_BY_ID),
+            format_func=lambda metric_id: METRICS_BY_ID[metric_id].display_name
+        )
+        
+        # Seules les partitions de la période et les colonnes choisies sont lues
+        responses = store.read_period(period, columns=columns, end_date=end_date)
+        if len(responses) == 0:
+            st.info("Aucune réponse pour la période sélectionnée.")
+            return
+        
+        st.caption(f"{len(responses)} réponses")
+        st.dataframe(
+            responses.sort_values('Horodateur', ascending=False).rename(
+                columns={m: METRICS_BY_ID[m].display_name for m in columns if m in METRICS_BY_ID}
+            ),
+            hide_index=True
+        )
@@ -0,0 +1,32 @@
+# segment_filters
+import streamlit as st
+from typing import Dict, List, Sequence
+from utils.schema import SEGMENTS_BY_COLUMN
+from utils.segments import SegmentIndex
+
+def render_segment_filters(index: SegmentIndex, exclude: Sequence[str] = ('Club',)) -> Dict[str, List[str]]:
+    """
+    Filtres des répondants : un sélecteur multiple par attribut présent dans les données.
+    Retourne les seuls attributs filtrés (valeurs retenues).
+    """
+    attributes = [a for a in index.attributes if a not in exclude]
+    if not attributes:
+        return {}
+    
+    filters = {}
+    with st.expander("Filtres de répondants", expanded=False):
+        for column, attribute in zip(st.columns(len(attributes)), attributes):
+            with column:
+                filters[attribute] = st.multiselect(
+                    SEGMENTS_BY_COLUMN[attribute].display_name,
+                    index.values(attribute),
+                    key=f"segment_{attribute}"
+                )
+    return {attribute: values for attribute, values in filters.items() if values}
+
+def display_selection_size(selected: int, total: int):
+    """
+    Rappelle la taille de la sélection de répondants
+    """
+    share = selected / total if total else 0
+    st.caption(f"Sélection : {selected} réponses sur {total} ({share:.0%})")
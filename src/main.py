@@ -1,73 +1,261 @@
 # src/main.py
+import os
 import streamlit as st
 import pandas as pd
-import numpy as np
-from components.nps_overview import render_nps_overview
-from utils.config import config, DEFAULT_CONFIG
+from dataclasses import replace
+from typing import List, Optional
+from components.nps_overview import render_nps_overview, select_club
+from components.responses_drilldown import render_responses_drilldown
+from components.network_overview import render_network_overview
+from components.driver_analysis import render_driver_analysis
+from components.performance_panel import render_performance_panel
+from components.segment_filters import display_selection_size, render_segment_filters
+from utils.config import CONFIG_FILE, ConfigChange, ConfigStore, get_config, use_config
+from utils.rollup import DailyRollup, build_daily_rollup, club_version
+from utils.cache import LRUCache, dataset_fingerprint
+from utils.schema import normalize_responses
+from utils.synthetic import TEST_DATASET, generate_responses
+from utils.aggregate_store import AggregateStore
+from utils.anomalies import Alert, read_alerts
+from utils.ingestion import ingest_export
+from utils.parquet_store import ParquetResponseStore
+from utils.network import NETWORK_LABEL, NetworkJob, get_executor, submit_frame_shards, submit_store_shards
+from utils.segments import SegmentIndex, build_segment_index, selection_key
+from utils.shared_data import DatasetVersion, shared_dataset
+from utils.snapshot import Snapshot, load_snapshot
+from utils.windows import as_of_day, day_end, period_window
+from utils.drivers import compute_driver_analysis
+from utils.instrumentation import Tracer, configure_perf_log
 
 def test_data():
-    # Création du DataFrame de base
-    end_date = pd.Timestamp.now()
-    start_date = end_date - pd.Timedelta(days=90)  # 3 mois de données
-    dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    # Générer plusieurs réponses par jour (entre 3 et 8 réponses)
-    all_dates = []
-    for date in dates:
-        # Générer un nombre aléatoire de réponses pour ce jour
-        n_responses = np.random.randint(3, 9)
-        all_dates.extend([date] * n_responses)
-    
-    n_samples = len(all_dates)
-    np.random.seed(42)
-    
-    df = pd.DataFrame({
-        'Horodateur': all_dates,
-        'NPS_Score': np.random.choice(
-            np.arange(0, 11),
-            size=n_samples,
-            p=[0.01, 0.02, 0.02, 0.03, 0.04, 0.05, 0.13, 0.15, 0.20, 0.18, 0.17]
-        )
-    })
-
-    service_metrics = {
-        # Général
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant l'ambiance générale": [3, 4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant la propreté générale": [3, 4, 5],
-
-        # Expériences
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant l'expérience à la salle de sport": [3, 4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant l'expérience piscine": [3, 4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant la disponibilité des équipements sportifs": [3, 4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant les vestiaires (douches / sauna/ serviettes..)": [2, 3, 4],
-
-        # Personnel
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant les coachs": [4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant les maitres nageurs": [3, 4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant le personnel d'accueil": [3, 4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant Le commercial": [3, 4, 5],
-
-        # Services (modification uniquement de ces deux dernières lignes)
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant La qualité des coaching en groupe": [3, 4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant la disponibilité des cours sur le planning": [2, 3, 4],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant la restauration": [3, 4, 5],
-        "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant les événements et animations": [3, 4, 5]}
-
-    for metric, possible_scores in service_metrics.items():
-        df[metric] = np.random.choice(
-            possible_scores,
-            size=n_samples,
-            p=np.ones(len(possible_scores)) / len(possible_scores)
+    # Jeu de données synthétique reproductible (partagé avec le précalcul de l'instantané)
+    return generate_responses(**TEST_DATASET)
+
+def get_session_config() -> ConfigStore:
+    """
+    Configuration propre à la session, initialisée depuis le fichier enregistré
+    (seuls les paramètres communs y sont réécrits) et activée pour l'exécution en cours
+    """
+    if 'nps_config' not in st.session_state:
+        st.session_state['nps_config'] = ConfigStore(CONFIG_FILE)
+    settings = st.session_state['nps_config']
+    use_config(settings)
+    return settings
+
+def invalidate_dependents(cache: LRUCache, change: ConfigChange):
+    """
+    Supprime du cache les seuls résultats qui dépendent du paramètre modifié
+    """
+    if change.affected is None or change.affected:
+        cache.invalidate(change.affected)
+
+def get_session_cache() -> LRUCache:
+    """
+    Cache borné propre à la session (données chargées et agrégats dérivés)
+    """
+    max_entries = get_config('CACHE_MAX_ENTRIES', 16)
+    ttl = get_config('CACHE_TTL', 600)
+    if 'nps_cache' not in st.session_state:
+        st.session_state['nps_cache'] = LRUCache(max_entries=max_entries, ttl=ttl)
+    cache = st.session_state['nps_cache']
+    if cache.max_entries != max_entries or cache.ttl != ttl:
+        cache.resize(max_entries, ttl)
+    return cache
+
+def get_session_tracer() -> Tracer:
+    """
+    Instrumentation propre à la session (désactivée par défaut)
+    """
+    history = get_config('PERF_HISTORY', 20)
+    if 'nps_tracer' not in st.session_state:
+        st.session_state['nps_tracer'] = Tracer(history=history)
+    tracer = st.session_state['nps_tracer']
+    tracer.enabled = bool(get_config('PERF_TRACING', False))
+    if tracer.runs.maxlen != history:
+        tracer.resize(history)
+    if tracer.enabled:
+        configure_perf_log(get_config('PERF_LOG'))
+    return tracer
+
+def get_raw_store():
+    """
+    Stockage Parquet des réponses brutes, s'il est configuré
+    """
+    parquet_root = get_config('RESPONSES_PARQUET')
+    return ParquetResponseStore(parquet_root) if parquet_root else None
+
+def get_aggregate_store() -> AggregateStore:
+    return AggregateStore(get_config('AGGREGATE_STORE', 'data/nps_aggregates.sqlite'))
+
+def load_shared_data(cache: LRUCache) -> DatasetVersion:
+    """
+    Données de la source configurée, partagées par toutes les sessions du serveur :
+    export ingéré de façon incrémentale dans le stockage SQLite (nouvelle version
+    substituée quand de nouvelles réponses arrivent), ou jeu de test chargé une fois
+    """
+    export_path = get_config('RESPONSES_EXPORT')
+    if export_path:
+        store = get_aggregate_store()
+        # Nouvelles réponses ingérées au plus une fois par durée de vie du cache
+        raw_store = get_raw_store()
+        cache.get_or_compute(('ingest', export_path), lambda: ingest_export(store, export_path, raw_store=raw_store))
+        source = ('export', export_path, get_config('AGGREGATE_STORE'), get_config('RESPONSES_PARQUET'))
+        return shared_dataset(source, DatasetVersion).refresh(store.version())
+
+    def load_test_data(_version: Optional[str]) -> DatasetVersion:
+        df = normalize_responses(test_data())
+        return DatasetVersion(dataset_fingerprint(df), df)
+
+    return shared_dataset(('test_data',), load_test_data).refresh()
+
+def load_rollup(data: DatasetVersion, club: str = NETWORK_LABEL) -> DailyRollup:
+    """
+    Agrégat journalier du réseau ou d'un club, construit une fois par version des données
+    """
+    version = data.version if club == NETWORK_LABEL else club_version(data.version, club)
+
+    def build():
+        if data.responses is None:
+            store = get_aggregate_store()
+            if club == NETWORK_LABEL:
+                return store.load_rollup()
+            return replace(store.load_rollup([club]), version=version)
+        df = data.responses
+        return build_daily_rollup(df if club == NETWORK_LABEL else df[df['Club'] == club], version=version)
+
+    return data.derive(('rollup', club), build)
+
+def load_clubs(data: DatasetVersion) -> List[str]:
+    """
+    Clubs de la source configurée
+    """
+    def compute():
+        if data.responses is None:
+            return get_aggregate_store().clubs()
+        return sorted(str(club) for club in data.responses['Club'].dropna().unique())
+
+    return data.derive(('clubs',), compute)
+
+def load_session_snapshot(cache: LRUCache) -> Optional[Snapshot]:
+    """
+    Instantané précalculé (projeté en mémoire), rouvert quand le fichier est régénéré
+    """
+    path = get_config('SNAPSHOT_PATH')
+    if not path or not os.path.exists(path):
+        return None
+    return cache.get_or_compute(('snapshot', path, os.path.getmtime(path)), lambda: load_snapshot(path))
+
+def reference_day(snapshot: Optional[Snapshot], version: str) -> pd.Timestamp:
+    """
+    Date de référence des calculs : AS_OF s'il est configuré, sinon celle de l'instantané
+    s'il porte sur les données actuelles, sinon aujourd'hui
+    """
+    as_of = get_config('AS_OF')
+    if as_of is None and snapshot is not None and snapshot.version(NETWORK_LABEL) == version:
+        as_of = snapshot.as_of
+    return as_of_day(as_of)
+
+def load_responses(data: DatasetVersion, as_of: pd.Timestamp) -> Optional[pd.DataFrame]:
+    """
+    Réponses brutes jusqu'au jour de référence : jeu de test, ou période la plus longue
+    du stockage Parquet (None si les réponses brutes ne sont pas conservées)
+    """
+    if data.responses is not None:
+        return data.responses
+    raw_store = get_raw_store()
+    if raw_store is None:
+        return None
+    longest = max(get_config('PERIODS', {}).values(), key=lambda p: pd.Timedelta(p))
+    return data.derive(('responses', longest), lambda: raw_store.read_period(longest, end_date=day_end(as_of)), as_of)
+
+def load_segment_index(data: DatasetVersion, as_of: pd.Timestamp) -> Optional[SegmentIndex]:
+    """
+    Index des segments de répondants, construit une fois par version des données et date de référence
+    """
+    def compute():
+        responses = load_responses(data, as_of)
+        return None if responses is None else build_segment_index(responses)
+
+    return data.derive(('segments',), compute, as_of)
+
+def load_segment_rollup(cache: LRUCache, index: SegmentIndex, selection, version: str, as_of: pd.Timestamp) -> DailyRollup:
+    """
+    Agrégat journalier des répondants sélectionnés, recalculé depuis l'index
+    une fois par session, version des données, jeu de filtres et date de référence
+    """
+    return cache.get_or_compute(('rollup', version, as_of), lambda: index.rollup(selection, version=version))
+
+def segment_responses(data: DatasetVersion, index: SegmentIndex, filters, as_of: pd.Timestamp) -> pd.DataFrame:
+    """
+    Réponses brutes des répondants sélectionnés (l'index suit l'ordre des réponses)
+    """
+    return load_responses(data, as_of).iloc[index.positions(index.select(filters))]
+
+def load_driver_analysis(data: DatasetVersion, as_of: pd.Timestamp, cache: LRUCache,
+                         index: Optional[SegmentIndex] = None, filters=None):
+    """
+    Analyse des leviers de toutes les périodes et de tous les clubs, calculée une fois
+    par version des données et date de référence (réponses brutes nécessaires : jeu de test ou stockage Parquet).
+    Restreinte aux répondants filtrés, elle est propre à la session.
+    """
+    periods = list(get_config('PERIODS', {}).values())
+    if filters:
+        return cache.get_or_compute(
+            ('drivers', data.version, selection_key(filters), tuple(periods), as_of),
+            lambda: compute_driver_analysis(segment_responses(data, index, filters, as_of), periods, day_end(as_of))
         )
 
-    # Ajout des catégories NPS
-    df['NPS_Category'] = df['NPS_Score'].apply(lambda x: 
-        'Promoteur' if x >= 8 else
-        'Passif' if x >= 6 else
-        'Détracteur'
+    def compute():
+        responses = load_responses(data, as_of)
+        return None if responses is None else compute_driver_analysis(responses, periods, day_end(as_of))
+
+    return data.derive(('drivers', tuple(periods)), compute, as_of)
+
+def load_alerts(cache: LRUCache, as_of: pd.Timestamp) -> List[Alert]:
+    """
+    Alertes de baisse du réseau et des clubs, lues dans le journal tenu à jour
+    hors du tableau de bord (python -m utils.anomalies), relu quand il est modifié
+    """
+    log_path = get_config('ANOMALY_LOG')
+    if not log_path or not os.path.exists(log_path):
+        return []
+    longest = max(get_config('PERIODS', {}).values(), key=lambda p: pd.Timedelta(p))
+    return cache.get_or_compute(
+        ('alerts', log_path, os.path.getmtime(log_path), as_of),
+        lambda: read_alerts(log_path, since=period_window(longest, as_of)[0])
     )
-    
-    return df
+
+def submit_network_job(data: DatasetVersion, period: str, as_of: pd.Timestamp, cache: LRUCache,
+                       index: Optional[SegmentIndex] = None, filters=None) -> NetworkJob:
+    """
+    Lance (une fois par version des données, période et date de référence) le calcul par club sur le pool.
+    Restreint aux répondants filtrés, le calcul est propre à la session.
+    """
+    if filters:
+        return cache.get_or_compute(
+            ('network', data.version, selection_key(filters), period, as_of),
+            lambda: submit_frame_shards(
+                get_executor(get_config('NETWORK_WORKERS')), segment_responses(data, index, filters, as_of), period, as_of
+            )
+        )
+
+    def submit():
+        executor = get_executor(get_config('NETWORK_WORKERS'))
+        if data.responses is None:
+            store_path = get_config('AGGREGATE_STORE', 'data/nps_aggregates.sqlite')
+            return submit_store_shards(executor, store_path, AggregateStore(store_path).clubs(), period, as_of)
+        return submit_frame_shards(executor, data.responses, period, as_of)
+
+    return data.derive(('network', period), submit, as_of)
+
+def discard_network_job(data: DatasetVersion, period: str, as_of: pd.Timestamp, cache: LRUCache, filters=None):
+    """
+    Oublie un calcul par club en échec : il est relancé à l'exécution suivante
+    """
+    if filters:
+        cache.discard(('network', data.version, selection_key(filters), period, as_of))
+    else:
+        data.discard(('network', period), as_of)
 
 def main():
     st.set_page_config(
@@ -77,16 +265,78 @@ def main():
     )
 
     # Tabs pour la navigation
-    tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "📈 Analyses", "⚙️ Configuration"])
+    tab1, tab2, tab_network, tab3 = st.tabs(["📊 Dashboard", "📈 Analyses", "🌐 Réseau", "⚙️ Configuration"])
     
-    df = test_data()
+    settings = get_session_config()
+    cache = get_session_cache()
+    settings.subscribe('cache', lambda change: invalidate_dependents(cache, change))
+    tracer = get_session_tracer()
+    # Mesures de cette exécution (sans effet si l'instrumentation est désactivée)
+    tracer.start_run()
+    
+    # Version des données et date de référence partagées par tous les composants ;
+    # l'agrégat journalier n'est construit que pour les vues absentes de l'instantané
+    with tracer.span('load/version'):
+        data = load_shared_data(cache)
+        version = data.version
+        snapshot = load_session_snapshot(cache)
+        as_of = reference_day(snapshot, version)
 
     with tab1:
-        render_nps_overview(df)
+        club = select_club([NETWORK_LABEL] + load_clubs(data))
+        view_version = version if club == NETWORK_LABEL else club_version(version, club)
+        load_view = lambda: load_rollup(data, club)
+        
+        # Filtres de répondants : sélection résolue sur l'index des segments
+        with tracer.span('load/segments') as span:
+            index = load_segment_index(data, as_of)
+            span.set_rows(0 if index is None else index.n_rows)
+        # Filtres appliqués à tous les onglets (sauf les alertes, détectées hors du tableau de bord
+        # sur l'ensemble des répondants) ; Analyses et Réseau ont leur propre choix de club
+        segment_filters = render_segment_filters(index) if index is not None else {}
+        filters = segment_filters
+        if filters:
+            # Le club choisi s'ajoute aux filtres (ET entre attributs)
+            if club != NETWORK_LABEL:
+                filters = {**filters, 'Club': [club]}
+            with tracer.span('compute/segments') as span:
+                selection = index.select(filters)
+                selected = index.count(selection)
+                span.set_rows(selected)
+            display_selection_size(selected, index.n_rows)
+            view_version = f"{version}:{selection_key(filters)}"
+            load_view = lambda: load_segment_rollup(cache, index, selection, view_version, as_of)
+        
+        with tracer.span('compute/alerts') as span:
+            alerts = load_alerts(cache, as_of)
+            span.set_rows(len(alerts))
+        period_code = render_nps_overview(view_version, load_view, cache, tracer, snapshot, as_of, club, alerts)
+        raw_store = get_raw_store()
+        if raw_store is not None and period_code is not None:
+            with tracer.span('render/drilldown'):
+                render_responses_drilldown(raw_store, period_code, day_end(as_of))
     
     with tab2:
-        st.header("Analyses détaillées")
-        # ... (à implémenter)
+        with tracer.span('compute/drivers') as span:
+            analysis = load_driver_analysis(data, as_of, cache, index, segment_filters)
+            span.set_rows(0 if analysis is None else int(analysis.fit['n'].max()))
+        if analysis is None:
+            st.header("Analyses détaillées")
+            st.info("L'analyse des leviers nécessite les réponses brutes : configurez RESPONSES_PARQUET.")
+        else:
+            with tracer.span('render/drivers'):
+                render_driver_analysis(analysis)
+            if segment_filters:
+                display_selection_size(index.count(index.select(segment_filters)), index.n_rows)
+    
+    with tab_network:
+        with tracer.span('render/network'):
+            render_network_overview(
+                lambda period: submit_network_job(data, period, as_of, cache, index, segment_filters),
+                lambda period: discard_network_job(data, period, as_of, cache, segment_filters)
+            )
+        if segment_filters:
+            display_selection_size(index.count(index.select(segment_filters)), index.n_rows)
     
     with tab3:
         st.markdown("### ⚙️ Configuration")
@@ -94,25 +344,45 @@ def main():
             col1, col2 = st.columns([1, 2])
             
             with col1:
-                new_threshold = st.number_input(
+                # Modifié avant l'exécution suivante : le tableau de bord affiche déjà le nouveau seuil
+                def on_threshold_change():
+                    if settings.update('NPS_MAX_CI_WIDTH', st.session_state['nps_max_ci_width']):
+                        st.toast(f"Seuil mis à jour : {st.session_state['nps_max_ci_width']} points")
+                
+                st.number_input(
                     "Seuil de représentativité",
                     min_value=10,
                     max_value=100,
-                    value=config.get('NPS_THRESHOLD', 35),
-                    help="Nombre minimum de réponses nécessaires pour considérer une période comme représentative"
+                    value=settings.get('NPS_MAX_CI_WIDTH', 50),
+                    key='nps_max_ci_width',
+                    on_change=on_threshold_change,
+                    help="Largeur maximale (en points NPS) de l'intervalle de confiance d'une période représentative"
                 )
-                
-                if new_threshold != config.get('NPS_THRESHOLD'):
-                    config['NPS_THRESHOLD'] = new_threshold
-                    st.success(f"Seuil mis à jour : {new_threshold} réponses")
 
             with col2:
                 st.markdown("""
                 **À propos du seuil de représentativité**
                 
-                Ce seuil détermine le nombre minimum de réponses nécessaires pour qu'une période soit considérée comme statistiquement significative. 
+                Une période est considérée comme statistiquement significative si l'intervalle de confiance de son NPS est plus étroit que ce seuil. 
                 Les périodes n'atteignant pas ce seuil seront affichées en transparence dans les graphiques.
                 """)
 
+        with st.expander("Performances", expanded=tracer.enabled):
+            st.toggle(
+                "Mesurer les temps d'exécution",
+                value=tracer.enabled,
+                key='perf_tracing',
+                on_change=lambda: settings.update('PERF_TRACING', st.session_state['perf_tracing']),
+                help="Durées par étape (chargement, calculs, affichage) des dernières exécutions"
+            )
+            if tracer.enabled:
+                render_performance_panel(tracer)
+                st.caption(
+                    f"Données partagées entre les sessions : version {data.version} chargée à "
+                    f"{data.loaded_at:%H:%M:%S}, {len(data.derived_keys)} agrégats dérivés"
+                )
+
+    tracer.end_run()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
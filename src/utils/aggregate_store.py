@@ -0,0 +1,200 @@
+# src/utils/aggregate_store.py
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+from utils.rollup import COUNT_COLUMNS, DailyRollup
+from utils.schema import SERVICE_METRICS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    club TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    promoteurs INTEGER NOT NULL,
+    passifs INTEGER NOT NULL,
+    detracteurs INTEGER NOT NULL,
+    PRIMARY KEY (day, club)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_counts_day ON daily_counts (day);
+
+CREATE TABLE IF NOT EXISTS daily_scores (
+    day TEXT NOT NULL,
+    club TEXT NOT NULL,
+    metric_id TEXT NOT NULL,
+    score_sum INTEGER NOT NULL,
+    score_count INTEGER NOT NULL,
+    score_sumsq INTEGER NOT NULL,
+    PRIMARY KEY (day, club, metric_id)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_scores_day ON daily_scores (day);
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    source TEXT PRIMARY KEY,
+    last_timestamp TEXT,
+    byte_offset INTEGER NOT NULL DEFAULT 0,
+    rows_ingested INTEGER NOT NULL DEFAULT 0,
+    last_row BLOB
+);
+"""
+
+
+class AggregateStore:
+    """
+    Stockage SQLite local des agrégats journaliers par club, alimenté de façon incrémentale
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+            # Stockages créés avant l'ajout de la dernière ligne ingérée
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(watermarks)")}
+            if 'last_row' not in columns:
+                conn.execute("ALTER TABLE watermarks ADD COLUMN last_row BLOB")
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        # Une connexion par opération : Streamlit exécute les sessions dans des threads distincts
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_watermark(self, source: str) -> Dict:
+        """
+        Dernier horodatage ingéré, position dans le fichier, nombre de lignes
+        et octets de la dernière ligne ingérée pour une source
+        """
+        with self.connect() as conn:
+            row = conn.execute(
+                "SELECT last_timestamp, byte_offset, rows_ingested, last_row FROM watermarks WHERE source = ?",
+                (source,)
+            ).fetchone()
+        if row is None:
+            return {'last_timestamp': None, 'byte_offset': 0, 'rows_ingested': 0, 'last_row': None}
+        return {
+            'last_timestamp': pd.Timestamp(row[0]) if row[0] else None,
+            'byte_offset': row[1],
+            'rows_ingested': row[2],
+            'last_row': row[3]
+        }
+
+    def upsert(self, counts: pd.DataFrame, scores: pd.DataFrame, source: str,
+               last_timestamp: Optional[pd.Timestamp], byte_offset: int, rows: int,
+               expected_offset: int = 0, last_row: Optional[bytes] = None) -> bool:
+        """
+        Ajoute les agrégats d'un lot aux agrégats existants et avance le watermark,
+        dans une seule transaction. Le lot est ignoré (retourne False) si le watermark
+        n'est plus à `expected_offset` : une ingestion concurrente l'a déjà compté.
+        """
+        with self.connect() as conn:
+            # Verrou d'écriture pris avant la relecture du watermark
+            conn.execute("BEGIN IMMEDIATE")
+            current = conn.execute("SELECT byte_offset FROM watermarks WHERE source = ?", (source,)).fetchone()
+            if (current[0] if current is not None else 0) != expected_offset:
+                return False
+            conn.executemany(
+                """
+                INSERT INTO daily_counts (day, club, total, promoteurs, passifs, detracteurs)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (day, club) DO UPDATE SET
+                    total = total + excluded.total,
+                    promoteurs = promoteurs + excluded.promoteurs,
+                    passifs = passifs + excluded.passifs,
+                    detracteurs = detracteurs + excluded.detracteurs
+                """,
+                counts[['day', 'club'] + COUNT_COLUMNS].itertuples(index=False, name=None)
+            )
+            conn.executemany(
+                """
+                INSERT INTO daily_scores (day, club, metric_id, score_sum, score_count, score_sumsq)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (day, club, metric_id) DO UPDATE SET
+                    score_sum = score_sum + excluded.score_sum,
+                    score_count = score_count + excluded.score_count,
+                    score_sumsq = score_sumsq + excluded.score_sumsq
+                """,
+                scores[['day', 'club', 'metric_id', 'score_sum', 'score_count', 'score_sumsq']].itertuples(index=False, name=None)
+            )
+            conn.execute(
+                """
+                INSERT INTO watermarks (source, last_timestamp, byte_offset, rows_ingested, last_row)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (source) DO UPDATE SET
+                    last_timestamp = excluded.last_timestamp,
+                    byte_offset = excluded.byte_offset,
+                    rows_ingested = rows_ingested + excluded.rows_ingested,
+                    last_row = COALESCE(excluded.last_row, last_row)
+                """,
+                (source, last_timestamp.isoformat() if last_timestamp is not None else None, byte_offset, rows, last_row)
+            )
+        return True
+
+    def version(self) -> str:
+        """
+        Version des données : change à chaque lot ingéré
+        """
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT source, last_timestamp, rows_ingested FROM watermarks ORDER BY source"
+            ).fetchall()
+        return hashlib.sha1(repr(rows).encode()).hexdigest()[:16]
+
+    def clubs(self) -> List[str]:
+        with self.connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT club FROM daily_counts ORDER BY club")]
+
+    def load_rollup(self, clubs: Optional[List[str]] = None, start: Optional[pd.Timestamp] = None) -> DailyRollup:
+        """
+        Reconstruit l'agrégat journalier (tous clubs confondus ou restreint à `clubs`)
+        à partir des agrégats stockés
+        """
+        conditions, params = [], []
+        if clubs:
+            conditions.append(f"club IN ({', '.join('?' * len(clubs))})")
+            params.extend(clubs)
+        if start is not None:
+            conditions.append("day >= ?")
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.connect() as conn:
+            counts = pd.read_sql_query(
+                f"""
+                SELECT day, SUM(total) AS total, SUM(promoteurs) AS promoteurs,
+                       SUM(passifs) AS passifs, SUM(detracteurs) AS detracteurs
+                FROM daily_counts {where} GROUP BY day ORDER BY day
+                """,
+                conn, params=params
+            )
+            scores = pd.read_sql_query(
+                f"""
+                SELECT day, metric_id, SUM(score_sum) AS score_sum,
+                       SUM(score_count) AS score_count, SUM(score_sumsq) AS score_sumsq
+                FROM daily_scores {where} GROUP BY day, metric_id ORDER BY day
+                """,
+                conn, params=params
+            )
+
+        counts = counts.set_index(pd.DatetimeIndex(pd.to_datetime(counts.pop('day')), name='Date'))
+        scores['day'] = pd.to_datetime(scores['day'])
+        metric_ids = [m.metric_id for m in SERVICE_METRICS if m.metric_id in set(scores['metric_id'])]
+        pivots = {
+            column: scores.pivot(index='day', columns='metric_id', values=column)
+            .reindex(index=counts.index, columns=metric_ids).fillna(0).astype('int64').rename_axis(columns=None)
+            for column in ['score_sum', 'score_count', 'score_sumsq']
+        }
+
+        return DailyRollup(
+            counts=counts[COUNT_COLUMNS].astype('int64'),
+            score_sums=pivots['score_sum'],
+            score_counts=pivots['score_count'],
+            score_sumsq=pivots['score_sumsq'],
+            version=self.version()
+        )
@@ -0,0 +1,418 @@
+# src/utils/anomalies.py
+# Détection incrémentale des baisses de NPS et de notes de service, par club.
+# Chaque série (club x métrique) garde un état de taille fixe : moyenne et moment
+# d'ordre 2 par réponse en moyenne mobile exponentielle (EWMA), et un CUSUM des
+# écarts standardisés à la baisse. Les jours peu renseignés sont cumulés jusqu'à
+# atteindre un effectif minimum avant d'être testés. Chaque nouveau jour complet met l'état à jour
+# en O(1) par série ; les alertes sont ajoutées à un journal JSON (une ligne par alerte).
+# Les notes de service d'un club sont testées ensemble : leur seuil est relevé pour que
+# la famille ne déclenche pas plus de fausses alertes que la seule série du NPS.
+import argparse
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from utils.config import CONFIG_FILE, ConfigStore, get_config, use_config
+from utils.rollup import DailyRollup
+from utils.schema import METRICS_BY_ID, SERVICE_METRICS
+
+# Série du score NPS (les autres séries portent l'identifiant de la métrique de service)
+NPS_SERIES = 'nps'
+
+# Un seul passage de mise à jour à la fois par processus (état et journal sur disque)
+_detector_lock = threading.Lock()
+
+
+def series_label(metric_id: str) -> str:
+    return "NPS" if metric_id == NPS_SERIES else METRICS_BY_ID[metric_id].display_name
+
+
+@dataclass(frozen=True)
+class AnomalyParameters:
+    """
+    Réglages du détecteur : demi-vie de l'EWMA (jours), tolérance k et seuil h du CUSUM
+    (en écarts-types de la moyenne testée), jours d'historique avant la première alerte
+    et réponses minimum cumulées (sur un ou plusieurs jours) avant un test du CUSUM
+    """
+    halflife: float = 28
+    slack: float = 0.5
+    threshold: float = 5.0
+    warmup: int = 14
+    min_responses: int = 20
+
+    @property
+    def alpha(self) -> float:
+        return 1 - 0.5 ** (1 / self.halflife)
+
+    @classmethod
+    def from_config(cls) -> 'AnomalyParameters':
+        return cls(
+            halflife=get_config('ANOMALY_HALFLIFE', 28),
+            slack=get_config('ANOMALY_SLACK', 0.5),
+            threshold=get_config('ANOMALY_THRESHOLD', 5.0),
+            warmup=get_config('ANOMALY_WARMUP', 14),
+            min_responses=get_config('ANOMALY_MIN_RESPONSES', 20)
+        )
+
+
+def average_run_length(slack: float, threshold: float) -> float:
+    """
+    Durée moyenne (en tests) avant une fausse alerte d'un CUSUM unilatéral sur des écarts
+    standardisés sans dérive (approximation de Siegmund)
+    """
+    b = threshold + 1.166
+    if slack == 0:
+        return b ** 2
+    return (np.exp(2 * slack * b) - 2 * slack * b - 1) / (2 * slack ** 2)
+
+
+def family_threshold(slack: float, threshold: float, n_series: int) -> float:
+    """
+    Seuil d'une famille de `n_series` séries testées ensemble (correction de Bonferroni) :
+    chaque série a une durée moyenne avant fausse alerte `n_series` fois plus longue
+    """
+    if n_series <= 1:
+        return threshold
+    target = n_series * average_run_length(slack, threshold)
+    low, high = threshold, threshold + 1.0
+    while average_run_length(slack, high) < target:
+        high += high - threshold
+    for _ in range(60):
+        middle = (low + high) / 2
+        low, high = (middle, high) if average_run_length(slack, middle) < target else (low, middle)
+    return high
+
+
+def series_thresholds(params: AnomalyParameters, metrics: List[str]) -> np.ndarray:
+    """
+    Seuil du CUSUM de chaque métrique : celui configuré pour le NPS,
+    le seuil de famille des notes de service pour les autres
+    """
+    services = sum(metric != NPS_SERIES for metric in metrics)
+    service_threshold = family_threshold(params.slack, params.threshold, services)
+    return np.array([params.threshold if metric == NPS_SERIES else service_threshold for metric in metrics])
+
+
+@dataclass(frozen=True)
+class Alert:
+    """
+    Baisse significative d'une série un jour donné
+    """
+    day: str
+    club: str
+    metric_id: str
+    value: float     # moyenne des réponses testées (jour, et jours précédents cumulés)
+    expected: float  # moyenne EWMA avant ce jour
+    zscore: float    # écart standardisé de la moyenne testée
+    cusum: float     # CUSUM au déclenchement
+    responses: int
+
+    @property
+    def label(self) -> str:
+        return series_label(self.metric_id)
+
+
+@dataclass
+class DetectorState:
+    """
+    État du détecteur : tableaux (clubs, métriques) et dernier jour traité
+    """
+    source: str
+    clubs: List[str]
+    metrics: List[str]
+    mean: np.ndarray     # EWMA de la moyenne par réponse
+    second: np.ndarray   # EWMA du moment d'ordre 2 par réponse
+    cusum: np.ndarray    # CUSUM des baisses
+    days: np.ndarray     # jours observés
+    alarm: np.ndarray    # baisse en cours déjà signalée
+    pending_n: np.ndarray    # réponses cumulées pas encore testées
+    pending_sum: np.ndarray  # somme de ces réponses
+    last_day: Optional[pd.Timestamp] = None
+
+    @classmethod
+    def empty(cls, source: str, metrics: Optional[List[str]] = None) -> 'DetectorState':
+        metrics = [NPS_SERIES] + [m.metric_id for m in SERVICE_METRICS] if metrics is None else metrics
+        shape = (0, len(metrics))
+        return cls(source, [], metrics, np.zeros(shape), np.zeros(shape), np.zeros(shape),
+                   np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=bool), np.zeros(shape), np.zeros(shape))
+
+    def ensure_club(self, club: str) -> int:
+        """Position du club, ajouté avec un état vierge s'il est nouveau"""
+        if club not in self.clubs:
+            self.clubs.append(club)
+            for name in ['mean', 'second', 'cusum', 'days', 'alarm', 'pending_n', 'pending_sum']:
+                array = getattr(self, name)
+                setattr(self, name, np.vstack([array, np.zeros((1, array.shape[1]), dtype=array.dtype)]))
+        return self.clubs.index(club)
+
+    def to_dict(self) -> Dict:
+        return {
+            'source': self.source,
+            'clubs': self.clubs,
+            'metrics': self.metrics,
+            'mean': self.mean.tolist(),
+            'second': self.second.tolist(),
+            'cusum': self.cusum.tolist(),
+            'days': self.days.tolist(),
+            'alarm': self.alarm.tolist(),
+            'pending_n': self.pending_n.tolist(),
+            'pending_sum': self.pending_sum.tolist(),
+            'last_day': None if self.last_day is None else self.last_day.strftime('%Y-%m-%d')
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DetectorState':
+        shape = (len(data['clubs']), len(data['metrics']))
+        return cls(
+            data['source'],
+            list(data['clubs']),
+            list(data['metrics']),
+            np.array(data['mean'], dtype=float).reshape(shape),
+            np.array(data['second'], dtype=float).reshape(shape),
+            np.array(data['cusum'], dtype=float).reshape(shape),
+            np.array(data['days'], dtype=np.int64).reshape(shape),
+            np.array(data['alarm'], dtype=bool).reshape(shape),
+            # États enregistrés avant le cumul des jours peu renseignés
+            np.array(data.get('pending_n', np.zeros(shape)), dtype=float).reshape(shape),
+            np.array(data.get('pending_sum', np.zeros(shape)), dtype=float).reshape(shape),
+            None if data['last_day'] is None else pd.Timestamp(data['last_day'])
+        )
+
+
+def load_state(path: Optional[str], source: str) -> DetectorState:
+    """
+    État enregistré, ou état vierge (fichier absent, illisible ou d'une autre source)
+    """
+    if path and Path(path).exists():
+        try:
+            state = DetectorState.from_dict(json.loads(Path(path).read_text(encoding='utf-8')))
+            if state.source == source:
+                return state
+        except (OSError, ValueError, KeyError):
+            pass
+    return DetectorState.empty(source)
+
+
+def save_state(path: Optional[str], state: DetectorState):
+    """
+    Enregistre l'état (remplacement atomique)
+    """
+    if not path:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state.to_dict()), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def daily_observations(rollup: DailyRollup, metrics: List[str], start: Optional[pd.Timestamp],
+                       end: pd.Timestamp) -> Dict[str, pd.DataFrame]:
+    """
+    Moyenne, moment d'ordre 2 et effectif par réponse de chaque série, pour les jours
+    de ]start, end] (une ligne par jour, une colonne par métrique)
+    """
+    counts = rollup.counts
+    days = counts.index[(counts.index <= end) & ((counts.index > start) if start is not None else True)]
+    counts = counts.loc[days]
+    services = [m for m in metrics if m != NPS_SERIES and m in rollup.score_sums.columns]
+
+    n = pd.DataFrame(0, index=days, columns=metrics, dtype='float64')
+    total = pd.DataFrame(0.0, index=days, columns=metrics)
+    squares = pd.DataFrame(0.0, index=days, columns=metrics)
+    if NPS_SERIES in metrics:
+        # Réponse : +100 (promoteur), 0 (passif), -100 (détracteur)
+        n[NPS_SERIES] = counts['total']
+        total[NPS_SERIES] = (counts['promoteurs'] - counts['detracteurs']) * 100.0
+        squares[NPS_SERIES] = (counts['promoteurs'] + counts['detracteurs']) * 100.0 ** 2
+    n[services] = rollup.score_counts.loc[days, services]
+    total[services] = rollup.score_sums.loc[days, services]
+    squares[services] = rollup.score_sumsq.loc[days, services]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'n': n, 'mean': total / n, 'second': squares / n}
+
+
+def update_detector(state: DetectorState, rollups: Dict[str, DailyRollup], through: pd.Timestamp,
+                    params: Optional[AnomalyParameters] = None) -> List[Alert]:
+    """
+    Intègre les jours complets postérieurs au dernier jour traité, jusqu'à `through` inclus.
+    Chaque jour met à jour toutes les séries en une opération vectorisée (O(1) par série).
+    """
+    params = params or AnomalyParameters()
+    through = pd.Timestamp(through).normalize()
+    if state.last_day is not None and state.last_day >= through:
+        return []
+
+    rows = {club: state.ensure_club(club) for club in rollups}
+    thresholds = series_thresholds(params, state.metrics)
+    observations = {club: daily_observations(rollup, state.metrics, state.last_day, through) for club, rollup in rollups.items()}
+    days = sorted(set().union(*(obs['n'].index for obs in observations.values()))) if observations else []
+
+    # Observations empilées (jours, clubs, métriques), zéro réponse les jours sans données
+    shape = (len(days), len(state.clubs), len(state.metrics))
+    n, mean, second = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    day_index = pd.DatetimeIndex(days)
+    for club, obs in observations.items():
+        positions = day_index.get_indexer(obs['n'].index)
+        n[positions, rows[club]] = obs['n'].to_numpy()
+        mean[positions, rows[club]] = np.nan_to_num(obs['mean'].to_numpy())
+        second[positions, rows[club]] = np.nan_to_num(obs['second'].to_numpy())
+
+    alerts = []
+    for d, day in enumerate(days):
+        observed = n[d] > 0
+        # Jours peu renseignés cumulés avec les suivants : une série n'est testée
+        # qu'une fois l'effectif minimum atteint (ils alimentent l'EWMA dans tous les cas)
+        state.pending_n = state.pending_n + n[d]
+        state.pending_sum = state.pending_sum + n[d] * mean[d]
+        ready = state.pending_n >= max(params.min_responses, 1)
+        warm = observed & ready & (state.days >= params.warmup)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tested = np.where(ready, state.pending_sum / np.where(ready, state.pending_n, 1), 0.0)
+            variance = np.maximum(state.second - state.mean ** 2, 1e-9)
+            z = np.where(warm, (tested - state.mean) / np.sqrt(variance / np.where(ready, state.pending_n, 1)), 0.0)
+        # CUSUM des baisses : accumule les écarts négatifs au-delà de la tolérance
+        cusum = np.where(warm, np.maximum(0.0, state.cusum - z - params.slack), state.cusum)
+        # Une alerte par épisode : la série est réarmée quand le CUSUM revient à zéro
+        fired = warm & (cusum > thresholds) & ~state.alarm
+        for c, m in zip(*np.nonzero(fired)):
+            alerts.append(Alert(
+                day=day.strftime('%Y-%m-%d'),
+                club=state.clubs[c],
+                metric_id=state.metrics[m],
+                value=round(float(tested[c, m]), 2),
+                expected=round(float(state.mean[c, m]), 2),
+                zscore=round(float(z[c, m]), 2),
+                cusum=round(float(cusum[c, m]), 2),
+                responses=int(state.pending_n[c, m])
+            ))
+        state.cusum = cusum
+        state.alarm = (state.alarm | fired) & (cusum > 0)
+        state.pending_n = np.where(ready, 0.0, state.pending_n)
+        state.pending_sum = np.where(ready, 0.0, state.pending_sum)
+
+        # EWMA, moyenne simple tant que l'historique est plus court que la mémoire de l'EWMA
+        weight = np.maximum(params.alpha, 1.0 / (state.days + 1))
+        state.mean = np.where(observed, state.mean + weight * (mean[d] - state.mean), state.mean)
+        state.second = np.where(observed, state.second + weight * (second[d] - state.second), state.second)
+        state.days = state.days + observed
+
+    # Jours traités jusqu'au dernier jour observé : des réponses ingérées plus tard
+    # pour les jours suivants seront encore prises en compte
+    if days:
+        state.last_day = days[-1]
+    return alerts
+
+
+def append_alerts(path: Optional[str], alerts: List[Alert]):
+    """
+    Ajoute les alertes au journal (une ligne JSON par alerte)
+    """
+    if not path or not alerts:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for alert in alerts:
+            f.write(json.dumps(asdict(alert), ensure_ascii=False) + '\n')
+
+
+def read_alerts(path: Optional[str], since: Optional[pd.Timestamp] = None) -> List[Alert]:
+    """
+    Alertes du journal, des plus récentes aux plus anciennes (à partir du jour `since`).
+    Une série ne compte qu'une alerte par jour (état réinitialisé puis rejoué).
+    """
+    if not path or not Path(path).exists():
+        return []
+    since = None if since is None else pd.Timestamp(since).strftime('%Y-%m-%d')
+    alerts = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                alert = Alert(**json.loads(line))
+            except (ValueError, TypeError):
+                continue
+            if since is None or alert.day >= since:
+                alerts[(alert.day, alert.club, alert.metric_id)] = alert
+    return sorted(alerts.values(), key=lambda a: a.day, reverse=True)
+
+
+def default_state_path(log_path: str) -> str:
+    """
+    État conservé à côté du journal quand aucun chemin n'est configuré
+    (journal.jsonl -> journal.state.json)
+    """
+    path = Path(log_path)
+    return str(path.with_name(f"{path.stem}.state.json"))
+
+
+def run_detection(source: str, clubs: List[str], load_rollup: Callable[[str, Optional[pd.Timestamp]], DailyRollup],
+                  through: pd.Timestamp, state_path: Optional[str] = None, log_path: Optional[str] = None,
+                  params: Optional[AnomalyParameters] = None) -> List[Alert]:
+    """
+    Met à jour l'état enregistré avec les nouveaux jours complets et journalise les alertes.
+    `load_rollup(club, start)` fournit l'agrégat du club, au moins à partir du jour `start`.
+    Un journal sans état conservé recevrait à chaque passage les alertes de tout l'historique :
+    l'état est alors enregistré à côté du journal (default_state_path).
+    Retourne les nouvelles alertes.
+    """
+    if log_path and not state_path:
+        state_path = default_state_path(log_path)
+    with _detector_lock:
+        state = load_state(state_path, source)
+        start = None if state.last_day is None else state.last_day + pd.Timedelta(days=1)
+        alerts = update_detector(state, {club: load_rollup(club, start) for club in clubs}, through, params)
+        save_state(state_path, state)
+        append_alerts(log_path, alerts)
+    return alerts
+
+
+if __name__ == '__main__':
+    from utils.aggregate_store import AggregateStore
+    from utils.ingestion import ingest_export
+    from utils.network import NETWORK_LABEL
+    from utils.parquet_store import ParquetResponseStore
+    from utils.snapshot import source_rollups
+
+    parser = argparse.ArgumentParser(description="Met à jour la détection des baisses de NPS et de notes de service")
+    parser.add_argument('--through', help="Dernier jour complet à intégrer (AAAA-MM-JJ) ; hier par défaut")
+    parser.add_argument('--config', default=CONFIG_FILE, help="Fichier de configuration enregistré")
+    args = parser.parse_args()
+
+    use_config(ConfigStore(args.config))
+    export_path = get_config('RESPONSES_EXPORT')
+    if export_path:
+        # Export ingéré puis seuls les jours postérieurs à l'état relus dans le stockage
+        store = AggregateStore(get_config('AGGREGATE_STORE', 'data/nps_aggregates.sqlite'))
+        parquet_root = get_config('RESPONSES_PARQUET')
+        ingest_export(store, export_path, raw_store=ParquetResponseStore(parquet_root) if parquet_root else None)
+        clubs = [NETWORK_LABEL] + store.clubs()
+
+        def load_rollup(club: str, start: Optional[pd.Timestamp]) -> DailyRollup:
+            return store.load_rollup(None if club == NETWORK_LABEL else [club], start=start)
+    else:
+        # Jeu de test : généré en mémoire
+        rollups = source_rollups()
+        clubs = list(rollups)
+
+        def load_rollup(club: str, start: Optional[pd.Timestamp]) -> DailyRollup:
+            return rollups[club]
+
+    through = pd.Timestamp(args.through) if args.through else pd.Timestamp.now().normalize() - pd.Timedelta(days=1)
+    alerts = run_detection(
+        export_path or 'test_data',
+        clubs,
+        load_rollup,
+        through,
+        get_config('ANOMALY_STATE'),
+        get_config('ANOMALY_LOG'),
+        AnomalyParameters.from_config()
+    )
+    for alert in alerts:
+        print(f"{alert.day} {alert.club} — {alert.label} : {alert.value} (attendu {alert.expected}, z = {alert.zscore})")
+    print(f"{len(alerts)} nouvelles alertes")
@@ -0,0 +1,114 @@
+# src/utils/cache.py
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple
+import pandas as pd
+
+
+class LRUCache:
+    """
+    Cache LRU borné en nombre d'entrées, avec expiration optionnelle (TTL en secondes)
+    """
+
+    def __init__(self, max_entries: int = 16, ttl: Optional[float] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clé -> (horodatage d'insertion, valeur)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+            # Entrée expirée
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Récupère une valeur (et la marque comme récemment utilisée)"""
+        entry = self._lookup(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """Insère une valeur en évinçant les entrées les moins récemment utilisées"""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Retourne la valeur en cache ou la calcule puis la mémorise"""
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry[1]
+        value = compute()
+        self.set(key, value)
+        return value
+
+    def resize(self, max_entries: int, ttl: Optional[float] = None):
+        """Met à jour les bornes du cache"""
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def discard(self, key: Hashable):
+        """Supprime une entrée (sans effet si elle est absente)"""
+        self._entries.pop(key, None)
+
+    def invalidate(self, kinds: Optional[Iterable[Hashable]] = None) -> int:
+        """
+        Supprime les entrées dont la clé commence par l'un des `kinds` (toutes si None).
+        Retourne le nombre d'entrées supprimées.
+        """
+        if kinds is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        kinds = set(kinds)
+        stale = [key for key in self._entries if isinstance(key, tuple) and key and key[0] in kinds]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+
+def cached_call(cache: Optional[LRUCache], key: Hashable, compute: Callable[[], Any]) -> Any:
+    """
+    Calcule via le cache s'il est fourni, directement sinon
+    """
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(key, compute)
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Empreinte (version) d'un jeu de données, calculée une fois au chargement
+    """
+    digest = hashlib.sha1()
+    digest.update(str(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def load_dataset(cache: Optional[LRUCache], loader_key: Hashable, loader: Callable[[], pd.DataFrame]) -> Tuple[str, pd.DataFrame]:
+    """
+    Charge un jeu de données via le cache et retourne (version, DataFrame)
+    """
+    def _load():
+        df = loader()
+        return dataset_fingerprint(df), df
+
+    return cached_call(cache, ('dataset', loader_key), _load)
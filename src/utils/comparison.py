@@ -0,0 +1,113 @@
+# src/utils/comparison.py
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from utils.rollup import DailyRollup
+from utils.windows import parse_period_days, period_window, window_positions
+
+
+@dataclass(frozen=True)
+class ComparisonWindows:
+    """
+    Fenêtre actuelle et fenêtre de référence à comparer, au jour près.
+    Les deux fenêtres sont semi-ouvertes [début, fin) et de même nombre de jours.
+    """
+    current_start: pd.Timestamp
+    current_end: pd.Timestamp
+    previous_start: pd.Timestamp
+    previous_end: pd.Timestamp
+
+    @property
+    def days(self) -> int:
+        return (self.current_end - self.current_start).days
+
+    def labelled(self) -> List[Tuple[str, pd.Timestamp, pd.Timestamp]]:
+        return [
+            ('previous', self.previous_start, self.previous_end),
+            ('current', self.current_start, self.current_end)
+        ]
+
+
+def _period_days(period: str, end_date: Optional[pd.Timestamp]) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Jours de la période sous forme semi-ouverte [premier jour, lendemain du dernier jour)
+    """
+    start_date, end_date = period_window(period, end_date)
+    return start_date, end_date.normalize() + pd.Timedelta(days=1)
+
+
+def midpoint_split(period: str, end_date: Optional[pd.Timestamp] = None) -> ComparisonWindows:
+    """
+    Seconde moitié de la période comparée à la première moitié (même nombre de jours :
+    sur une période impaire, le jour le plus ancien n'est pas comparé)
+    """
+    _, end = _period_days(period, end_date)
+    half = pd.Timedelta(days=parse_period_days(period) // 2)
+    return ComparisonWindows(end - half, end, end - 2 * half, end - half)
+
+
+def previous_period(period: str, end_date: Optional[pd.Timestamp] = None) -> ComparisonWindows:
+    """
+    Période complète comparée à la période précédente de même durée
+    """
+    start, end = _period_days(period, end_date)
+    return ComparisonWindows(start, end, start - (end - start), start)
+
+
+def year_over_year(period: str, end_date: Optional[pd.Timestamp] = None) -> ComparisonWindows:
+    """
+    Période complète comparée à la même période un an plus tôt (même nombre de jours)
+    """
+    start, end = _period_days(period, end_date)
+    previous_start = start - pd.DateOffset(years=1)
+    return ComparisonWindows(start, end, previous_start, previous_start + (end - start))
+
+
+# Modes de comparaison proposés dans le tableau de bord
+COMPARISON_MODES = {
+    'Première moitié de la période': midpoint_split,
+    'Période précédente': previous_period,
+    'Même période l\'an dernier': year_over_year
+}
+
+
+def compare_service_metrics(rollup: DailyRollup, windows: ComparisonWindows, with_stderr: bool = False) -> pd.DataFrame:
+    """
+    Moyennes actuelle / précédente, écart et effectifs de toutes les métriques
+    de service, en une seule agrégation groupée sur les jours étiquetés.
+    Une ligne par métrique (index : identifiant de la métrique).
+    """
+    stacked = pd.concat(
+        {'sum': rollup.score_sums, 'n': rollup.score_counts, 'sq': rollup.score_sumsq},
+        axis=1
+    )
+
+    # Étiquetage des jours de chaque fenêtre (bornes par recherche dichotomique)
+    labels = np.full(len(stacked), None, dtype=object)
+    for label, start, end in windows.labelled():
+        lo, hi = window_positions(stacked, start, end, closed='left')
+        labels[lo:hi] = label
+
+    totals = stacked.groupby(labels).sum().reindex(['current', 'previous'], fill_value=0)
+    sums, counts, squares = totals['sum'], totals['n'], totals['sq']
+    means = sums / counts.where(counts > 0)
+
+    result = pd.DataFrame({
+        'current_mean': means.loc['current'],
+        'previous_mean': means.loc['previous'],
+        'current_n': counts.loc['current'].astype('int64'),
+        'previous_n': counts.loc['previous'].astype('int64')
+    })
+    result['delta'] = result['current_mean'] - result['previous_mean']
+
+    if with_stderr:
+        # Erreur standard de la moyenne (variance échantillon corrigée)
+        variances = (squares - counts * means ** 2) / (counts - 1).where(counts > 1)
+        stderr = np.sqrt(variances.clip(lower=0) / counts.where(counts > 0))
+        result['current_se'] = stderr.loc['current']
+        result['previous_se'] = stderr.loc['previous']
+        result['delta_se'] = np.sqrt(result['current_se'] ** 2 + result['previous_se'] ** 2)
+
+    result.index.name = 'metric_id'
+    return result
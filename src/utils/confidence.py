@@ -0,0 +1,98 @@
+# src/utils/confidence.py
+from statistics import NormalDist
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Pseudo-comptes (promoteurs, passifs, détracteurs) de l'intervalle de Wald ajusté du NPS :
+# une période à 1 ou 2 réponses identiques ne doit pas afficher un intervalle de largeur nulle
+ADJUSTMENT = np.array([0.75, 1.5, 0.75])
+
+CI_METHODS = ['analytic', 'bootstrap']
+
+
+def z_value(level: float = 0.95) -> float:
+    """
+    Quantile de la loi normale pour un niveau de confiance bilatéral
+    """
+    return NormalDist().inv_cdf(0.5 + level / 2)
+
+
+def _category_counts(promoters, passives, detractors) -> np.ndarray:
+    return np.column_stack([
+        np.asarray(promoters, dtype='float64'),
+        np.asarray(passives, dtype='float64'),
+        np.asarray(detractors, dtype='float64')
+    ])
+
+
+def nps_intervals_analytic(promoters, passives, detractors, level: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bornes de l'intervalle de confiance du NPS (Wald ajusté), pour toutes les périodes à la fois.
+    NaN pour les périodes sans réponse.
+    """
+    counts = _category_counts(promoters, passives, detractors)
+    n = counts.sum(axis=1)
+    adjusted = counts + ADJUSTMENT
+    p, _, d = (adjusted / adjusted.sum(axis=1, keepdims=True)).T
+
+    center = (p - d) * 100
+    margin = z_value(level) * np.sqrt((p + d - (p - d) ** 2) / (n + ADJUSTMENT.sum())) * 100
+    low = np.where(n > 0, np.clip(center - margin, -100, 100), np.nan)
+    high = np.where(n > 0, np.clip(center + margin, -100, 100), np.nan)
+    return low, high
+
+
+def nps_intervals_bootstrap(promoters, passives, detractors, level: float = 0.95,
+                            n_resamples: int = 1000, seed: Optional[int] = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bornes de l'intervalle de confiance du NPS par bootstrap : tous les rééchantillonnages
+    de toutes les périodes sont tirés en un seul appel multinomial (n_resamples x périodes x 3),
+    selon les proportions observées de chaque période (sans les pseudo-comptes du Wald ajusté)
+    """
+    counts = _category_counts(promoters, passives, detractors)
+    n = counts.sum(axis=1).astype('int64')
+    # Périodes sans réponse : proportions quelconques (0 tirage, bornes remplacées par NaN)
+    pvals = np.divide(counts, n[:, None], out=np.full_like(counts, 1 / 3), where=n[:, None] > 0)
+
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(n, pvals, size=(n_resamples, len(n)))
+    scores = (draws[..., 0] - draws[..., 2]) / np.maximum(n, 1) * 100
+
+    low, high = np.quantile(scores, [(1 - level) / 2, (1 + level) / 2], axis=0)
+    return np.where(n > 0, low, np.nan), np.where(n > 0, high, np.nan)
+
+
+def nps_intervals(promoters, passives, detractors, level: float = 0.95, method: str = 'analytic',
+                  n_resamples: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Intervalles de confiance du NPS selon la méthode configurée ('analytic' ou 'bootstrap')
+    """
+    if method == 'bootstrap':
+        return nps_intervals_bootstrap(promoters, passives, detractors, level, n_resamples)
+    if method != 'analytic':
+        raise ValueError(f"Méthode d'intervalle inconnue : {method} (attendu : {', '.join(CI_METHODS)})")
+    return nps_intervals_analytic(promoters, passives, detractors, level)
+
+
+def mean_intervals(sums: pd.DataFrame, counts: pd.DataFrame, sumsq: pd.DataFrame,
+                   level: float = 0.95) -> pd.DataFrame:
+    """
+    Moyenne et intervalle de confiance de chaque note de service à partir des agrégats
+    (sommes, effectifs, sommes des carrés), pour toutes les périodes et métriques à la fois.
+    Une ligne par (période, métrique) : mean, low, high, n.
+    """
+    s = sums.to_numpy(dtype='float64')
+    n = counts.to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where(n > 0, s / n, np.nan)
+        variances = np.where(n > 1, (sumsq.to_numpy(dtype='float64') - n * means ** 2) / (n - 1), np.nan)
+        margin = z_value(level) * np.sqrt(np.clip(variances, 0, None) / n)
+
+    index = pd.MultiIndex.from_product([sums.index, sums.columns], names=[sums.index.name, 'metric_id'])
+    return pd.DataFrame({
+        'mean': means.ravel(),
+        'low': (means - margin).ravel(),
+        'high': (means + margin).ravel(),
+        'n': counts.to_numpy(dtype='int64').ravel()
+    }, index=index)
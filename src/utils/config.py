@@ -1,24 +1,232 @@
 # src/utils/config.py
+import copy
+import json
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
 
 # Paramètres par défaut
 DEFAULT_CONFIG = {
-    'NPS_THRESHOLD': 35,  # Seuil de réponses minimum
+    'NPS_MAX_CI_WIDTH': 50,  # Largeur maximale (points NPS) de l'intervalle de confiance d'une période représentative
+    'CONFIDENCE_LEVEL': 0.95,  # Niveau des intervalles de confiance
+    'CI_METHOD': 'analytic',  # 'analytic' (Wald ajusté) ou 'bootstrap'
+    'BOOTSTRAP_RESAMPLES': 1000,  # Rééchantillonnages de la méthode bootstrap
     'PERIODS': {
         '4 dernières semaines': '28D',
         '8 dernières semaines': '56D',
         '4 derniers mois': '120D',
         '12 derniers mois': '365D'
-    }
+    },
+    'ROLLING_WINDOWS': [7, 28, 90],  # Fenêtres du NPS glissant (jours)
+    'TREND_MAX_BUCKETS': 120,  # Nombre maximum de barres du graphique d'évolution (regroupement élargi au-delà)
+    'RESPONSES_EXPORT': None,  # Export CSV des réponses (Google Forms) ; None = données de test
+    'AGGREGATE_STORE': 'data/nps_aggregates.sqlite',  # Stockage local des agrégats journaliers
+    'RESPONSES_PARQUET': None,  # Réponses brutes en Parquet partitionné par mois ; None = désactivé
+    'SNAPSHOT_PATH': 'data/nps_snapshot.bin',  # Instantané précalculé (python -m utils.snapshot) ; None = désactivé
+    'AS_OF': None,  # Date de référence des calculs (AAAA-MM-JJ) ; None = date de l'instantané ou aujourd'hui
+    'ANOMALY_STATE': None,  # État du détecteur de baisses (python -m utils.anomalies) ; None = à côté du journal, ou non conservé sans journal
+    'ANOMALY_LOG': None,  # Journal des alertes écrit par python -m utils.anomalies (une ligne JSON par alerte) ; None = désactivé
+    'ANOMALY_HALFLIFE': 28,  # Demi-vie (jours) de la moyenne de référence de chaque série
+    'ANOMALY_SLACK': 0.5,  # Tolérance du CUSUM (écarts-types de la moyenne du jour)
+    'ANOMALY_THRESHOLD': 5.0,  # Seuil de déclenchement du CUSUM du NPS (relevé pour la famille des notes de service)
+    'ANOMALY_WARMUP': 14,  # Jours d'historique d'une série avant sa première alerte
+    'ANOMALY_MIN_RESPONSES': 20,  # Réponses minimum cumulées (jours peu renseignés regroupés) avant un test
+    'NETWORK_WORKERS': None,  # Processus de calcul de la vue réseau ; None = nombre de cœurs
+    'CACHE_MAX_ENTRIES': 16,  # Nombre maximum d'entrées en cache par session
+    'CACHE_TTL': 600,  # Durée de vie d'une entrée en cache (secondes)
+    'PERF_TRACING': False,  # Mesure des temps par étape (panneau Performances de la configuration)
+    'PERF_HISTORY': 20,  # Nombre d'exécutions conservées dans le panneau
+    'PERF_LOG': None  # Journal JSON des mesures (une ligne par étape) ; None = désactivé
+}
+
+# Fichier où sont conservés les paramètres modifiés depuis le tableau de bord
+CONFIG_FILE = 'data/dashboard_config.json'
+
+# Paramètres communs à toutes les sessions : leurs modifications sont enregistrées
+# et deviennent la valeur initiale des nouvelles sessions. Les autres (ex. PERF_TRACING)
+# ne valent que pour la session qui les modifie.
+GLOBAL_KEYS = ('NPS_MAX_CI_WIDTH',)
+
+# Paramètres enregistrés par d'anciennes versions, sans équivalent : ignorés au chargement
+# et retirés du fichier au prochain enregistrement. NPS_THRESHOLD était un nombre minimum
+# de réponses par période, non convertible en largeur d'intervalle (NPS_MAX_CI_WIDTH).
+LEGACY_KEYS = ('NPS_THRESHOLD',)
+
+# Enregistrements sérialisés entre les sessions du processus (et entre processus via fcntl)
+_save_lock = threading.Lock()
+
+# Résultats en cache (premier élément des clés du cache de session) à recalculer
+# quand un paramètre change ; None = tous, () = aucun
+CONFIG_DEPENDENCIES = {
+    # Le seuil ne change que le drapeau de représentativité et la légende du graphique
+    'NPS_MAX_CI_WIDTH': ('trend_flags', 'trend_spec'),
+    'CONFIDENCE_LEVEL': ('metrics', 'trend', 'trend_flags', 'trend_spec', 'grid'),
+    'CI_METHOD': ('metrics', 'trend', 'trend_flags', 'trend_spec'),
+    'BOOTSTRAP_RESAMPLES': ('metrics', 'trend', 'trend_flags', 'trend_spec'),
+    'TREND_MAX_BUCKETS': ('trend', 'trend_flags', 'trend_spec'),
+    'PERIODS': (),
+    'ROLLING_WINDOWS': (),
+    'RESPONSES_EXPORT': None,
+    'AGGREGATE_STORE': None,
+    'RESPONSES_PARQUET': None,
+    'SNAPSHOT_PATH': (),  # chemin et date de référence font partie des clés
+    'AS_OF': (),
+    'ANOMALY_STATE': (),  # journal relu quand il est modifié (date de modification dans la clé)
+    'ANOMALY_LOG': (),
+    'ANOMALY_HALFLIFE': (),
+    'ANOMALY_SLACK': (),
+    'ANOMALY_THRESHOLD': (),
+    'ANOMALY_WARMUP': (),
+    'ANOMALY_MIN_RESPONSES': (),
+    'NETWORK_WORKERS': (),
+    'CACHE_MAX_ENTRIES': (),
+    'CACHE_TTL': (),
+    'PERF_TRACING': (),
+    'PERF_HISTORY': (),
+    'PERF_LOG': ()
 }
 
-# Variables globales pour stocker la configuration
-config = DEFAULT_CONFIG.copy()
+
+@dataclass(frozen=True)
+class ConfigChange:
+    """
+    Modification d'un paramètre, transmise aux abonnés
+    """
+    key: str
+    old: Any
+    new: Any
+    version: int
+    affected: Optional[Tuple[str, ...]]  # résultats dépendants (None = tous)
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """
+    Verrou exclusif sur le fichier de configuration (fichier .lock voisin)
+    """
+    with _save_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(path.with_suffix(f"{path.suffix}.lock"), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class ConfigStore:
+    """
+    Configuration versionnée : chaque modification incrémente la version et est notifiée
+    aux abonnés avec les résultats qui en dépendent ; celles des paramètres communs
+    (GLOBAL_KEYS) sont aussi enregistrées sur disque
+    """
+
+    def __init__(self, path: Optional[str] = None, defaults: Optional[Dict] = None):
+        self.path = Path(path) if path else None
+        self.defaults = copy.deepcopy(defaults if defaults is not None else DEFAULT_CONFIG)
+        self.values = copy.deepcopy(self.defaults)
+        self.version = 0
+        self.key_versions: Dict[str, int] = {}
+        self._listeners: Dict[str, Callable[[ConfigChange], None]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def _read_saved(self) -> Dict:
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            saved = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        return saved if isinstance(saved, dict) else {}
+
+    def load(self):
+        """
+        Applique les paramètres enregistrés (clés inconnues, dont LEGACY_KEYS, ignorées)
+        """
+        self.values.update({k: v for k, v in self._read_saved().items() if k in self.defaults})
+
+    def save(self, key: str):
+        """
+        Enregistre la valeur d'un paramètre sous verrou : le fichier est relu et seule
+        cette clé est modifiée (les modifications des autres sessions sont conservées),
+        puis remplacé de façon atomique
+        """
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.path):
+            overrides = self._read_saved()
+            for legacy in LEGACY_KEYS:
+                overrides.pop(legacy, None)
+            if self.values.get(key) == self.defaults.get(key):
+                overrides.pop(key, None)
+            else:
+                overrides[key] = self.values[key]
+            tmp = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(overrides, ensure_ascii=False, indent=2), encoding='utf-8')
+            os.replace(tmp, self.path)
+
+    def get(self, key: str, default=None):
+        return self.values.get(key, default)
+
+    def update(self, key: str, value: Any) -> Optional[ConfigChange]:
+        """
+        Modifie un paramètre ; retourne la modification notifiée (None si la valeur est inchangée)
+        """
+        with self._lock:
+            old = self.values.get(key)
+            if old == value:
+                return None
+            self.values[key] = value
+            self.version += 1
+            self.key_versions[key] = self.version
+            change = ConfigChange(key, old, value, self.version, CONFIG_DEPENDENCIES.get(key))
+            if key in GLOBAL_KEYS:
+                self.save(key)
+        for listener in list(self._listeners.values()):
+            listener(change)
+        return change
+
+    def subscribe(self, name: str, listener: Callable[[ConfigChange], None]):
+        """
+        Abonne (ou remplace) un écouteur nommé aux modifications
+        """
+        self._listeners[name] = listener
+
+
+# Configuration du processus (valeurs par défaut), utilisée hors session Streamlit
+_process_config = ConfigStore()
+
+# Configuration de la session en cours (chaque session Streamlit s'exécute dans son propre thread)
+_active_config: ContextVar[Optional[ConfigStore]] = ContextVar('nps_active_config', default=None)
+
+
+def use_config(store: ConfigStore):
+    """Active la configuration d'une session pour le thread courant"""
+    _active_config.set(store)
+
+
+def active_config() -> ConfigStore:
+    """Configuration de la session en cours, ou celle du processus"""
+    return _active_config.get() or _process_config
+
 
 def get_config(key: str, default=None):
     """Récupère une valeur de configuration"""
-    return config.get(key, default)
+    return active_config().get(key, default)
 
-def update_config(key: str, value: any):
+def update_config(key: str, value: Any) -> Optional[ConfigChange]:
     """Met à jour une valeur de configuration"""
-    config[key] = value
-    return config
\ No newline at end of file
+    return active_config().update(key, value)
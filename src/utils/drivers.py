@@ -0,0 +1,223 @@
+# src/utils/drivers.py
+from dataclasses import dataclass
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from utils.network import NETWORK_LABEL
+from utils.schema import METRICS_BY_ID, service_columns
+from utils.windows import parse_period_days, period_window
+
+DEFAULT_RIDGE_ALPHA = 1.0
+
+# Réponses par bloc lors de l'accumulation des produits croisés (au plus 2**24 / 500
+# pour des sommes exactes en float32)
+CHUNK_ROWS = 32_768
+
+
+@dataclass(frozen=True)
+class DriverStatistics:
+    """
+    Statistiques suffisantes de l'analyse des leviers, par club et par période.
+    `gram[c, p]` est le produit U'U des réponses du club c sur la période p, avec
+    U = [notes (0 si absente), indicateurs de présence, NPS, NPS², 1].
+    """
+    clubs: List[str]
+    periods: List[str]
+    metric_ids: List[str]
+    gram: np.ndarray  # (clubs, périodes, 2k + 3, 2k + 3)
+
+
+@dataclass(frozen=True)
+class DriverAnalysis:
+    """
+    Résultats de l'analyse des leviers du NPS.
+    `drivers` : une ligne par (Club, Period, metric_id) avec n, correlation,
+    coefficient (ridge standardisée), importance (part de R²) et rank.
+    `fit` : une ligne par (Club, Period) avec n et r2.
+    """
+    drivers: pd.DataFrame
+    fit: pd.DataFrame
+
+    def view(self, club: str, period: str) -> pd.DataFrame:
+        """
+        Leviers d'un club sur une période, du plus au moins important
+        """
+        selected = self.drivers[(self.drivers['Club'] == club) & (self.drivers['Period'] == period)]
+        return selected.sort_values('rank')
+
+
+def driver_statistics(df: pd.DataFrame, periods: List[str], end_date: Optional[pd.Timestamp] = None,
+                      metric_ids: Optional[List[str]] = None, chunk_rows: int = CHUNK_ROWS) -> DriverStatistics:
+    """
+    Accumule les produits croisés de toutes les réponses en un passage : chaque réponse
+    est rangée dans la tranche d'ancienneté (entre deux périodes successives) de son club,
+    puis les périodes emboîtées sont obtenues par somme cumulée des tranches.
+    Les réponses sont lues en int8 et la matrice augmentée n'est construite
+    que par blocs de `chunk_rows` lignes (mémoire bornée quel que soit le volume).
+    """
+    if metric_ids is None:
+        metric_ids = service_columns(df)
+    end_date = pd.Timestamp.now() if end_date is None else pd.Timestamp(end_date)
+    periods = sorted(periods, key=parse_period_days)
+    # Mêmes fenêtres journalières que l'en-tête et la grille (period_window) :
+    # tranche = nombre de périodes dont le premier jour est postérieur à la réponse
+    starts = np.array([period_window(p, end_date)[0].to_datetime64() for p in periods][::-1], dtype='datetime64[ns]')
+    timestamps = df['Horodateur'].to_numpy(dtype='datetime64[ns]')
+    band = len(periods) - np.searchsorted(starts, timestamps, side='right')
+    keep = np.flatnonzero((timestamps <= end_date.to_datetime64()) & (band < len(periods)))
+
+    if 'Club' in df.columns:
+        club_values = df['Club'].astype('category')
+        clubs = [str(c) for c in club_values.cat.categories]
+        club_codes = club_values.cat.codes.to_numpy()
+    else:
+        clubs = [NETWORK_LABEL]
+        club_codes = np.zeros(len(df), dtype=np.int64)
+
+    groups = club_codes[keep].astype(np.int64) * len(periods) + band[keep]
+
+    # Réponses retenues rangées par groupe club x tranche (tri par base sur des codes 16 bits quand ils suffisent)
+    n_groups = len(clubs) * len(periods)
+    order = np.argsort(groups.astype(np.int16 if n_groups < 2 ** 15 else np.int64), kind='stable')
+    groups, rows = groups[order], keep[order]
+    bounds = np.searchsorted(groups, np.arange(n_groups + 1))
+
+    # Notes de 1 à 5 (0 si absente) et NPS de 0 à 10, en int8 dans cet ordre (une ligne par service)
+    scores = np.empty((len(metric_ids), len(rows)), dtype=np.int8)
+    for j, metric_id in enumerate(metric_ids):
+        scores[j] = df[metric_id].to_numpy(dtype='int8', na_value=0)[rows]
+    y = df['NPS_Score'].to_numpy(dtype='int8')[rows]
+
+    k = len(metric_ids)
+    dim = 2 * k + 3
+    Z, M, Y, Y2 = slice(0, k), slice(k, 2 * k), 2 * k, 2 * k + 1
+    gram = np.zeros((n_groups, dim, dim))
+    # Bloc en float32 (colonnes contiguës) : les produits d'entiers y sont exacts tant que
+    # chaque somme reste sous 2**24, ce que garantit la taille des blocs (au plus 5 x 100 par ligne),
+    # sauf pour NPS x NPS² et NPS² x NPS², recalculés en float64 après la boucle
+    u = np.empty((min(chunk_rows, len(rows)), dim), dtype=np.float32, order='F')
+    u[:, 2 * k + 2] = 1
+    for start in range(0, len(rows), chunk_rows):
+        stop = min(start + chunk_rows, len(rows))
+        size = stop - start
+        u[:size, Z] = scores[:, start:stop].T
+        np.minimum(u[:size, Z], 1, out=u[:size, M])
+        u[:size, Y] = y[start:stop]
+        np.square(u[:size, Y], out=u[:size, Y2])
+        # Un produit matriciel (BLAS) par groupe présent dans le bloc
+        first = np.searchsorted(bounds, start, side='right') - 1
+        last = np.searchsorted(bounds, stop, side='left')
+        for g in range(first, last):
+            lo, hi = max(bounds[g], start) - start, min(bounds[g + 1], stop) - start
+            if hi > lo:
+                gram[g] += u[lo:hi].T @ u[lo:hi]
+
+    y = y.astype(np.float64)
+    gram[:, Y, Y2] = gram[:, Y2, Y] = np.bincount(groups, weights=y ** 3, minlength=n_groups)
+    gram[:, Y2, Y2] = np.bincount(groups, weights=y ** 4, minlength=n_groups)
+
+    gram = gram.reshape(len(clubs), len(periods), dim, dim).cumsum(axis=1)
+    return DriverStatistics(clubs, periods, metric_ids, gram)
+
+
+def with_network(stats: DriverStatistics) -> DriverStatistics:
+    """
+    Ajoute la ligne réseau (somme exacte des statistiques des clubs)
+    """
+    if stats.clubs == [NETWORK_LABEL]:
+        return stats
+    gram = np.concatenate([stats.gram, stats.gram.sum(axis=0, keepdims=True)], axis=0)
+    return DriverStatistics(stats.clubs + [NETWORK_LABEL], stats.periods, stats.metric_ids, gram)
+
+
+def analyze_drivers(stats: DriverStatistics, alpha: float = DEFAULT_RIDGE_ALPHA) -> DriverAnalysis:
+    """
+    Corrélations, régression ridge standardisée et importances de tous les clubs
+    et de toutes les périodes, en opérations matricielles empilées.
+    Corrélations : réponses où la note est renseignée ; régression : notes manquantes
+    remplacées par la moyenne de la fenêtre.
+    """
+    k = len(stats.metric_ids)
+    gram = stats.gram.reshape(-1, *stats.gram.shape[2:])  # (G, 2k + 3, 2k + 3)
+    Z, M, Y, Y2, ONE = slice(0, k), slice(k, 2 * k), 2 * k, 2 * k + 1, 2 * k + 2
+
+    n = gram[:, ONE, ONE]
+    n_x = gram[:, M, ONE]                       # réponses par note
+    sum_x = gram[:, Z, ONE]
+    sum_x2 = np.diagonal(gram[:, Z, Z], axis1=1, axis2=2)
+    sum_xy = gram[:, Z, Y]
+    sum_y_x = gram[:, M, Y]                     # somme du NPS là où la note est renseignée
+    sum_y2_x = gram[:, M, Y2]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Corrélations de Pearson sur les cas disponibles
+        cov_xy = sum_xy - sum_x * sum_y_x / n_x
+        var_x = sum_x2 - sum_x ** 2 / n_x
+        var_y_x = sum_y2_x - sum_y_x ** 2 / n_x
+        correlation = cov_xy / np.sqrt(var_x * var_y_x)
+
+        # Matrice des produits des notes imputées par la moyenne : x~ = z + (1 - m) * mu
+        mu = np.nan_to_num(sum_x / n_x)
+        zz, zm, mm = gram[:, Z, Z], gram[:, Z, M], gram[:, M, M]
+        z1, m1 = sum_x, n_x
+        zq = z1[:, :, None] - zm                            # Z'(1 - M)
+        qq = n[:, None, None] - m1[:, :, None] - m1[:, None, :] + mm  # (1 - M)'(1 - M)
+        xx = zz + zq * mu[:, None, :] + np.swapaxes(zq * mu[:, None, :], 1, 2) + qq * mu[:, :, None] * mu[:, None, :]
+        x1 = z1 + (n[:, None] - m1) * mu
+        xy = sum_xy + (gram[:, ONE, Y][:, None] - sum_y_x) * mu
+
+        mean_x = x1 / n[:, None]
+        mean_y = gram[:, ONE, Y] / n
+        cov_xx = xx / n[:, None, None] - mean_x[:, :, None] * mean_x[:, None, :]
+        cov_xy_imputed = xy / n[:, None] - mean_x * mean_y[:, None]
+        var_y = gram[:, Y, Y] / n - mean_y ** 2
+
+        # Passage aux corrélations (variables standardisées) ; variance nulle -> variable neutralisée
+        sd_x = np.sqrt(np.clip(np.diagonal(cov_xx, axis1=1, axis2=2), 0, None))
+        scale = np.where(sd_x > 0, 1 / sd_x, 0)
+        r_xx = cov_xx * scale[:, :, None] * scale[:, None, :]
+        r_xy = cov_xy_imputed * scale / np.sqrt(var_y)[:, None]
+
+    valid = (n > k) & (var_y > 0)
+    r_xx = np.where(valid[:, None, None], np.nan_to_num(r_xx), np.eye(k))
+    r_xy = np.where(valid[:, None], np.nan_to_num(r_xy), 0)
+
+    # Ridge standardisée de toutes les fenêtres en un seul appel
+    beta = np.linalg.solve(r_xx + alpha * np.eye(k), r_xy[:, :, None])[:, :, 0]
+    # Variance expliquée par l'ajustement ridge ; importances : parts de la mesure de Pratt (beta x r)
+    r2 = 2 * (beta * r_xy).sum(axis=1) - np.einsum('gi,gij,gj->g', beta, r_xx, beta)
+    contribution = beta * r_xy
+    positive = np.clip(contribution, 0, None)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        importance = np.where(r2[:, None] > 0, positive / positive.sum(axis=1, keepdims=True), np.nan)
+    rank = (-np.nan_to_num(importance, nan=-1)).argsort(axis=1).argsort(axis=1) + 1
+
+    beta = np.where(valid[:, None], beta, np.nan)
+    clubs = np.repeat(stats.clubs, len(stats.periods))
+    periods = np.tile(stats.periods, len(stats.clubs))
+    drivers = pd.DataFrame({
+        'Club': np.repeat(clubs, k),
+        'Period': np.repeat(periods, k),
+        'metric_id': np.tile(stats.metric_ids, len(clubs)),
+        'n': n_x.ravel().astype('int64'),
+        'correlation': correlation.ravel(),
+        'coefficient': beta.ravel(),
+        'importance': importance.ravel(),
+        'rank': rank.ravel()
+    })
+    drivers['display_name'] = drivers['metric_id'].map(lambda m: METRICS_BY_ID[m].display_name)
+    fit = pd.DataFrame({
+        'Club': clubs,
+        'Period': periods,
+        'n': n.astype('int64'),
+        'r2': np.where(valid, r2, np.nan)
+    })
+    return DriverAnalysis(drivers, fit)
+
+
+def compute_driver_analysis(df: pd.DataFrame, periods: List[str], end_date: Optional[pd.Timestamp] = None,
+                            alpha: float = DEFAULT_RIDGE_ALPHA) -> DriverAnalysis:
+    """
+    Analyse des leviers par club (et pour le réseau) sur chaque période
+    """
+    return analyze_drivers(with_network(driver_statistics(df, periods, end_date)), alpha)
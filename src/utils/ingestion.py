@@ -0,0 +1,167 @@
+# src/utils/ingestion.py
+import io
+from pathlib import Path
+from typing import Dict, List, Optional
+import pandas as pd
+from utils.aggregate_store import AggregateStore
+from utils.parquet_store import ParquetResponseStore
+from utils.rollup import CATEGORY_COLUMNS, COUNT_COLUMNS
+from utils.schema import METRICS_BY_QUESTION, SERVICE_METRICS, nps_category, normalize_responses
+
+REQUIRED_COLUMNS = ['Horodateur', 'NPS_Score']
+DEFAULT_CLUB = 'Club principal'
+
+
+class IngestionError(ValueError):
+    """Export non conforme au schéma attendu"""
+
+
+def validate_columns(columns: List[str]) -> List[str]:
+    """
+    Vérifie la présence des colonnes attendues (questions ou identifiants courts).
+    Retourne la liste des colonnes manquantes.
+    """
+    present = set(columns)
+    missing = [c for c in REQUIRED_COLUMNS if c not in present]
+    for metric in SERVICE_METRICS:
+        if metric.question not in present and metric.metric_id not in present:
+            missing.append(metric.question)
+    return missing
+
+
+def read_new_rows(path: str, byte_offset: int = 0, date_format: Optional[str] = None,
+                  last_row: Optional[bytes] = None) -> Dict:
+    """
+    Lit uniquement la partie de l'export ajoutée depuis `byte_offset`.
+    Si le fichier a été réécrit (plus court que l'offset, ou dont les octets précédant
+    l'offset ne sont plus la dernière ligne ingérée `last_row`), il est relu entièrement.
+    Les horodatages illisibles deviennent NaT (lignes écartées par clean_rows).
+    """
+    path = Path(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        size = path.stat().st_size
+        reset = byte_offset > size
+        if not reset and last_row and byte_offset > len(header):
+            # Export réexporté avec des lignes antérieures modifiées : l'offset tomberait en milieu de ligne
+            f.seek(byte_offset - len(last_row))
+            reset = f.read(len(last_row)) != last_row
+        if byte_offset <= len(header) or reset:
+            byte_offset = len(header)
+        f.seek(byte_offset)
+        tail = f.read()
+
+    # Ne traiter que les lignes complètes : une ligne en cours d'écriture sera lue au prochain passage
+    complete = tail.rfind(b'\n') + 1
+    columns = pd.read_csv(io.BytesIO(header)).columns.tolist()
+    missing = validate_columns(columns)
+    if missing:
+        raise IngestionError(f"Colonnes manquantes dans l'export : {', '.join(missing)}")
+
+    if complete == 0:
+        rows = pd.DataFrame(columns=columns)
+    else:
+        rows = pd.read_csv(io.BytesIO(tail[:complete]), header=None, names=columns)
+    rows['Horodateur'] = pd.to_datetime(
+        rows['Horodateur'], format=date_format, dayfirst=date_format is None, errors='coerce'
+    )
+
+    # Dernière ligne complète, vérifiée avant le prochain positionnement
+    last = tail[tail.rfind(b'\n', 0, complete - 1) + 1:complete] if complete else None
+    return {'rows': rows, 'byte_offset': byte_offset + complete, 'reset': reset, 'last_row': last}
+
+
+def clean_rows(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Écarte les lignes invalides et convertit vers le schéma canonique
+    """
+    scores = pd.to_numeric(rows['NPS_Score'], errors='coerce')
+    rows = rows[rows['Horodateur'].notna() & scores.between(0, 10)].copy()
+    rows['NPS_Score'] = scores.loc[rows.index]
+
+    for question, metric in METRICS_BY_QUESTION.items():
+        column = question if question in rows.columns else metric.metric_id
+        values = pd.to_numeric(rows[column], errors='coerce')
+        rows[column] = values.where(values.between(1, 5))
+
+    rows['NPS_Category'] = nps_category(rows['NPS_Score'].astype('int8'))
+    return normalize_responses(rows)
+
+
+def aggregate_rows(df: pd.DataFrame, default_club: str = DEFAULT_CLUB) -> Dict[str, pd.DataFrame]:
+    """
+    Agrégats jour x club d'un lot de réponses (comptages NPS, sommes et effectifs par service)
+    """
+    day = df['Horodateur'].dt.strftime('%Y-%m-%d').rename('day')
+    club = (df['Club'].astype(str) if 'Club' in df.columns else pd.Series(default_club, index=df.index)).rename('club')
+
+    counts = (
+        pd.crosstab([day, club], df['NPS_Category'])
+        .reindex(columns=list(CATEGORY_COLUMNS), fill_value=0)
+        .rename(columns=CATEGORY_COLUMNS)
+    )
+    counts.columns.name = None
+    counts.insert(0, 'total', counts.sum(axis=1))
+
+    metric_ids = [m.metric_id for m in SERVICE_METRICS if m.metric_id in df.columns]
+    values = df[metric_ids].astype('Int64')
+    grouped = values.groupby([day, club])
+    scores = pd.concat({
+        'score_sum': grouped.sum().stack(),
+        'score_count': grouped.count().stack(),
+        'score_sumsq': (values ** 2).groupby([day, club]).sum().stack()
+    }, axis=1).rename_axis(['day', 'club', 'metric_id']).reset_index()
+
+    return {
+        'counts': counts[COUNT_COLUMNS].astype('int64').reset_index(),
+        'scores': scores.astype({'score_sum': 'int64', 'score_count': 'int64', 'score_sumsq': 'int64'})
+    }
+
+
+def ingest_export(store: AggregateStore, path: str, source: Optional[str] = None,
+                  date_format: Optional[str] = None, default_club: str = DEFAULT_CLUB,
+                  raw_store: Optional[ParquetResponseStore] = None) -> Dict:
+    """
+    Ingère les nouvelles réponses d'un export (Google Forms) dans le stockage d'agrégats.
+    Seules les lignes postérieures au watermark sont analysées et agrégées ;
+    si raw_store est fourni, elles y sont aussi ajoutées pour les vues détaillées.
+    """
+    source = source or str(Path(path).resolve())
+    watermark = store.get_watermark(source)
+
+    batch = read_new_rows(path, watermark['byte_offset'], date_format, watermark['last_row'])
+    rows = batch['rows']
+    if batch['reset'] and watermark['last_timestamp'] is not None:
+        # Export réécrit puis relu entièrement : ne jamais compter deux fois une réponse
+        rows = rows[rows['Horodateur'] > watermark['last_timestamp']]
+
+    parsed = len(rows)
+    rows = clean_rows(rows)
+    rejected = parsed - len(rows)
+
+    last_timestamp = watermark['last_timestamp']
+    if len(rows) == 0:
+        aggregates = {
+            'counts': pd.DataFrame(columns=['day', 'club'] + COUNT_COLUMNS),
+            'scores': pd.DataFrame(columns=['day', 'club', 'metric_id', 'score_sum', 'score_count', 'score_sumsq'])
+        }
+    else:
+        aggregates = aggregate_rows(rows, default_club)
+        last_timestamp = rows['Horodateur'].max()
+        if watermark['last_timestamp'] is not None:
+            last_timestamp = max(last_timestamp, watermark['last_timestamp'])
+
+    # Watermark relu et avancé dans la transaction : un lot déjà compté par une ingestion concurrente est ignoré
+    committed = store.upsert(
+        aggregates['counts'], aggregates['scores'], source, last_timestamp, batch['byte_offset'], len(rows),
+        expected_offset=watermark['byte_offset'], last_row=batch['last_row']
+    )
+    if not committed:
+        return {'ingested': 0, 'rejected': 0, 'last_timestamp': watermark['last_timestamp'], 'skipped': True}
+
+    # Réponses brutes écrites une fois les agrégats validés : un échec de l'upsert ne les duplique pas
+    if raw_store is not None and len(rows):
+        if 'Club' not in rows.columns:
+            rows = rows.assign(Club=default_club)
+        raw_store.write(rows)
+    return {'ingested': int(len(rows)), 'rejected': int(rejected), 'last_timestamp': last_timestamp, 'skipped': False}
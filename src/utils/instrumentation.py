@@ -0,0 +1,161 @@
+# src/utils/instrumentation.py
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+import pandas as pd
+
+logger = logging.getLogger('nps_dashboard.perf')
+
+
+@dataclass
+class Span:
+    """
+    Durée d'une étape d'une exécution du script (chargement, calcul ou affichage)
+    """
+    name: str
+    start: float = 0.0
+    duration_ms: float = 0.0
+    rows: Optional[int] = None
+
+    def set_rows(self, rows: int):
+        self.rows = int(rows)
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+        return False
+
+
+class _NullSpan:
+    """
+    Étape non mesurée : instrumentation désactivée, aucun coût hors de l'appel
+    """
+
+    def set_rows(self, rows: int):
+        pass
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+@dataclass
+class RerunTrace:
+    """
+    Étapes mesurées d'une exécution du script Streamlit
+    """
+    run: int
+    timestamp: pd.Timestamp
+    start: float
+    spans: List[Span] = field(default_factory=list)
+    total_ms: float = 0.0
+
+
+class Tracer:
+    """
+    Instrumentation d'une session : étapes des `history` dernières exécutions,
+    également écrites en JSON (une ligne par étape) dans le journal 'nps_dashboard.perf'
+    """
+
+    def __init__(self, enabled: bool = False, history: int = 20):
+        self.enabled = enabled
+        self.session = uuid.uuid4().hex[:8]
+        self.runs: Deque[RerunTrace] = deque(maxlen=max(1, int(history)))
+        self._current: Optional[RerunTrace] = None
+        self._count = 0
+
+    def resize(self, history: int):
+        self.runs = deque(self.runs, maxlen=max(1, int(history)))
+
+    def start_run(self):
+        if not self.enabled:
+            self._current = None
+            return
+        self._count += 1
+        self._current = RerunTrace(self._count, pd.Timestamp.now(), time.perf_counter())
+
+    def span(self, name: str):
+        """
+        Contexte mesurant une étape ; sans effet si l'instrumentation est désactivée
+        """
+        if self._current is None:
+            return NULL_SPAN
+        span = Span(name)
+        self._current.spans.append(span)
+        return span
+
+    def end_run(self):
+        trace, self._current = self._current, None
+        if trace is None:
+            return
+        trace.total_ms = (time.perf_counter() - trace.start) * 1000
+        self.runs.append(trace)
+        if logger.isEnabledFor(logging.INFO):
+            for span in trace.spans:
+                logger.info(json.dumps({
+                    'session': self.session,
+                    'run': trace.run,
+                    'timestamp': trace.timestamp.isoformat(),
+                    'span': span.name,
+                    'run_total_ms': round(trace.total_ms, 3),
+                    'duration_ms': round(span.duration_ms, 3),
+                    'rows': span.rows
+                }))
+
+    def history_frame(self) -> pd.DataFrame:
+        """
+        Une ligne par (exécution, étape) : run, timestamp, span, duration_ms, rows
+        """
+        records = [
+            {'run': trace.run, 'timestamp': trace.timestamp, 'span': span.name,
+             'duration_ms': span.duration_ms, 'rows': span.rows}
+            for trace in self.runs for span in trace.spans
+        ]
+        history = pd.DataFrame(records, columns=['run', 'timestamp', 'span', 'duration_ms', 'rows'])
+        return history.astype({'rows': 'Int64'})
+
+
+# Traceur inactif utilisé quand aucun n'est fourni aux composants
+NULL_TRACER = Tracer(enabled=False)
+
+
+def configure_perf_log(path: Optional[str]) -> logging.Logger:
+    """
+    Journal JSON des mesures : une ligne par étape dans `path` (ajouté une seule fois)
+    """
+    if path and not any(getattr(h, 'baseFilename', None) == os.path.abspath(path) for h in logger.handlers):
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def summarize_history(history: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Durées par étape (colonnes : exécutions) et statistiques par étape
+    """
+    if len(history) == 0:
+        return {'durations': history, 'stats': history}
+    durations = history.pivot_table(index='span', columns='run', values='duration_ms', aggfunc='sum', sort=False)
+    stats = history.groupby('span', sort=False).agg(
+        median_ms=('duration_ms', 'median'),
+        max_ms=('duration_ms', 'max'),
+        last_ms=('duration_ms', 'last'),
+        rows=('rows', 'last')
+    )
+    return {'durations': durations, 'stats': stats}
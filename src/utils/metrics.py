@@ -0,0 +1,321 @@
+# src/utils/metrics.py
+# Moteur de calcul des indicateurs NPS, indépendant de Streamlit : chaque fonction
+# retourne un objet résultat typé que les composants se contentent d'afficher.
+import pandas as pd
+from dataclasses import dataclass, replace
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+from utils.cache import dataset_fingerprint
+from utils.comparison import COMPARISON_MODES, ComparisonWindows, compare_service_metrics
+from utils.confidence import mean_intervals, nps_intervals, z_value
+from utils.config import get_config
+from utils.rollup import COUNT_COLUMNS, DailyRollup, day_slice, rolling_nps, window_counts
+from utils.schema import ServiceMetric, SERVICE_METRICS
+from utils.windows import as_of_day, day_end, period_window
+
+# Ordre d'empilement des catégories dans le graphique
+CHART_CATEGORIES = ['Détracteur', 'Passif', 'Promoteur']
+
+# Tailles de regroupement du graphique d'évolution, de la plus fine à la plus grossière,
+# avec leur format d'affichage
+BUCKET_FREQUENCIES = {
+    'D': '%d %b',
+    'W': '%d %b',
+    'M': '%b %Y'
+}
+
+
+@dataclass(frozen=True)
+class HeaderMetrics:
+    """
+    Métriques NPS principales d'une période
+    """
+    nps_score: float
+    promoters_pct: float
+    passive_pct: float
+    detractors_pct: float
+    total_responses: int
+    promoters: int = 0
+    passives: int = 0
+    detractors: int = 0
+    nps_low: Optional[float] = None
+    nps_high: Optional[float] = None
+
+    @classmethod
+    def empty(cls) -> 'HeaderMetrics':
+        return cls(0, 0, 0, 0, 0)
+
+
+@dataclass(frozen=True)
+class TrendBuckets:
+    """
+    Agrégats par semaine ou par mois pour le graphique d'évolution.
+    `table` contient Period_Start, total, promoteurs, passifs, detracteurs,
+    Display_Date, Sort_Key, NPS_Score, NPS_Low, NPS_High, NPS_CI_Width et Est_Representatif.
+    `services` contient, par période, la moyenne et l'intervalle de confiance de chaque service.
+    `frequency` est la taille de regroupement retenue (clé de BUCKET_FREQUENCIES).
+    """
+    period: str
+    table: pd.DataFrame
+    services: Optional[pd.DataFrame] = None
+    frequency: Optional[str] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.table) == 0 or self.table['total'].sum() == 0
+
+    @property
+    def chart_data(self) -> pd.DataFrame:
+        return build_trend_chart_data(self.table)
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Empreinte des agrégats (clé du graphique mis en cache)"""
+        return dataset_fingerprint(self.table)
+
+
+@dataclass(frozen=True)
+class ServiceDelta:
+    """
+    Évolution d'une métrique de service entre la fenêtre actuelle et la précédente
+    """
+    metric: ServiceMetric
+    current_mean: float
+    previous_mean: float
+    delta: float
+    current_n: int
+    previous_n: int
+    stderr: Optional[float] = None
+    margin: Optional[float] = None  # demi-largeur de l'intervalle de confiance de la moyenne actuelle
+
+    @property
+    def is_comparable(self) -> bool:
+        return self.current_n > 0 and self.previous_n > 0
+
+
+def confidence_settings(level: Optional[float] = None, method: Optional[str] = None) -> Tuple[float, str]:
+    """
+    Niveau et méthode des intervalles de confiance (configuration par défaut)
+    """
+    if level is None:
+        level = get_config('CONFIDENCE_LEVEL', 0.95)
+    if method is None:
+        method = get_config('CI_METHOD', 'analytic')
+    return level, method
+
+
+def default_frequency(period: str) -> str:
+    """
+    Regroupement par défaut : par semaine sur 4 ou 8 semaines, par mois au-delà
+    """
+    return 'W' if period in ['28D', '56D'] else 'M'
+
+
+def choose_frequency(start_date: pd.Timestamp, end_date: pd.Timestamp, frequency: str,
+                     max_buckets: Optional[int] = None) -> str:
+    """
+    Regroupement demandé, ou le premier plus grossier dont le nombre de barres
+    sur la fenêtre respecte le budget `max_buckets`
+    """
+    if max_buckets is None:
+        max_buckets = get_config('TREND_MAX_BUCKETS', 120)
+    frequencies = list(BUCKET_FREQUENCIES)
+    for candidate in frequencies[frequencies.index(frequency):]:
+        if len(pd.period_range(start_date, end_date, freq=candidate)) <= max_buckets:
+            return candidate
+    return frequencies[-1]
+
+
+def period_buckets(index: pd.DatetimeIndex, frequency: str) -> Tuple[pd.DatetimeIndex, str]:
+    """
+    Début du jour, de la semaine ou du mois de chaque jour, et format d'affichage associé
+    """
+    return index.to_period(frequency).start_time, BUCKET_FREQUENCIES[frequency]
+
+
+def calculate_nps_metrics(rollup: DailyRollup, period: str = '28D', level: Optional[float] = None,
+                          method: Optional[str] = None, as_of: Optional[pd.Timestamp] = None) -> HeaderMetrics:
+    """
+    Calcule les métriques NPS pour la période spécifiée, se terminant au jour `as_of`
+    """
+    # Comptages de la période : différence de sommes cumulées en O(1)
+    start_date, end_date = period_window(period, as_of)
+    counts = window_counts(rollup, start_date, end_date)
+
+    total = int(counts['total'])
+    if total == 0:
+        return HeaderMetrics.empty()
+
+    promoters = int(counts['promoteurs'])
+    passives = int(counts['passifs'])
+    detractors = int(counts['detracteurs'])
+    level, method = confidence_settings(level, method)
+    low, high = nps_intervals([promoters], [passives], [detractors], level, method,
+                              get_config('BOOTSTRAP_RESAMPLES', 1000))
+
+    return HeaderMetrics(
+        nps_score=round((promoters/total * 100) - (detractors/total * 100), 1),
+        promoters_pct=round(promoters/total * 100, 1),
+        passive_pct=round(passives/total * 100, 1),
+        detractors_pct=round(detractors/total * 100, 1),
+        total_responses=total,
+        promoters=promoters,
+        passives=passives,
+        detractors=detractors,
+        nps_low=round(float(low[0]), 1),
+        nps_high=round(float(high[0]), 1)
+    )
+
+
+def prepare_data_for_period(counts: pd.DataFrame, period: str, threshold: Optional[float] = None,
+                            level: Optional[float] = None, method: Optional[str] = None,
+                            frequency: Optional[str] = None) -> pd.DataFrame:
+    """
+    Prépare et agrège les comptages journaliers selon la période sélectionnée.
+    Une période est représentative si son intervalle de confiance est plus étroit que `threshold` points.
+    """
+    if threshold is None:
+        threshold = get_config('NPS_MAX_CI_WIDTH', 50)
+    level, method = confidence_settings(level, method)
+
+    # Définition de la période d'agrégation
+    period_start, format_str = period_buckets(counts.index, frequency or default_frequency(period))
+
+    # Créer l'agrégation : somme des lignes journalières
+    grouped = counts[COUNT_COLUMNS].groupby(period_start.rename('Period_Start')).sum().reset_index()
+
+    # Calculer les métriques
+    grouped['Display_Date'] = grouped['Period_Start'].dt.strftime(format_str)
+    grouped['Sort_Key'] = grouped['Period_Start'].dt.strftime('%Y-%m-%d')
+    grouped['NPS_Score'] = (grouped['promoteurs']/grouped['total'] * 100) - (grouped['detracteurs']/grouped['total'] * 100)
+
+    # Intervalles de confiance de toutes les périodes en un seul calcul vectorisé
+    low, high = nps_intervals(
+        grouped['promoteurs'], grouped['passifs'], grouped['detracteurs'],
+        level, method, get_config('BOOTSTRAP_RESAMPLES', 1000)
+    )
+    grouped['NPS_Low'] = low
+    grouped['NPS_High'] = high
+    grouped['NPS_CI_Width'] = high - low
+    grouped['Est_Representatif'] = grouped['NPS_CI_Width'] <= threshold
+
+    # Trier chronologiquement
+    return grouped.sort_values('Period_Start')
+
+
+def build_trend_chart_data(agg_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Table compacte du graphique : une ligne par période, les catégories restant en colonnes
+    (le graphique les déplie lui-même, les données ne sont embarquées qu'une fois)
+    """
+    chart_df = agg_data.rename(columns={
+        'Display_Date': 'Period',
+        'total': 'Total',
+        'Est_Representatif': 'Est_Représentatif',
+        'detracteurs': 'Détracteur',
+        'passifs': 'Passif',
+        'promoteurs': 'Promoteur'
+    }).assign(
+        NPS=agg_data['NPS_Score'].round(1),
+        NPS_Bas=agg_data['NPS_Low'].round(1),
+        NPS_Haut=agg_data['NPS_High'].round(1)
+    )
+    return chart_df[['Period', 'Sort_Key', 'Total'] + CHART_CATEGORIES + ['Est_Représentatif', 'NPS', 'NPS_Bas', 'NPS_Haut']] \
+        .reset_index(drop=True)
+
+
+def compute_service_buckets(rollup: DailyRollup, start_date: pd.Timestamp, end_date: pd.Timestamp,
+                            frequency: str, level: Optional[float] = None) -> pd.DataFrame:
+    """
+    Moyenne et intervalle de confiance de chaque service par semaine ou par mois.
+    Une ligne par (Period_Start, metric_id).
+    """
+    level, _ = confidence_settings(level)
+    # Sommes, effectifs et carrés regroupés en une seule agrégation
+    stacked = day_slice(
+        pd.concat({'sum': rollup.score_sums, 'n': rollup.score_counts, 'sq': rollup.score_sumsq}, axis=1),
+        start_date, end_date
+    )
+    period_start, _ = period_buckets(stacked.index, frequency)
+    totals = stacked.groupby(period_start.rename('Period_Start')).sum()
+    intervals = mean_intervals(totals['sum'], totals['n'], totals['sq'], level)
+    return intervals.reset_index()
+
+
+def compute_trend_buckets(rollup: DailyRollup, period: str, threshold: Optional[float] = None,
+                          level: Optional[float] = None, method: Optional[str] = None,
+                          frequency: Optional[str] = None, max_buckets: Optional[int] = None,
+                          as_of: Optional[pd.Timestamp] = None) -> TrendBuckets:
+    """
+    Agrégats d'évolution du NPS et des services sur la période se terminant au jour `as_of`.
+    Le regroupement demandé est élargi si la période dépasse le budget de barres.
+    """
+    start_date, end_date = period_window(period, as_of)
+    frequency = choose_frequency(start_date, end_date, frequency or default_frequency(period), max_buckets)
+    period_counts = day_slice(rollup.counts, start_date, end_date)
+    return TrendBuckets(
+        period,
+        prepare_data_for_period(period_counts, period, threshold, level, method, frequency),
+        compute_service_buckets(rollup, start_date, end_date, frequency, level),
+        frequency
+    )
+
+
+def apply_threshold(trend: TrendBuckets, threshold: float) -> TrendBuckets:
+    """
+    Recalcule le seul drapeau de représentativité pour un nouveau seuil,
+    à partir des largeurs d'intervalle déjà agrégées (aucun nouveau regroupement)
+    """
+    return replace(trend, table=trend.table.assign(Est_Representatif=trend.table['NPS_CI_Width'] <= threshold))
+
+
+def compute_service_deltas(rollup: DailyRollup, windows: ComparisonWindows, with_stderr: bool = False,
+                           level: Optional[float] = None) -> List[ServiceDelta]:
+    """
+    Évolutions de toutes les métriques de service, dans l'ordre du registre
+    """
+    results = compare_service_metrics(rollup, windows, with_stderr=with_stderr)
+    z = z_value(confidence_settings(level)[0]) if with_stderr else None
+    deltas = []
+    for metric in SERVICE_METRICS:
+        if metric.metric_id not in results.index:
+            continue
+        row = results.loc[metric.metric_id]
+        deltas.append(ServiceDelta(
+            metric=metric,
+            current_mean=float(row['current_mean']),
+            previous_mean=float(row['previous_mean']),
+            delta=float(row['delta']),
+            current_n=int(row['current_n']),
+            previous_n=int(row['previous_n']),
+            stderr=float(row['delta_se']) if with_stderr else None,
+            margin=z * float(row['current_se']) if with_stderr else None
+        ))
+    return deltas
+
+
+def compute_service_grid(rollup: DailyRollup, period: str, comparison: str,
+                         as_of: Optional[pd.Timestamp] = None, level: Optional[float] = None) -> List[ServiceDelta]:
+    """
+    Évolutions des métriques de service pour un mode de comparaison de COMPARISON_MODES
+    """
+    return compute_service_deltas(rollup, COMPARISON_MODES[comparison](period, as_of), with_stderr=True, level=level)
+
+
+def compute_rolling_nps(rollup: DailyRollup, windows: List[int],
+                        as_of: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    NPS glissant journalier pour les longueurs de fenêtre demandées, jusqu'au jour `as_of` inclus
+    """
+    rolling = rolling_nps(rollup, sorted(windows))
+    return rolling[rolling['Date'] <= day_end(as_of_day(as_of))].reset_index(drop=True)
+
+
+def group_by_category(deltas: List[ServiceDelta]) -> Dict[str, List[ServiceDelta]]:
+    """
+    Regroupe les évolutions par catégorie d'affichage
+    """
+    grouped = {}
+    for delta in deltas:
+        grouped.setdefault(delta.metric.category, []).append(delta)
+    return grouped
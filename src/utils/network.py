@@ -0,0 +1,168 @@
+# src/utils/network.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from utils.comparison import midpoint_split
+from utils.rollup import DailyRollup, build_daily_rollup, window_counts, window_scores
+from utils.schema import SERVICE_METRICS
+from utils.windows import period_window
+
+NETWORK_LABEL = 'Réseau'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Pool de processus partagé par toutes les sessions du serveur
+    """
+    global _executor
+    with _executor_lock:
+        # Pool cassé (ex. processus tué faute de mémoire) : remplacé au lieu d'échouer à chaque soumission
+        if _executor is not None and getattr(_executor, '_broken', False):
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        if _executor is None:
+            # spawn : pas de fork d'un processus multi-thread (serveur Streamlit)
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+def rollup_partials(rollup: DailyRollup, period: str, end_date: Optional[pd.Timestamp] = None) -> Dict[str, pd.Series]:
+    """
+    Comptages et sommes bruts (donc fusionnables exactement) d'une période :
+    catégories NPS sur toute la période, sommes et effectifs par service
+    sur la période et sur chacune de ses deux moitiés
+    """
+    windows = midpoint_split(period, end_date)
+    current_sums, current_counts = window_scores(rollup, windows.current_start, windows.current_end, 'left')
+    previous_sums, previous_counts = window_scores(rollup, windows.previous_start, windows.previous_end, 'left')
+    return {
+        'counts': window_counts(rollup, *period_window(period, end_date)),
+        'current_sums': current_sums,
+        'current_counts': current_counts,
+        'previous_sums': previous_sums,
+        'previous_counts': previous_counts
+    }
+
+
+def shard_partials(shard: pd.DataFrame, period: str, end_date: Optional[pd.Timestamp] = None) -> Dict[str, pd.Series]:
+    """
+    Tâche exécutée dans un processus du pool : agrégat journalier du club puis partiels
+    """
+    return rollup_partials(build_daily_rollup(shard), period, end_date)
+
+
+def store_partials(store_path: str, club: str, period: str, end_date: Optional[pd.Timestamp] = None) -> Dict[str, pd.Series]:
+    """
+    Tâche exécutée dans un processus du pool : partiels d'un club lus dans le stockage d'agrégats
+    """
+    from utils.aggregate_store import AggregateStore
+    return rollup_partials(AggregateStore(store_path).load_rollup([club]), period, end_date)
+
+
+def merge_partials(partials: List[Dict[str, pd.Series]]) -> Dict[str, pd.Series]:
+    """
+    Fusion exacte : somme des comptages et des sommes de chaque club
+    """
+    return {
+        key: pd.concat([p[key] for p in partials], axis=1).fillna(0).sum(axis=1)
+        for key in partials[0]
+    }
+
+
+def partials_to_row(partials: Dict[str, pd.Series]) -> Dict:
+    """
+    Indicateurs d'une ligne du classement : NPS de la période et moyenne par service
+    """
+    counts = partials['counts']
+    total = counts['total']
+    row = {
+        'total': int(total),
+        'NPS': (counts['promoteurs'] - counts['detracteurs']) / total * 100 if total else np.nan
+    }
+    sums = partials['current_sums'] + partials['previous_sums']
+    n = partials['current_counts'] + partials['previous_counts']
+    for metric in SERVICE_METRICS:
+        if metric.metric_id in n.index:
+            row[metric.metric_id] = sums[metric.metric_id] / n[metric.metric_id] if n[metric.metric_id] else np.nan
+            current_n = partials['current_counts'][metric.metric_id]
+            previous_n = partials['previous_counts'][metric.metric_id]
+            row[f"{metric.metric_id}_delta"] = (
+                partials['current_sums'][metric.metric_id] / current_n
+                - partials['previous_sums'][metric.metric_id] / previous_n
+                if current_n and previous_n else np.nan
+            )
+    return row
+
+
+@dataclass
+class NetworkJob:
+    """
+    Calcul par club en cours sur le pool de processus
+    """
+    period: str
+    futures: Dict[str, Future] = field(default_factory=dict)
+
+    @property
+    def progress(self) -> float:
+        return sum(f.done() for f in self.futures.values()) / max(len(self.futures), 1)
+
+    def done(self) -> bool:
+        return all(f.done() for f in self.futures.values())
+
+    def failed(self) -> bool:
+        """Un calcul de club au moins s'est terminé en erreur (ou a été annulé)"""
+        return any(f.done() and (f.cancelled() or f.exception() is not None) for f in self.futures.values())
+
+    def result(self) -> pd.DataFrame:
+        """
+        Classement : une ligne par club plus la ligne réseau (fusion exacte des partiels)
+        """
+        partials = {club: future.result() for club, future in self.futures.items()}
+        rows = {club: partials_to_row(p) for club, p in partials.items()}
+        if partials:
+            rows[NETWORK_LABEL] = partials_to_row(merge_partials(list(partials.values())))
+        table = pd.DataFrame.from_dict(rows, orient='index')
+        table.index.name = 'Club'
+        return table
+
+
+def submit_frame_shards(executor: ProcessPoolExecutor, df: pd.DataFrame, period: str,
+                        end_date: Optional[pd.Timestamp] = None) -> NetworkJob:
+    """
+    Un calcul par club (partition de la colonne Club) soumis au pool
+    """
+    job = NetworkJob(period)
+    for club, shard in df.groupby('Club', observed=True, sort=True):
+        job.futures[str(club)] = executor.submit(shard_partials, shard, period, end_date)
+    return job
+
+
+def submit_store_shards(executor: ProcessPoolExecutor, store_path: str, clubs: List[str], period: str,
+                        end_date: Optional[pd.Timestamp] = None) -> NetworkJob:
+    """
+    Un calcul par club, chaque processus lisant ses agrégats dans le stockage SQLite
+    """
+    job = NetworkJob(period)
+    for club in clubs:
+        job.futures[club] = executor.submit(store_partials, store_path, club, period, end_date)
+    return job
+
+
+def rank_clubs(table: pd.DataFrame, column: str, ascending: bool = False) -> pd.DataFrame:
+    """
+    Classe les clubs (hors ligne réseau) selon une colonne
+    """
+    clubs = table.drop(index=NETWORK_LABEL, errors='ignore').sort_values(column, ascending=ascending, na_position='last')
+    clubs.insert(0, 'Rang', np.arange(1, len(clubs) + 1))
+    return clubs
@@ -0,0 +1,97 @@
+# src/utils/parquet_store.py
+import uuid
+from pathlib import Path
+from typing import List, Optional
+import pandas as pd
+from utils.schema import normalize_responses
+from utils.windows import ensure_sorted, period_window
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow est optionnel : seul ce stockage en dépend
+    pa = None
+
+PARTITION_COLUMN = 'month'
+
+
+class ParquetResponseStore:
+    """
+    Réponses brutes stockées en Parquet, partitionnées par mois (month=AAAA-MM).
+    Les lectures poussent la plage de dates et les colonnes jusqu'au scan
+    et s'appuient sur des fichiers mappés en mémoire.
+    """
+
+    def __init__(self, root: str):
+        if pa is None:
+            raise ImportError("pyarrow est requis pour le stockage Parquet des réponses (pip install pyarrow)")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.filesystem = pafs.LocalFileSystem(use_mmap=True)
+        self.partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+
+    def write(self, df: pd.DataFrame):
+        """
+        Ajoute des réponses : un nouveau fichier par mois touché, sans réécrire l'existant
+        """
+        if len(df) == 0:
+            return
+        months = df['Horodateur'].dt.strftime('%Y-%m')
+        for month, rows in df.groupby(months, sort=True):
+            partition = self.root / f"{PARTITION_COLUMN}={month}"
+            partition.mkdir(exist_ok=True)
+            table = pa.Table.from_pandas(rows, preserve_index=False)
+            pq.write_table(table, partition / f"part-{uuid.uuid4().hex}.parquet")
+
+    def _dataset(self):
+        return ds.dataset(
+            str(self.root),
+            format='parquet',
+            partitioning=self.partitioning,
+            filesystem=self.filesystem
+        )
+
+    def read(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Lit les réponses de la fenêtre [start, end] : les partitions hors plage
+        sont élaguées et seules les colonnes demandées sont décodées
+        """
+        if not any(self.root.glob(f"{PARTITION_COLUMN}=*/*.parquet")):
+            return pd.DataFrame(columns=columns or [])
+
+        dataset = self._dataset()
+        expression = None
+        if start is not None:
+            start = pd.Timestamp(start)
+            expression = (ds.field(PARTITION_COLUMN) >= start.strftime('%Y-%m')) & \
+                (ds.field('Horodateur') >= start.to_datetime64())
+        if end is not None:
+            end = pd.Timestamp(end)
+            condition = (ds.field(PARTITION_COLUMN) <= end.strftime('%Y-%m')) & \
+                (ds.field('Horodateur') <= end.to_datetime64())
+            expression = condition if expression is None else expression & condition
+
+        if columns is not None and 'Horodateur' not in columns:
+            columns = ['Horodateur'] + list(columns)
+
+        table = dataset.to_table(columns=columns, filter=expression)
+        df = table.to_pandas()
+        if PARTITION_COLUMN in df.columns:
+            df = df.drop(columns=PARTITION_COLUMN)
+        if {'NPS_Score', 'NPS_Category'} <= set(df.columns):
+            return normalize_responses(df)
+        return ensure_sorted(df, 'Horodateur')
+
+    def read_period(self, period: str, columns: Optional[List[str]] = None,
+                    end_date: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        Réponses d'une période du tableau de bord ('28D', '365D', ...)
+        """
+        start_date, end_date = period_window(period, end_date)
+        return self.read(start_date, end_date, columns)
+
+    def partitions(self) -> List[str]:
+        return sorted(p.name.split('=', 1)[1] for p in self.root.glob(f"{PARTITION_COLUMN}=*") if p.is_dir())
@@ -0,0 +1,69 @@
+# src/utils/prefix_sums.py
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+
+@dataclass
+class PrefixSums:
+    """
+    Sommes cumulées journalières sur une plage de jours continue.
+    La ligne i de cumsum contient le total des i premiers jours (ligne 0 = zéros),
+    la somme sur une fenêtre est donc une simple différence en O(1).
+    """
+    first_day: pd.Timestamp
+    n_days: int
+    columns: pd.Index
+    cumsum: np.ndarray  # (n_days + 1, n_colonnes)
+
+    @property
+    def days(self) -> pd.DatetimeIndex:
+        return pd.date_range(self.first_day, periods=self.n_days, freq='D')
+
+    def day_offset(self, day) -> int:
+        """Décalage en jours par rapport au premier jour de la plage"""
+        return (pd.Timestamp(day).normalize() - self.first_day).days
+
+    def window_totals(self, start, end, closed: str = 'both') -> pd.Series:
+        """
+        Totaux de toutes les colonnes sur les jours de la fenêtre
+        """
+        lo = self.day_offset(start) + (0 if closed in ('both', 'left') else 1)
+        hi = self.day_offset(end) + (1 if closed in ('both', 'right') else 0)
+        lo = min(max(lo, 0), self.n_days)
+        hi = min(max(hi, lo), self.n_days)
+        return pd.Series(self.cumsum[hi] - self.cumsum[lo], index=self.columns)
+
+    def rolling_totals(self, windows: Iterable[int]) -> Dict[int, pd.DataFrame]:
+        """
+        Totaux glissants sur les `w` derniers jours, pour chaque jour et chaque
+        longueur de fenêtre, calculés en une seule opération vectorisée
+        """
+        windows = np.asarray(list(windows), dtype=np.int64)
+        hi = np.arange(1, self.n_days + 1)
+        lo = np.clip(hi[None, :] - windows[:, None], 0, None)
+        totals = self.cumsum[hi][None, :, :] - self.cumsum[lo]
+        days = self.days
+        return {
+            int(w): pd.DataFrame(totals[i], index=days, columns=self.columns)
+            for i, w in enumerate(windows)
+        }
+
+
+def build_prefix_sums(frames: Dict[str, pd.DataFrame]) -> PrefixSums:
+    """
+    Construit les sommes cumulées à partir de tables journalières indexées par jour.
+    Les colonnes résultantes sont préfixées par la clé de chaque table.
+    """
+    daily = pd.concat(frames, axis=1)
+    if len(daily) == 0:
+        return PrefixSums(pd.Timestamp.now().normalize(), 0, daily.columns, np.zeros((1, daily.shape[1])))
+
+    # Plage continue : les jours sans réponse comptent pour zéro
+    days = pd.date_range(daily.index.min(), daily.index.max(), freq='D')
+    values = daily.reindex(days, fill_value=0).to_numpy(dtype=np.float64)
+
+    cumsum = np.zeros((len(days) + 1, values.shape[1]))
+    np.cumsum(values, axis=0, out=cumsum[1:])
+    return PrefixSums(days[0], len(days), daily.columns, cumsum)
@@ -0,0 +1,134 @@
+# src/utils/rollup.py
+import pandas as pd
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+from utils.schema import service_columns as registry_service_columns
+from utils.prefix_sums import PrefixSums, build_prefix_sums
+from utils.windows import window_slice
+
+# Correspondance catégorie NPS -> colonne de comptage
+CATEGORY_COLUMNS = {
+    'Promoteur': 'promoteurs',
+    'Passif': 'passifs',
+    'Détracteur': 'detracteurs'
+}
+COUNT_COLUMNS = ['total', 'promoteurs', 'passifs', 'detracteurs']
+
+
+@dataclass
+class DailyRollup:
+    """
+    Agrégat journalier des réponses, construit une seule fois par chargement.
+    Chaque DataFrame est indexé par jour (DatetimeIndex trié).
+    """
+    counts: pd.DataFrame        # total / promoteurs / passifs / detracteurs
+    score_sums: pd.DataFrame    # somme des notes par service
+    score_counts: pd.DataFrame  # nombre de notes renseignées par service
+    score_sumsq: pd.DataFrame   # somme des carrés des notes (variance)
+    version: str = ''           # empreinte du jeu de données source
+
+    @property
+    def service_columns(self) -> List[str]:
+        return list(self.score_sums.columns)
+
+    @cached_property
+    def prefix_sums(self) -> PrefixSums:
+        """Sommes cumulées (comptages NPS, sommes et effectifs par service)"""
+        return build_prefix_sums({
+            'counts': self.counts,
+            'sum': self.score_sums,
+            'n': self.score_counts
+        })
+
+
+def build_daily_rollup(df: pd.DataFrame, service_columns: Optional[List[str]] = None, version: str = '') -> DailyRollup:
+    """
+    Construit le cube jour x (comptages NPS, sommes et effectifs par service)
+    """
+    if service_columns is None:
+        service_columns = registry_service_columns(df)
+
+    day = pd.to_datetime(df['Horodateur']).dt.normalize().rename('Date')
+
+    # Comptages par catégorie NPS
+    counts = (
+        pd.crosstab(day, df['NPS_Category'])
+        .reindex(columns=list(CATEGORY_COLUMNS), fill_value=0)
+        .rename(columns=CATEGORY_COLUMNS)
+    )
+    counts.columns.name = None
+    counts.insert(0, 'total', counts.sum(axis=1))
+
+    # Sommes et effectifs des notes de service
+    # (notes élargies en Int64 : les sommes ne doivent pas déborder de l'int8)
+    scores = df[service_columns].astype('Int64')
+    score_sums = scores.groupby(day).sum().reindex(counts.index, fill_value=0).astype('int64')
+    score_sumsq = (scores ** 2).groupby(day).sum().reindex(counts.index, fill_value=0).astype('int64')
+    score_counts = scores.groupby(day).count().reindex(counts.index, fill_value=0).astype('int64')
+
+    return DailyRollup(
+        counts=counts.sort_index(),
+        score_sums=score_sums.sort_index(),
+        score_counts=score_counts.sort_index(),
+        score_sumsq=score_sumsq.sort_index(),
+        version=version
+    )
+
+
+def club_version(version: str, club: str) -> str:
+    """
+    Version de l'agrégat d'un club, distincte de celle du réseau dans les clés de cache
+    """
+    return f"{version}:{club}"
+
+
+def build_club_rollups(df: pd.DataFrame, version: str) -> Dict[str, DailyRollup]:
+    """
+    Agrégat journalier de chaque club (partition de la colonne Club)
+    """
+    return {
+        str(club): build_daily_rollup(shard, version=club_version(version, str(club)))
+        for club, shard in df.groupby('Club', observed=True, sort=True)
+    }
+
+
+def day_slice(frame: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp, closed: str = 'both') -> pd.DataFrame:
+    """
+    Lignes journalières de la fenêtre [start, end] (bornes ramenées au jour)
+    """
+    return window_slice(frame, pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), closed=closed)
+
+
+def window_counts(rollup: DailyRollup, start: pd.Timestamp, end: pd.Timestamp, closed: str = 'both') -> pd.Series:
+    """
+    Somme des comptages NPS sur les jours de la fenêtre (différence de sommes cumulées)
+    """
+    totals = rollup.prefix_sums.window_totals(start, end, closed)
+    return totals['counts'].reindex(COUNT_COLUMNS, fill_value=0).astype('int64')
+
+
+def window_scores(rollup: DailyRollup, start: pd.Timestamp, end: pd.Timestamp, closed: str = 'both') -> Tuple[pd.Series, pd.Series]:
+    """
+    Sommes et effectifs des notes de service sur les jours de la fenêtre
+    """
+    totals = rollup.prefix_sums.window_totals(start, end, closed)
+    return totals['sum'], totals['n'].astype('int64')
+
+
+def rolling_nps(rollup: DailyRollup, windows: List[int]) -> pd.DataFrame:
+    """
+    NPS glissant journalier pour plusieurs longueurs de fenêtre (en jours).
+    Table longue : Date, Fenêtre, NPS_Score, total.
+    """
+    frames = []
+    for window, totals in rollup.prefix_sums.rolling_totals(windows).items():
+        counts = totals['counts']
+        total = counts['total']
+        frames.append(pd.DataFrame({
+            'Date': counts.index,
+            'Fenêtre': f"{window} jours",
+            'NPS_Score': ((counts['promoteurs'] - counts['detracteurs']) / total.where(total > 0) * 100).to_numpy(),
+            'total': total.to_numpy().astype('int64')
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Date', 'Fenêtre', 'NPS_Score', 'total'])
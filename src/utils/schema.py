@@ -0,0 +1,133 @@
+# src/utils/schema.py
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from utils.windows import ensure_sorted
+
+# Début commun des questions de satisfaction du formulaire
+QUESTION_PREFIX = "sur une echelle de 1 à 5, 1 etant la pire note et 5 la meilleure, notez votre satisfaction concernant "
+
+# Catégories NPS (ordre d'affichage)
+NPS_CATEGORIES = ['Promoteur', 'Passif', 'Détracteur']
+NPS_CATEGORY_DTYPE = pd.CategoricalDtype(NPS_CATEGORIES)
+
+
+@dataclass(frozen=True)
+class ServiceMetric:
+    """
+    Métrique de satisfaction : identifiant court stable, question d'origine et libellé
+    """
+    metric_id: str
+    question: str
+    display_name: str
+    category: str
+
+
+# Registre des métriques de service
+SERVICE_METRICS = [
+    # Général
+    ServiceMetric('ambiance', QUESTION_PREFIX + "l'ambiance générale", "Ambiance générale", "Général"),
+    ServiceMetric('proprete', QUESTION_PREFIX + "la propreté générale", "Propreté générale", "Général"),
+
+    # Expériences
+    ServiceMetric('salle_sport', QUESTION_PREFIX + "l'expérience à la salle de sport", "Salle de sport", "Expériences"),
+    ServiceMetric('piscine', QUESTION_PREFIX + "l'expérience piscine", "Piscine", "Expériences"),
+    ServiceMetric('equipements', QUESTION_PREFIX + "la disponibilité des équipements sportifs", "Disponibilité des équipements", "Expériences"),
+    ServiceMetric('vestiaires', QUESTION_PREFIX + "les vestiaires (douches / sauna/ serviettes..)", "Vestiaires", "Expériences"),
+
+    # Personnel
+    ServiceMetric('coachs', QUESTION_PREFIX + "les coachs", "Coachs", "Personnel"),
+    ServiceMetric('maitres_nageurs', QUESTION_PREFIX + "les maitres nageurs", "Maîtres nageurs", "Personnel"),
+    ServiceMetric('accueil', QUESTION_PREFIX + "le personnel d'accueil", "Personnel d'accueil", "Personnel"),
+    ServiceMetric('commercial', QUESTION_PREFIX + "Le commercial", "Commercial", "Personnel"),
+
+    # Services
+    ServiceMetric('coaching_groupe', QUESTION_PREFIX + "La qualité des coaching en groupe", "Coaching en groupe", "Services"),
+    ServiceMetric('planning', QUESTION_PREFIX + "la disponibilité des cours sur le planning", "Cours au planning", "Services"),
+    ServiceMetric('restauration', QUESTION_PREFIX + "la restauration", "Restauration", "Services"),
+    ServiceMetric('evenements', QUESTION_PREFIX + "les événements et animations", "Événements et animations", "Services"),
+]
+
+METRICS_BY_ID = {m.metric_id: m for m in SERVICE_METRICS}
+METRICS_BY_QUESTION = {m.question: m for m in SERVICE_METRICS}
+
+
+@dataclass(frozen=True)
+class SegmentAttribute:
+    """
+    Attribut des répondants servant à filtrer les réponses (valeurs ordonnées ;
+    None : valeurs lues dans les données)
+    """
+    column: str
+    display_name: str
+    values: Optional[Tuple[str, ...]] = None
+
+
+# Registre des attributs de segmentation
+SEGMENT_ATTRIBUTES = [
+    SegmentAttribute('Club', "Club"),
+    SegmentAttribute('Abonnement', "Type d'abonnement", ('Mensuel', 'Annuel', 'Étudiant', 'Famille')),
+    SegmentAttribute('Anciennete', "Ancienneté", ("Moins d'un an", "1 à 3 ans", "Plus de 3 ans")),
+    SegmentAttribute('Tranche_Age', "Tranche d'âge", ('18-25 ans', '26-35 ans', '36-50 ans', 'Plus de 50 ans')),
+]
+
+SEGMENTS_BY_COLUMN = {a.column: a for a in SEGMENT_ATTRIBUTES}
+
+
+def service_categories() -> Dict[str, List[ServiceMetric]]:
+    """
+    Regroupe les métriques du registre par catégorie d'affichage
+    """
+    categories = {}
+    for metric in SERVICE_METRICS:
+        categories.setdefault(metric.category, []).append(metric)
+    return categories
+
+
+def service_columns(df: pd.DataFrame) -> List[str]:
+    """
+    Identifiants des métriques de service présentes dans le DataFrame
+    """
+    return [m.metric_id for m in SERVICE_METRICS if m.metric_id in df.columns]
+
+
+def segment_columns(df: pd.DataFrame) -> List[str]:
+    """
+    Attributs de segmentation présents dans le DataFrame
+    """
+    return [a.column for a in SEGMENT_ATTRIBUTES if a.column in df.columns]
+
+
+def nps_category(scores: pd.Series) -> pd.Categorical:
+    """
+    Catégorie NPS de chaque note (Promoteur >= 8, Passif >= 6, sinon Détracteur)
+    """
+    values = np.asarray(scores)
+    codes = np.where(values >= 8, 0, np.where(values >= 6, 1, 2))
+    return pd.Categorical.from_codes(codes, dtype=NPS_CATEGORY_DTYPE)
+
+
+def normalize_responses(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convertit les réponses brutes vers le schéma canonique en mémoire :
+    identifiants courts, NPS_Category catégorielle, notes en int8 / Int8,
+    lignes triées par Horodateur
+    """
+    df = df.rename(columns={q: m.metric_id for q, m in METRICS_BY_QUESTION.items()})
+
+    df['Horodateur'] = pd.to_datetime(df['Horodateur'])
+    df = ensure_sorted(df, 'Horodateur')
+    df['NPS_Score'] = df['NPS_Score'].astype('int8')
+    df['NPS_Category'] = df['NPS_Category'].astype(NPS_CATEGORY_DTYPE)
+
+    for column in service_columns(df):
+        # Int8 nullable : les questions facultatives peuvent rester sans réponse
+        df[column] = pd.to_numeric(df[column]).astype('Int8')
+    for column in segment_columns(df):
+        # Attributs à valeurs connues en catégories ordonnées (valeurs hors registre -> NaN)
+        values = SEGMENTS_BY_COLUMN[column].values
+        if values is not None:
+            df[column] = df[column].astype(pd.CategoricalDtype(values))
+
+    return df
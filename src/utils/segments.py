@@ -0,0 +1,190 @@
+# src/utils/segments.py
+# Index des segments de répondants : un bitmap (1 bit par réponse, np.packbits) par
+# valeur de chaque attribut. Une sélection multi-critères se résout par OU entre les
+# valeurs d'un attribut et ET entre attributs. Les bits sont rangés par bloc
+# (jour, catégorie NPS), chaque bloc commençant sur un mot de 64 bits : l'agrégat journalier
+# d'une sélection se réduit à des comptages de bits par bloc, sans re-filtrer le DataFrame.
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence
+import numpy as np
+import pandas as pd
+from utils.rollup import COUNT_COLUMNS, DailyRollup
+from utils.schema import segment_columns, service_columns
+
+# Nombre de bits à 1 de chaque octet
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+WORD_BITS = 64
+
+# Catégories NPS d'un jour (promoteurs, passifs, detracteurs) : un bloc de bits chacune
+N_CATEGORIES = len(COUNT_COLUMNS) - 1
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Nombre de bits à 1 de chaque mot de 64 bits"""
+    if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0
+        return np.bitwise_count(words)
+    return _POPCOUNT[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+@dataclass(frozen=True)
+class SegmentIndex:
+    """
+    Index figé d'un jeu de réponses trié par Horodateur.
+    Les bitmaps sont des mots de 64 bits (uint64) dont les bits suivent l'ordre des blocs
+    (jour, catégorie NPS), chaque bloc complété au mot : `block_offsets` donne le mot de début
+    de chaque bloc (n_jours x 3 + 1 valeurs).
+    `bitmaps[attribut][valeur]` : réponses ayant cette valeur.
+    `score_bitmaps[service, niveau]` : réponses ayant donné la note `score_levels[niveau]`.
+    `valid` : bits des réponses (hors bourrage) ; `rows` : réponse de chaque bit (-1 : bourrage).
+    """
+    n_rows: int
+    bitmaps: Dict[str, Dict[str, np.ndarray]]
+    days: pd.DatetimeIndex
+    block_offsets: np.ndarray   # (n_jours x 3 + 1,) int64, croissant
+    valid: np.ndarray           # (mots,) uint64
+    rows: np.ndarray            # (mots x 64,) int64
+    score_bitmaps: np.ndarray   # (k, niveaux, mots) uint64
+    score_levels: np.ndarray    # (niveaux,) int64
+    metric_ids: List[str]
+
+    @property
+    def attributes(self) -> List[str]:
+        return list(self.bitmaps)
+
+    def values(self, attribute: str) -> List[str]:
+        return list(self.bitmaps[attribute])
+
+    def all_rows(self) -> np.ndarray:
+        return self.valid.copy()
+
+    def select(self, filters: Mapping[str, Sequence[str]]) -> np.ndarray:
+        """
+        Bitmap des réponses retenues : OU entre les valeurs d'un attribut, ET entre attributs
+        (attribut sans valeur choisie : pas de filtre)
+        """
+        selection = self.all_rows()
+        for attribute, values in filters.items():
+            if not values:
+                continue
+            bitmaps = self.bitmaps[attribute]
+            union = np.zeros_like(selection)
+            for value in values:
+                if value in bitmaps:
+                    np.bitwise_or(union, bitmaps[value], out=union)
+            np.bitwise_and(selection, union, out=selection)
+        return selection
+
+    def count(self, selection: np.ndarray) -> int:
+        """Nombre de réponses sélectionnées"""
+        return int(_popcount(selection).sum(dtype=np.int64))
+
+    def positions(self, selection: np.ndarray) -> np.ndarray:
+        """Positions (croissantes) des réponses sélectionnées"""
+        return np.sort(self.rows[np.flatnonzero(np.unpackbits(selection.view(np.uint8)))])
+
+    def _day_counts(self, masked: np.ndarray) -> np.ndarray:
+        """Bits à 1 de chaque jour, le long du dernier axe (blocs d'un jour jamais vides)"""
+        if len(self.days) == 0:
+            return np.zeros(masked.shape[:-1] + (0,), dtype=np.int64)
+        day_offsets = self.block_offsets[:-1:N_CATEGORIES]
+        return np.add.reduceat(_popcount(masked), day_offsets, axis=-1, dtype=np.int64)
+
+    def rollup(self, selection: np.ndarray, version: str = '') -> DailyRollup:
+        """
+        Agrégat journalier des réponses sélectionnées : comptages NPS par bloc (jour, catégorie),
+        effectifs par (service, note) par jour, d'où les sommes et sommes des carrés
+        """
+        # Blocs (jour, catégorie) éventuellement vides : différences de cumuls
+        cumulated = np.zeros(len(selection) + 1, dtype=np.int64)
+        np.cumsum(_popcount(selection), out=cumulated[1:])
+        counts = np.diff(cumulated[self.block_offsets]).reshape(-1, N_CATEGORIES)
+        # Jours sans réponse sélectionnée omis (comme dans l'agrégat des réponses brutes)
+        present = counts.sum(axis=1) > 0
+        index = pd.DatetimeIndex(self.days[present], name='Date')
+        counts = pd.DataFrame(counts[present], index=index, columns=COUNT_COLUMNS[1:])
+        counts.insert(0, 'total', counts.sum(axis=1))
+
+        # Effectifs (k, niveaux, jours) : bits de (sélection ET note) de chaque jour
+        levels = self._day_counts(self.score_bitmaps & selection)[..., present]
+
+        def per_day(weights: np.ndarray) -> pd.DataFrame:
+            totals = np.einsum('kld,l->dk', levels, weights)
+            return pd.DataFrame(totals, index=index, columns=self.metric_ids)
+
+        return DailyRollup(
+            counts=counts,
+            score_sums=per_day(self.score_levels),
+            score_counts=per_day(np.ones_like(self.score_levels)),
+            score_sumsq=per_day(self.score_levels ** 2),
+            version=version
+        )
+
+
+def build_segment_index(df: pd.DataFrame, attributes: Optional[List[str]] = None) -> SegmentIndex:
+    """
+    Construit l'index une fois par jeu de données (réponses triées par Horodateur)
+    """
+    if attributes is None:
+        attributes = segment_columns(df)
+
+    # Rang de chaque réponse dans son bloc (jour, catégorie), blocs complétés au mot
+    day = pd.to_datetime(df['Horodateur']).dt.normalize()
+    day_codes, days = pd.factorize(day, sort=True)
+    blocks = day_codes.astype(np.int64) * N_CATEGORIES + df['NPS_Category'].cat.codes.to_numpy()
+    sizes = np.bincount(blocks, minlength=len(days) * N_CATEGORIES)
+    block_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(-(-sizes // WORD_BITS), out=block_offsets[1:])
+    order = np.argsort(blocks, kind='stable')
+    first = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    bits = np.empty(len(df), dtype=np.int64)
+    bits[order] = block_offsets[blocks[order]] * WORD_BITS + np.arange(len(df)) - first[blocks[order]]
+    n_bits = int(block_offsets[-1]) * WORD_BITS
+
+    def pack(mask: np.ndarray) -> np.ndarray:
+        # Bitmap d'un masque par réponse, dans l'ordre des blocs
+        laid_out = np.zeros(n_bits, dtype=bool)
+        laid_out[bits] = mask
+        return np.packbits(laid_out).view(np.uint64)
+
+    bitmaps = {}
+    for attribute in attributes:
+        values = df[attribute].astype('category')
+        codes = values.cat.codes.to_numpy()
+        bitmaps[attribute] = {str(value): pack(codes == code) for code, value in enumerate(values.cat.categories)}
+
+    metric_ids = service_columns(df)
+    scores = df[metric_ids].to_numpy(dtype='int8', na_value=0) if metric_ids else np.zeros((len(df), 0), dtype=np.int8)
+    score_levels = np.unique(scores[scores > 0]).astype(np.int64)
+    score_bitmaps = np.zeros((len(metric_ids), len(score_levels), n_bits // WORD_BITS), dtype=np.uint64)
+    for k in range(len(metric_ids)):
+        for level, score in enumerate(score_levels):
+            score_bitmaps[k, level] = pack(scores[:, k] == score)
+
+    rows = np.full(n_bits, -1, dtype=np.int64)
+    rows[bits] = np.arange(len(df))
+    index = SegmentIndex(
+        n_rows=len(df),
+        bitmaps=bitmaps,
+        days=pd.DatetimeIndex(days),
+        block_offsets=block_offsets,
+        valid=pack(np.ones(len(df), dtype=bool)),
+        rows=rows,
+        score_bitmaps=score_bitmaps,
+        score_levels=score_levels,
+        metric_ids=metric_ids
+    )
+    # Index partagé entre les sessions : tableaux en lecture seule
+    for array in [index.block_offsets, index.valid, index.rows, index.score_bitmaps, index.score_levels] + \
+            [bitmap for bitmaps in index.bitmaps.values() for bitmap in bitmaps.values()]:
+        array.flags.writeable = False
+    return index
+
+
+def selection_key(filters: Mapping[str, Sequence[str]]) -> str:
+    """
+    Empreinte stable d'un jeu de filtres (clés de cache et version de l'agrégat)
+    """
+    active = sorted((attribute, sorted(map(str, values))) for attribute, values in filters.items() if values)
+    return hashlib.sha1(repr(active).encode()).hexdigest()[:16]
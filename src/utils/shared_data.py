@@ -0,0 +1,132 @@
+# src/utils/shared_data.py
+# Données partagées par toutes les sessions du serveur : une version immuable des
+# données par source, avec ses agrégats dérivés calculés une seule fois. Les sessions
+# n'en conservent que des références (et leurs petits résultats dans leur propre cache).
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import pandas as pd
+
+_MISSING = object()
+
+# Dates de référence conservées par famille d'agrégats datés (ex. la date configurée
+# d'une session et aujourd'hui) ; les plus anciennement demandées sont libérées
+DATED_ENTRIES = 2
+
+
+class DatasetVersion:
+    """
+    Version des données en lecture seule : réponses brutes (si elles sont en mémoire)
+    et agrégats dérivés (agrégats par club, index des segments, analyses...), chacun
+    calculé une fois pour tout le processus puis partagé sans copie
+    """
+
+    def __init__(self, version: str, responses: Optional[pd.DataFrame] = None, dated_entries: int = DATED_ENTRIES):
+        self.version = version
+        self.responses = responses
+        self.loaded_at = pd.Timestamp.now()
+        self.dated_entries = dated_entries
+        self._derived: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._dated: Dict[Tuple, OrderedDict] = {}
+        self._lock = threading.Lock()
+
+    def derive(self, key: Tuple, compute: Callable[[], Any], as_of: Optional[pd.Timestamp] = None) -> Any:
+        """
+        Agrégat dérivé de cette version : le premier appel le calcule, les sessions
+        qui le demandent en même temps attendent ce calcul au lieu de le refaire.
+        Un agrégat daté (`as_of`) n'est conservé que pour les `dated_entries` dernières
+        dates de référence demandées pour la même clé.
+        """
+        full_key = key if as_of is None else key + (as_of,)
+        if as_of is not None:
+            self._touch(key, as_of)
+        value = self._derived.get(full_key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(full_key, threading.Lock())
+        with key_lock:
+            value = self._derived.get(full_key, _MISSING)
+            if value is _MISSING:
+                value = compute()
+                with self._lock:
+                    # Date libérée pendant le calcul : le résultat est rendu sans être conservé
+                    if as_of is None or as_of in self._dated.get(key, ()):
+                        self._derived[full_key] = value
+            return value
+
+    def discard(self, key: Tuple, as_of: Optional[pd.Timestamp] = None):
+        """
+        Oublie un agrégat dérivé (ex. calcul en échec) : le prochain appel le recalcule
+        """
+        full_key = key if as_of is None else key + (as_of,)
+        with self._lock:
+            self._derived.pop(full_key, None)
+
+    def _touch(self, key: Tuple, as_of: pd.Timestamp):
+        """Marque la date comme la plus récemment demandée et libère les plus anciennes"""
+        with self._lock:
+            dates = self._dated.setdefault(key, OrderedDict())
+            dates[as_of] = None
+            dates.move_to_end(as_of)
+            while len(dates) > self.dated_entries:
+                stale, _ = dates.popitem(last=False)
+                self._derived.pop(key + (stale,), None)
+                self._key_locks.pop(key + (stale,), None)
+
+    @property
+    def derived_keys(self) -> List[Hashable]:
+        return list(self._derived)
+
+
+class SharedDataset:
+    """
+    Version courante des données d'une source. La lecture (`current`) est sans verrou ;
+    une nouvelle version est chargée à part puis substituée par une seule affectation :
+    les sessions en cours gardent l'ancienne, libérée quand plus personne ne la référence.
+    """
+
+    def __init__(self, load: Callable[[Optional[str]], DatasetVersion]):
+        self._load = load
+        self._current: Optional[DatasetVersion] = None
+        self._loading = threading.Lock()
+
+    @property
+    def current(self) -> Optional[DatasetVersion]:
+        return self._current
+
+    def refresh(self, version: Optional[str] = None) -> DatasetVersion:
+        """
+        Version courante, rechargée si `version` (version de la source) a changé ;
+        None : source figée, chargée une seule fois.
+        Un seul chargement à la fois : pendant un rechargement, les autres sessions
+        continuent de lire l'ancienne version (seul le tout premier chargement est attendu).
+        """
+        current = self._current
+        if current is not None and (version is None or current.version == version):
+            return current
+        if not self._loading.acquire(blocking=current is None):
+            return current
+        try:
+            current = self._current
+            if current is None or (version is not None and current.version != version):
+                current = self._load(version)
+                self._current = current
+            return current
+        finally:
+            self._loading.release()
+
+
+_datasets: Dict[Hashable, SharedDataset] = {}
+_datasets_lock = threading.Lock()
+
+
+def shared_dataset(source: Hashable, load: Callable[[Optional[str]], DatasetVersion]) -> SharedDataset:
+    """
+    Données partagées d'une source (une instance par source et par processus serveur)
+    """
+    with _datasets_lock:
+        if source not in _datasets:
+            _datasets[source] = SharedDataset(load)
+        return _datasets[source]
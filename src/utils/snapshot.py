@@ -0,0 +1,397 @@
+# src/utils/snapshot.py
+# Instantané précalculé du tableau de bord : en-tête, évolution, NPS glissant et grille des services
+# de chaque club et de chaque période, figés à une date de référence (as_of).
+# Le fichier contient un manifeste JSON suivi de tableaux bruts alignés, lus par
+# projection mémoire (np.memmap) : l'ouverture ne charge que le manifeste.
+import argparse
+import json
+import os
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from utils.aggregate_store import AggregateStore
+from utils.cache import dataset_fingerprint
+from utils.comparison import COMPARISON_MODES
+from utils.config import CONFIG_FILE, ConfigStore, get_config, use_config
+from utils.ingestion import ingest_export
+from utils.metrics import (
+    BUCKET_FREQUENCIES,
+    HeaderMetrics,
+    ServiceDelta,
+    TrendBuckets,
+    apply_threshold,
+    calculate_nps_metrics,
+    compute_rolling_nps,
+    compute_service_grid,
+    compute_trend_buckets,
+    confidence_settings
+)
+from utils.network import NETWORK_LABEL
+from utils.parquet_store import ParquetResponseStore
+from utils.rollup import DailyRollup, build_club_rollups, build_daily_rollup, club_version
+from utils.schema import METRICS_BY_ID, SERVICE_METRICS, normalize_responses
+from utils.synthetic import TEST_DATASET, generate_responses
+from utils.windows import as_of_day
+
+SNAPSHOT_MAGIC = b'NPSSNAP1'
+SNAPSHOT_FORMAT = 1
+ALIGNMENT = 64
+
+# Colonnes des tableaux de l'instantané
+HEADER_FIELDS = ['nps_score', 'promoters_pct', 'passive_pct', 'detractors_pct', 'total_responses',
+                 'promoters', 'passives', 'detractors', 'nps_low', 'nps_high']
+TREND_FIELDS = ['day', 'total', 'promoteurs', 'passifs', 'detracteurs', 'NPS_Score', 'NPS_Low', 'NPS_High']
+SERVICE_FIELDS = ['day', 'metric', 'mean', 'low', 'high', 'n']
+GRID_FIELDS = ['current_mean', 'previous_mean', 'delta', 'current_n', 'previous_n', 'stderr', 'margin']
+ROLLING_FIELDS = ['day', 'window', 'NPS_Score', 'total']
+
+EPOCH = pd.Timestamp('1970-01-01')
+
+
+def _days(index) -> np.ndarray:
+    """Jours depuis l'epoch (stockage compact des dates de début de période)"""
+    return ((pd.DatetimeIndex(index) - EPOCH) // pd.Timedelta(days=1)).to_numpy(dtype='float64')
+
+
+def _dates(days: np.ndarray) -> pd.DatetimeIndex:
+    return EPOCH + pd.to_timedelta(np.asarray(days, dtype='int64'), unit='D')
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_arrays(path: str, manifest: Dict, arrays: Dict[str, np.ndarray]):
+    """
+    Écrit le manifeste et les tableaux (remplacement atomique du fichier).
+    Format : magique (8 octets), longueur du manifeste (uint64), manifeste JSON,
+    puis chaque tableau en C contigu à un décalage aligné sur 64 octets.
+    """
+    specs, offset = {}, 0
+    for name, array in arrays.items():
+        specs[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+    manifest = dict(manifest, arrays=specs)
+    # Les décalages sont relatifs au début de la zone de données, après le manifeste aligné
+    header = json.dumps(manifest, ensure_ascii=False).encode('utf-8')
+    data_start = _align(len(SNAPSHOT_MAGIC) + 8 + len(header))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + specs[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp, path)
+
+
+def read_arrays(path: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """
+    Lit le manifeste et projette chaque tableau en mémoire (lecture seule, sans copie)
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} n'est pas un instantané NPS")
+        length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        manifest = json.loads(f.read(length).decode('utf-8'))
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"Format d'instantané non pris en charge : {manifest.get('format')}")
+
+    data_start = _align(len(SNAPSHOT_MAGIC) + 8 + length)
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        shape = tuple(spec['shape'])
+        if 0 in shape:
+            arrays[name] = np.empty(shape, dtype=spec['dtype'])
+        else:
+            arrays[name] = np.memmap(path, dtype=spec['dtype'], mode='r', offset=data_start + spec['offset'], shape=shape)
+    return manifest, arrays
+
+
+def _offsets(blocks: List[np.ndarray], width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatène des blocs de lignes et retourne (lignes, décalages de début de chaque bloc)"""
+    offsets = np.zeros(len(blocks) + 1, dtype='int64')
+    offsets[1:] = np.cumsum([len(b) for b in blocks])
+    rows = np.concatenate(blocks) if blocks else np.empty((0, width))
+    return rows.reshape(-1, width).astype('float64'), offsets
+
+
+def build_snapshot(rollups: Dict[str, DailyRollup], as_of: Optional[pd.Timestamp] = None,
+                   periods: Optional[List[str]] = None, comparisons: Optional[List[str]] = None,
+                   windows: Optional[List[int]] = None, level: Optional[float] = None,
+                   method: Optional[str] = None) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """
+    Calcule toutes les vues de chaque agrégat (club ou réseau) à la date de référence.
+    Retourne le manifeste et les tableaux à écrire.
+    """
+    as_of = as_of_day(as_of)
+    if periods is None:
+        periods = list(dict.fromkeys(get_config('PERIODS', {}).values()))
+    if comparisons is None:
+        comparisons = list(COMPARISON_MODES)
+    if windows is None:
+        windows = get_config('ROLLING_WINDOWS', [7, 28, 90])
+    windows = sorted(windows)
+    level, method = confidence_settings(level, method)
+    clubs = list(rollups)
+    metric_ids = [m.metric_id for m in SERVICE_METRICS]
+    metric_index = {m: i for i, m in enumerate(metric_ids)}
+
+    header = np.full((len(clubs), len(periods), len(HEADER_FIELDS)), np.nan)
+    grid = np.full((len(clubs), len(periods), len(comparisons), len(metric_ids), len(GRID_FIELDS)), np.nan)
+    trend_blocks, service_blocks, rolling_blocks, frequencies = [], [], [], {}
+
+    for c, club in enumerate(clubs):
+        rollup = rollups[club]
+        # NPS glissant : tout l'historique jusqu'à la date de référence, indépendant de la période
+        rolling = compute_rolling_nps(rollup, windows, as_of)
+        rolling_blocks.append(np.column_stack([
+            _days(rolling['Date']),
+            rolling['Fenêtre'].str.split(' ').str[0].to_numpy(dtype='float64'),
+            rolling[['NPS_Score', 'total']].to_numpy(dtype='float64')
+        ]))
+        for p, period in enumerate(periods):
+            metrics = calculate_nps_metrics(rollup, period, level, method, as_of=as_of)
+            header[c, p] = [np.nan if v is None else v for v in (getattr(metrics, f) for f in HEADER_FIELDS)]
+
+            trend = compute_trend_buckets(rollup, period, level=level, method=method, as_of=as_of)
+            frequencies.setdefault(period, trend.frequency)
+            table = trend.table
+            trend_blocks.append(np.column_stack(
+                [_days(table['Period_Start'])] + [table[f].to_numpy(dtype='float64') for f in TREND_FIELDS[1:]]
+            ))
+            services = trend.services
+            service_blocks.append(np.column_stack([
+                _days(services['Period_Start']),
+                services['metric_id'].map(metric_index).to_numpy(dtype='float64'),
+                services[['mean', 'low', 'high', 'n']].to_numpy(dtype='float64')
+            ]))
+
+            for m, comparison in enumerate(comparisons):
+                for delta in compute_service_grid(rollup, period, comparison, as_of=as_of, level=level):
+                    grid[c, p, m, metric_index[delta.metric.metric_id]] = [
+                        np.nan if v is None else v for v in (getattr(delta, f) for f in GRID_FIELDS)
+                    ]
+
+    trend_rows, trend_offsets = _offsets(trend_blocks, len(TREND_FIELDS))
+    service_rows, service_offsets = _offsets(service_blocks, len(SERVICE_FIELDS))
+    rolling_rows, rolling_offsets = _offsets(rolling_blocks, len(ROLLING_FIELDS))
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'as_of': as_of.isoformat(),
+        'created': pd.Timestamp.now().isoformat(),
+        'clubs': clubs,
+        'versions': {club: rollups[club].version for club in clubs},
+        'periods': periods,
+        'comparisons': comparisons,
+        'frequencies': frequencies,
+        'rolling_windows': windows,
+        'trend_max_buckets': get_config('TREND_MAX_BUCKETS', 120),
+        'metric_ids': metric_ids,
+        'confidence_level': level,
+        'ci_method': method
+    }
+    arrays = {
+        'header': header,
+        'trend': trend_rows,
+        'trend_offsets': trend_offsets,
+        'services': service_rows,
+        'service_offsets': service_offsets,
+        'rolling': rolling_rows,
+        'rolling_offsets': rolling_offsets,
+        'grid': grid
+    }
+    return manifest, arrays
+
+
+def write_snapshot(path: str, rollups: Dict[str, DailyRollup], as_of: Optional[pd.Timestamp] = None,
+                   periods: Optional[List[str]] = None, comparisons: Optional[List[str]] = None) -> 'Snapshot':
+    """
+    Précalcule et enregistre l'instantané, puis le rouvre en lecture
+    """
+    manifest, arrays = build_snapshot(rollups, as_of, periods, comparisons)
+    write_arrays(path, manifest, arrays)
+    return Snapshot.open(path)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Instantané ouvert : manifeste et tableaux projetés en mémoire.
+    Chaque accesseur retourne None pour une vue non couverte (calcul à la demande).
+    """
+    path: str
+    manifest: Dict
+    arrays: Dict[str, np.ndarray]
+
+    @classmethod
+    def open(cls, path: str) -> 'Snapshot':
+        manifest, arrays = read_arrays(path)
+        return cls(str(path), manifest, arrays)
+
+    @property
+    def as_of(self) -> pd.Timestamp:
+        return pd.Timestamp(self.manifest['as_of'])
+
+    @property
+    def clubs(self) -> List[str]:
+        return self.manifest['clubs']
+
+    def version(self, club: str) -> Optional[str]:
+        """Version des données du club au moment du précalcul"""
+        return self.manifest['versions'].get(club)
+
+    def covers(self, club: str, version: str, as_of: pd.Timestamp, confidence: Tuple[float, str]) -> bool:
+        """
+        Vrai si l'instantané a été calculé sur ces données, à cette date et avec ces intervalles
+        """
+        return (
+            self.version(club) == version
+            and self.as_of == as_of_day(as_of)
+            and (self.manifest['confidence_level'], self.manifest['ci_method']) == tuple(confidence)
+        )
+
+    def _position(self, club: str, period: str) -> Optional[Tuple[int, int]]:
+        if club not in self.clubs or period not in self.manifest['periods']:
+            return None
+        return self.clubs.index(club), self.manifest['periods'].index(period)
+
+    def header(self, club: str, period: str) -> Optional[HeaderMetrics]:
+        position = self._position(club, period)
+        if position is None:
+            return None
+        values = dict(zip(HEADER_FIELDS, self.arrays['header'][position].tolist()))
+        if values['total_responses'] == 0:
+            return HeaderMetrics.empty()
+        for field in ['total_responses', 'promoters', 'passives', 'detractors']:
+            values[field] = int(values[field])
+        return HeaderMetrics(**values)
+
+    def trend(self, club: str, period: str, threshold: Optional[float] = None) -> Optional[TrendBuckets]:
+        """
+        Agrégats d'évolution au regroupement automatique de la période ;
+        le drapeau de représentativité est recalculé pour le seuil courant
+        """
+        position = self._position(club, period)
+        if position is None or self.manifest['trend_max_buckets'] != get_config('TREND_MAX_BUCKETS', 120):
+            return None
+        block = position[0] * len(self.manifest['periods']) + position[1]
+        frequency = self.manifest['frequencies'][period]
+
+        offsets = self.arrays['trend_offsets']
+        rows = np.asarray(self.arrays['trend'][offsets[block]:offsets[block + 1]])
+        table = pd.DataFrame({'Period_Start': _dates(rows[:, 0])})
+        for i, field in enumerate(TREND_FIELDS[1:5], start=1):
+            table[field] = rows[:, i].astype('int64')
+        table['Display_Date'] = table['Period_Start'].dt.strftime(BUCKET_FREQUENCIES[frequency])
+        table['Sort_Key'] = table['Period_Start'].dt.strftime('%Y-%m-%d')
+        for i, field in enumerate(TREND_FIELDS[5:], start=5):
+            table[field] = rows[:, i]
+        table['NPS_CI_Width'] = table['NPS_High'] - table['NPS_Low']
+
+        offsets = self.arrays['service_offsets']
+        rows = np.asarray(self.arrays['services'][offsets[block]:offsets[block + 1]])
+        metric_ids = np.array(self.manifest['metric_ids'], dtype=object)
+        services = pd.DataFrame({
+            'Period_Start': _dates(rows[:, 0]),
+            'metric_id': metric_ids[rows[:, 1].astype('int64')],
+            'mean': rows[:, 2],
+            'low': rows[:, 3],
+            'high': rows[:, 4],
+            'n': rows[:, 5].astype('int64')
+        })
+
+        trend = TrendBuckets(period, table, services, frequency)
+        if threshold is None:
+            threshold = get_config('NPS_MAX_CI_WIDTH', 50)
+        return apply_threshold(trend, threshold)
+
+    def rolling(self, club: str, windows: List[int], as_of: Optional[pd.Timestamp] = None) -> Optional[pd.DataFrame]:
+        """
+        NPS glissant des fenêtres demandées au jour `as_of` (None si l'une d'elles
+        n'a pas été précalculée ou si l'instantané date d'un autre jour)
+        """
+        if club not in self.clubs or not set(windows) <= set(self.manifest['rolling_windows']):
+            return None
+        if self.as_of != as_of_day(as_of):
+            return None
+        c = self.clubs.index(club)
+        offsets = self.arrays['rolling_offsets']
+        rows = np.asarray(self.arrays['rolling'][offsets[c]:offsets[c + 1]])
+        rows = rows[np.isin(rows[:, 1], windows)]
+        return pd.DataFrame({
+            'Date': _dates(rows[:, 0]),
+            'Fenêtre': [f"{int(w)} jours" for w in rows[:, 1]],
+            'NPS_Score': rows[:, 2],
+            'total': rows[:, 3].astype('int64')
+        })
+
+    def grid(self, club: str, period: str, comparison: str) -> Optional[List[ServiceDelta]]:
+        position = self._position(club, period)
+        if position is None or comparison not in self.manifest['comparisons']:
+            return None
+        values = self.arrays['grid'][position + (self.manifest['comparisons'].index(comparison),)]
+        deltas = []
+        for metric_id, row in zip(self.manifest['metric_ids'], values.tolist()):
+            if np.isnan(row[GRID_FIELDS.index('current_n')]):
+                continue
+            fields = dict(zip(GRID_FIELDS, row))
+            fields['current_n'], fields['previous_n'] = int(fields['current_n']), int(fields['previous_n'])
+            deltas.append(ServiceDelta(metric=METRICS_BY_ID[metric_id], **fields))
+        return deltas
+
+
+def load_snapshot(path: Optional[str]) -> Optional[Snapshot]:
+    """
+    Ouvre l'instantané s'il existe (None si absent ou illisible : calcul à la demande)
+    """
+    if not path or not Path(path).exists():
+        return None
+    try:
+        return Snapshot.open(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def source_rollups() -> Dict[str, DailyRollup]:
+    """
+    Agrégats du réseau et de chaque club pour la source configurée (export ingéré
+    dans le stockage SQLite, ou jeu de test), versionnés comme dans le tableau de bord
+    """
+    export_path = get_config('RESPONSES_EXPORT')
+    if export_path:
+        store = AggregateStore(get_config('AGGREGATE_STORE', 'data/nps_aggregates.sqlite'))
+        parquet_root = get_config('RESPONSES_PARQUET')
+        raw_store = ParquetResponseStore(parquet_root) if parquet_root else None
+        ingest_export(store, export_path, raw_store=raw_store)
+        network = store.load_rollup()
+        rollups = {
+            club: replace(store.load_rollup([club]), version=club_version(network.version, club))
+            for club in store.clubs()
+        }
+    else:
+        df = normalize_responses(generate_responses(**TEST_DATASET))
+        version = dataset_fingerprint(df)
+        network = build_daily_rollup(df, version=version)
+        rollups = build_club_rollups(df, version)
+    return {NETWORK_LABEL: network, **rollups}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Précalcule l'instantané du tableau de bord NPS")
+    parser.add_argument('--output', help="Fichier de l'instantané (SNAPSHOT_PATH par défaut)")
+    parser.add_argument('--as-of', help="Date de référence (AAAA-MM-JJ) ; aujourd'hui par défaut")
+    parser.add_argument('--config', default=CONFIG_FILE, help="Fichier de configuration enregistré")
+    args = parser.parse_args()
+
+    use_config(ConfigStore(args.config))
+    output = args.output or get_config('SNAPSHOT_PATH', 'data/nps_snapshot.bin')
+    snapshot = write_snapshot(output, source_rollups(), as_of=args.as_of or get_config('AS_OF'))
+    print(f"{output} : {len(snapshot.clubs)} clubs (réseau compris) au {snapshot.as_of:%Y-%m-%d}, "
+          f"{Path(output).stat().st_size / 1024:.0f} Kio")
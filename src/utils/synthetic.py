@@ -0,0 +1,237 @@
+# src/utils/synthetic.py
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from utils.schema import SEGMENTS_BY_COLUMN, SERVICE_METRICS, nps_category
+
+# Distribution des notes NPS (0 à 10)
+NPS_PROBABILITIES = [0.01, 0.02, 0.02, 0.03, 0.04, 0.05, 0.13, 0.15, 0.20, 0.18, 0.17]
+
+# Notes possibles par métrique de service (tirage uniforme sauf probabilités fournies)
+DEFAULT_SCORE_CHOICES = {
+    'ambiance': [3, 4, 5],
+    'proprete': [3, 4, 5],
+    'salle_sport': [3, 4, 5],
+    'piscine': [3, 4, 5],
+    'equipements': [3, 4, 5],
+    'vestiaires': [2, 3, 4],
+    'coachs': [4, 5],
+    'maitres_nageurs': [3, 4, 5],
+    'accueil': [3, 4, 5],
+    'commercial': [3, 4, 5],
+    'coaching_groupe': [3, 4, 5],
+    'planning': [2, 3, 4],
+    'restauration': [3, 4, 5],
+    'evenements': [3, 4, 5]
+}
+
+DEFAULT_CLUBS = ['Club principal']
+
+# Répartition des répondants entre les valeurs de chaque attribut de segmentation (ordre du registre)
+DEFAULT_SEGMENT_PROBABILITIES = {
+    'Abonnement': [0.45, 0.35, 0.1, 0.1],
+    'Anciennete': [0.3, 0.45, 0.25],
+    'Tranche_Age': [0.2, 0.3, 0.3, 0.2]
+}
+
+# Jeu de test du tableau de bord : 3 clubs, 3 mois, entre 3 et 8 réponses par jour
+TEST_DATASET = {
+    'clubs': ['Club A', 'Club B', 'Club C'],
+    'days': 90,
+    'responses_per_day': (3, 8),
+    'seed': 42
+}
+
+
+def _date_span(start: Optional[pd.Timestamp], end: Optional[pd.Timestamp], days: int) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    end = pd.Timestamp.now().normalize() if end is None else pd.Timestamp(end).normalize()
+    start = end - pd.Timedelta(days=days) if start is None else pd.Timestamp(start).normalize()
+    return start, end
+
+
+def _draw_timestamps(rng: np.random.Generator, start: pd.Timestamp, end: pd.Timestamp,
+                     n_responses: Optional[int], responses_per_day: Tuple[int, int]) -> np.ndarray:
+    """
+    Horodatages triés : n_responses tirés uniformément sur la plage,
+    ou sinon entre min et max réponses pour chaque jour
+    """
+    n_days = max((end - start).days + 1, 1)
+    if n_responses is None:
+        low, high = responses_per_day
+        per_day = rng.integers(low, high + 1, size=n_days)
+        day_offsets = np.repeat(np.arange(n_days, dtype=np.int64), per_day)
+        # Jours déjà consécutifs : le tri ne réordonne que les heures de chaque jour
+        seconds = np.sort(day_offsets * 86400 + rng.integers(0, 86400, size=len(day_offsets)))
+    else:
+        seconds = np.sort(rng.integers(0, n_days * 86400, size=n_responses))
+    return start.to_datetime64().astype('datetime64[s]') + seconds.astype('timedelta64[s]')
+
+
+def generate_responses(
+    n_responses: Optional[int] = None,
+    clubs: Sequence[str] = DEFAULT_CLUBS,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    days: int = 90,
+    responses_per_day: Tuple[int, int] = (3, 8),
+    missing_rate: float = 0.0,
+    nps_probabilities: Sequence[float] = NPS_PROBABILITIES,
+    score_choices: Optional[Dict[str, List[int]]] = None,
+    score_probabilities: Optional[Dict[str, Sequence[float]]] = None,
+    missing_rates: Optional[Dict[str, float]] = None,
+    club_weights: Optional[Sequence[float]] = None,
+    segment_probabilities: Optional[Dict[str, Sequence[float]]] = None,
+    seed: int = 42
+) -> pd.DataFrame:
+    """
+    Génère un jeu de réponses synthétique, reproductible et entièrement vectorisé,
+    directement au schéma canonique (identifiants courts, int8 / Int8, catégories).
+    Par métrique de service : notes possibles (score_choices), probabilités de ces notes
+    (score_probabilities, uniformes par défaut) et taux de non-réponse (missing_rates,
+    missing_rate par défaut).
+    """
+    rng = np.random.default_rng(seed)
+    score_choices = DEFAULT_SCORE_CHOICES if score_choices is None else score_choices
+    score_probabilities = score_probabilities or {}
+    missing_rates = missing_rates or {}
+    start, end = _date_span(start, end, days)
+
+    timestamps = _draw_timestamps(rng, start, end, n_responses, responses_per_day)
+    n_samples = len(timestamps)
+
+    nps_scores = rng.choice(np.arange(0, 11, dtype=np.int8), size=n_samples, p=nps_probabilities)
+    df = pd.DataFrame({
+        'Horodateur': pd.to_datetime(timestamps),
+        'Club': pd.Categorical.from_codes(
+            rng.choice(len(clubs), size=n_samples, p=club_weights),
+            categories=list(clubs)
+        ),
+        'NPS_Score': nps_scores
+    })
+
+    for metric in SERVICE_METRICS:
+        choices = score_choices.get(metric.metric_id)
+        if choices is None:
+            continue
+        values = rng.choice(np.asarray(choices, dtype=np.int8), size=n_samples, p=score_probabilities.get(metric.metric_id))
+        rate = missing_rates.get(metric.metric_id, missing_rate)
+        missing = rng.random(n_samples) < rate if rate > 0 else np.zeros(n_samples, dtype=bool)
+        df[metric.metric_id] = pd.arrays.IntegerArray(values, missing)
+
+    df['NPS_Category'] = nps_category(df['NPS_Score'])
+
+    # Attributs des répondants, tirés en dernier : notes inchangées pour une même graine
+    if segment_probabilities is None:
+        segment_probabilities = DEFAULT_SEGMENT_PROBABILITIES
+    for column, probabilities in segment_probabilities.items():
+        values = list(SEGMENTS_BY_COLUMN[column].values)
+        df[column] = pd.Categorical.from_codes(rng.choice(len(values), size=n_samples, p=probabilities), categories=values)
+    return df
+
+
+def write_responses(
+    path: str,
+    n_responses: int,
+    chunk_size: int = 1_000_000,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    days: int = 365,
+    seed: int = 42,
+    **kwargs
+) -> Path:
+    """
+    Écrit un jeu synthétique volumineux sur disque par blocs (CSV ou Parquet selon
+    l'extension) sans jamais le matérialiser entièrement en mémoire.
+    Chaque bloc couvre des jours entiers contigus de la plage, avec un nombre de réponses
+    proportionnel à ses jours : il y a donc au plus un bloc par jour (blocs plus gros que
+    chunk_size si la plage compte moins de jours que de blocs nécessaires).
+    """
+    path = Path(path)
+    start, end = _date_span(start, end, days)
+    n_days = (end - start).days + 1
+    n_chunks = min(max(1, -(-n_responses // chunk_size)), n_days)
+    # Premier jour (décalage) de chaque bloc, et réponses réparties au prorata des jours
+    day_bounds = np.arange(n_chunks + 1) * n_days // n_chunks
+    row_bounds = day_bounds * n_responses // n_days
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    writer = None
+    try:
+        for i in range(n_chunks):
+            chunk = generate_responses(
+                n_responses=int(row_bounds[i + 1] - row_bounds[i]),
+                start=start + pd.Timedelta(days=int(day_bounds[i])),
+                end=start + pd.Timedelta(days=int(day_bounds[i + 1]) - 1),
+                seed=int(seeds[i].generate_state(1)[0]),
+                **kwargs
+            )
+            if path.suffix == '.parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+def parse_score_distribution(spec: str) -> Tuple[str, List[int], List[float]]:
+    """
+    Distribution des notes d'un service en ligne de commande : 'vestiaires=1:0.1,2:0.3,3:0.6'
+    """
+    metric_id, _, pairs = spec.partition('=')
+    try:
+        notes, probabilities = zip(*(pair.split(':') for pair in pairs.split(',')))
+        return metric_id.strip(), [int(n) for n in notes], [float(p) for p in probabilities]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Distribution invalide : {spec} (attendu : service=note:proba,...)")
+
+
+def parse_missing_rate(spec: str) -> Tuple[str, float]:
+    """
+    Taux de non-réponse d'un service en ligne de commande : 'restauration=0.4'
+    """
+    metric_id, _, rate = spec.partition('=')
+    try:
+        return metric_id.strip(), float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Taux invalide : {spec} (attendu : service=taux)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Génère un jeu de réponses NPS synthétique")
+    parser.add_argument('output', help="Fichier de sortie (.csv ou .parquet)")
+    parser.add_argument('--rows', type=int, default=10_000, help="Nombre de réponses")
+    parser.add_argument('--clubs', type=int, default=1, help="Nombre de clubs")
+    parser.add_argument('--days', type=int, default=365, help="Nombre de jours couverts")
+    parser.add_argument('--missing-rate', type=float, default=0.0, help="Taux de questions sans réponse")
+    parser.add_argument('--service-missing-rate', type=parse_missing_rate, action='append', default=[],
+                        metavar='SERVICE=TAUX', help="Taux de non-réponse d'un service (répétable)")
+    parser.add_argument('--scores', type=parse_score_distribution, action='append', default=[],
+                        metavar='SERVICE=NOTE:PROBA,...', help="Notes et probabilités d'un service (répétable)")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help="Réponses par bloc écrit")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    unknown = {m for m, *_ in args.scores + args.service_missing_rate} - set(DEFAULT_SCORE_CHOICES)
+    if unknown:
+        parser.error(f"Services inconnus : {', '.join(sorted(unknown))}")
+    write_responses(
+        args.output,
+        n_responses=args.rows,
+        chunk_size=args.chunk_size,
+        days=args.days,
+        seed=args.seed,
+        clubs=[f"Club {i + 1}" for i in range(args.clubs)],
+        missing_rate=args.missing_rate,
+        score_choices={**DEFAULT_SCORE_CHOICES, **{m: notes for m, notes, _ in args.scores}},
+        score_probabilities={m: probabilities for m, _, probabilities in args.scores},
+        missing_rates=dict(args.service_missing_rate)
+    )
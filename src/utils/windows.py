@@ -0,0 +1,64 @@
+# src/utils/windows.py
+import pandas as pd
+from typing import Optional, Tuple
+
+
+def parse_period_days(period: str) -> int:
+    """
+    Nombre de jours d'un code période ('28D', '365D', ...)
+    """
+    return int(pd.Timedelta(period).days)
+
+
+def period_window(period: str, end_date: Optional[pd.Timestamp] = None) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Bornes (début, fin) de la période se terminant à end_date (maintenant par défaut),
+    au jour près : (end_date - période, end_date], soit exactement autant de jours
+    calendaires que la période ('28D' : le jour de end_date et les 27 précédents).
+    Le début est le premier de ces jours à minuit, à utiliser avec closed='both'.
+    """
+    end_date = pd.Timestamp.now() if end_date is None else pd.Timestamp(end_date)
+    return end_date.normalize() - pd.Timedelta(days=parse_period_days(period) - 1), end_date
+
+
+def as_of_day(as_of=None) -> pd.Timestamp:
+    """
+    Jour de référence des calculs (aujourd'hui par défaut), ramené à minuit :
+    les fenêtres journalières ne dépendent alors plus de l'heure d'exécution
+    """
+    return (pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)).normalize()
+
+
+def day_end(day: pd.Timestamp) -> pd.Timestamp:
+    """
+    Dernier instant du jour (borne de fin des lectures de réponses horodatées)
+    """
+    return pd.Timestamp(day).normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+
+
+def ensure_sorted(df: pd.DataFrame, column: str = 'Horodateur') -> pd.DataFrame:
+    """
+    Garantit un tri chronologique (stable) sur la colonne de temps
+    """
+    if df[column].is_monotonic_increasing:
+        return df
+    return df.sort_values(column, kind='stable', ignore_index=True)
+
+
+def window_positions(frame: pd.DataFrame, start, end, column: Optional[str] = None, closed: str = 'both') -> Tuple[int, int]:
+    """
+    Positions [lo, hi) de la fenêtre par recherche dichotomique (O(log n)).
+    La colonne (ou l'index si column est None) doit être triée.
+    """
+    values = frame.index if column is None else frame[column]
+    lo = values.searchsorted(pd.Timestamp(start), side='left' if closed in ('both', 'left') else 'right')
+    hi = values.searchsorted(pd.Timestamp(end), side='right' if closed in ('both', 'right') else 'left')
+    return int(lo), int(max(lo, hi))
+
+
+def window_slice(frame: pd.DataFrame, start, end, column: Optional[str] = None, closed: str = 'both') -> pd.DataFrame:
+    """
+    Tranche positionnelle (sans copie) des lignes comprises dans la fenêtre
+    """
+    lo, hi = window_positions(frame, start, end, column=column, closed=closed)
+    return frame.iloc[lo:hi]
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# Les modules de l'application s'importent depuis src (comme avec streamlit run src/main.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
@@ -0,0 +1,69 @@
+# tests/test_anomalies.py
+from pathlib import Path
+import pandas as pd
+import pytest
+from utils.anomalies import (
+    AnomalyParameters,
+    DetectorState,
+    average_run_length,
+    default_state_path,
+    family_threshold,
+    run_detection,
+    update_detector
+)
+from utils.rollup import build_club_rollups
+from utils.schema import normalize_responses
+from utils.synthetic import generate_responses
+
+CLUBS = ['Club A', 'Club B', 'Club C']
+
+
+@pytest.fixture(scope='module')
+def stationary() -> pd.DataFrame:
+    # Réponses indépendantes et de même loi tous les jours : aucune baisse à signaler
+    return normalize_responses(generate_responses(clubs=CLUBS, days=365, responses_per_day=(20, 60), seed=7))
+
+
+@pytest.fixture(scope='module')
+def dropped(stationary) -> pd.DataFrame:
+    # Vestiaires du Club B notés un point plus bas à partir du 200e jour
+    df = stationary.copy()
+    change = df['Horodateur'].min().normalize() + pd.Timedelta(days=200)
+    df.loc[(df['Club'] == 'Club B') & (df['Horodateur'] >= change) & (df['vestiaires'] > 1), 'vestiaires'] -= 1
+    return df
+
+
+def detect(df: pd.DataFrame):
+    return update_detector(DetectorState.empty('test'), build_club_rollups(df, 'v'), df['Horodateur'].max(),
+                           AnomalyParameters())
+
+
+def test_family_threshold_scales_the_run_length():
+    threshold = family_threshold(0.5, 5.0, 14)
+    assert threshold > 5.0
+    assert average_run_length(0.5, threshold) == pytest.approx(14 * average_run_length(0.5, 5.0))
+    assert family_threshold(0.5, 5.0, 1) == 5.0
+
+
+def test_no_alert_on_stationary_series(stationary):
+    assert detect(stationary) == []
+
+
+def test_service_drop_is_still_detected(dropped):
+    change = dropped['Horodateur'].min().normalize() + pd.Timedelta(days=200)
+    alerts = [a for a in detect(dropped) if a.metric_id == 'vestiaires']
+    assert [a.club for a in alerts] == ['Club B']
+    assert change <= pd.Timestamp(alerts[0].day) <= change + pd.Timedelta(days=7)
+
+
+def test_log_without_state_path_is_not_replayed(dropped, tmp_path):
+    rollups = build_club_rollups(dropped, 'v')
+    log_path = tmp_path / 'alerts.jsonl'
+
+    through = dropped['Horodateur'].max()
+    first = run_detection('test', CLUBS, lambda club, start: rollups[club], through, log_path=str(log_path))
+    again = run_detection('test', CLUBS, lambda club, start: rollups[club], through, log_path=str(log_path))
+
+    assert first and again == []
+    assert len(log_path.read_text(encoding='utf-8').splitlines()) == len(first)
+    assert Path(default_state_path(str(log_path))).exists()
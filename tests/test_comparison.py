@@ -0,0 +1,33 @@
+# tests/test_comparison.py
+import numpy as np
+import pandas as pd
+import pytest
+from utils.comparison import COMPARISON_MODES, compare_service_metrics
+from utils.rollup import DailyRollup
+
+AS_OF = pd.Timestamp('2026-06-15')
+
+
+def daily_rollup(days: pd.DatetimeIndex) -> DailyRollup:
+    # Une réponse notée 1 par jour : les effectifs comptent les jours de chaque fenêtre
+    ones = pd.DataFrame({'accueil': np.ones(len(days), dtype='int64')}, index=pd.DatetimeIndex(days, name='Date'))
+    counts = pd.DataFrame(
+        {'total': 1, 'promoteurs': 1, 'passifs': 0, 'detracteurs': 0}, index=ones.index, dtype='int64'
+    )
+    return DailyRollup(counts=counts, score_sums=ones, score_counts=ones, score_sumsq=ones)
+
+
+@pytest.mark.parametrize('mode', list(COMPARISON_MODES))
+@pytest.mark.parametrize('period', ['28D', '56D', '120D', '365D'])
+def test_windows_are_disjoint_and_of_equal_length(mode, period):
+    windows = COMPARISON_MODES[mode](period, AS_OF)
+    days = (windows.current_end - windows.current_start).days
+
+    assert windows.previous_end - windows.previous_start == windows.current_end - windows.current_start
+    assert windows.previous_end <= windows.current_start
+    assert windows.current_end == AS_OF + pd.Timedelta(days=1)
+    assert days in (int(period[:-1]), int(period[:-1]) // 2)
+
+    rollup = daily_rollup(pd.date_range(AS_OF - pd.Timedelta(days=800), AS_OF, freq='D'))
+    result = compare_service_metrics(rollup, windows).loc['accueil']
+    assert result['current_n'] == result['previous_n'] == days
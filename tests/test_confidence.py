@@ -0,0 +1,21 @@
+# tests/test_confidence.py
+import numpy as np
+from utils.confidence import nps_intervals_analytic, nps_intervals_bootstrap
+
+
+def test_bootstrap_resamples_observed_shares():
+    promoters, passives, detractors = np.array([30, 5, 0]), np.array([10, 0, 0]), np.array([10, 0, 0])
+    low, high = nps_intervals_bootstrap(promoters, passives, detractors, n_resamples=4000)
+
+    # Centré sur le NPS observé (40), pas sur celui des proportions ajustées
+    assert abs((low[0] + high[0]) / 2 - 40) < 3
+    # Réponses toutes identiques : aucune variabilité à rééchantillonner
+    assert low[1] == high[1] == 100
+    assert np.isnan(low[2]) and np.isnan(high[2])
+
+
+def test_bootstrap_agrees_with_analytic_on_large_samples():
+    counts = (np.array([600]), np.array([250]), np.array([150]))
+    boot_low, boot_high = nps_intervals_bootstrap(*counts, n_resamples=4000)
+    low, high = nps_intervals_analytic(*counts)
+    assert abs(boot_low[0] - low[0]) < 1 and abs(boot_high[0] - high[0]) < 1
@@ -0,0 +1,63 @@
+# tests/test_config.py
+import json
+import multiprocessing
+from pathlib import Path
+from typing import List
+import pytest
+from main import invalidate_dependents
+from utils.cache import LRUCache
+from utils.config import ConfigStore
+
+KEYS = [f"KEY_{i}" for i in range(40)]
+
+
+def test_legacy_threshold_is_ignored_then_dropped(tmp_path):
+    path = tmp_path / 'dashboard_config.json'
+    # Ancien seuil : nombre minimum de réponses, sans rapport avec une largeur d'intervalle
+    path.write_text(json.dumps({'NPS_THRESHOLD': 10}), encoding='utf-8')
+
+    store = ConfigStore(str(path))
+    assert store.get('NPS_MAX_CI_WIDTH') == 50
+    assert 'NPS_THRESHOLD' not in store.values
+
+    store.update('NPS_MAX_CI_WIDTH', 30)
+    assert json.loads(path.read_text(encoding='utf-8')) == {'NPS_MAX_CI_WIDTH': 30}
+    assert ConfigStore(str(path)).get('NPS_MAX_CI_WIDTH') == 30
+
+
+def save_keys(path: str, keys: List[str]):
+    # Session d'un autre processus : chaque clé modifiée est enregistrée aussitôt
+    store = ConfigStore(path, defaults={key: 0 for key in KEYS})
+    for key in keys:
+        store.values[key] = 1
+        store.save(key)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="processus créés par fork")
+def test_concurrent_saves_keep_every_key(tmp_path):
+    path = str(tmp_path / 'dashboard_config.json')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=save_keys, args=(path, KEYS[i::2])) for i in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    assert json.loads(Path(path).read_text(encoding='utf-8')) == {key: 1 for key in KEYS}
+
+
+def test_threshold_change_invalidates_only_flags_and_spec():
+    store, cache = ConfigStore(), LRUCache(max_entries=32)
+    store.subscribe('cache', lambda change: invalidate_dependents(cache, change))
+    kinds = ['dataset', 'metrics', 'trend', 'trend_flags', 'trend_spec', 'rolling', 'grid']
+    for kind in kinds:
+        cache.set((kind, 'v1'), kind)
+
+    store.update('NPS_MAX_CI_WIDTH', 30)
+    assert [kind for kind in kinds if (kind, 'v1') in cache] == ['dataset', 'metrics', 'trend', 'rolling', 'grid']
+
+    # Valeur inchangée : aucune notification
+    cache.set(('trend_flags', 'v1'), 'trend_flags')
+    assert store.update('NPS_MAX_CI_WIDTH', 30) is None
+    assert ('trend_flags', 'v1') in cache
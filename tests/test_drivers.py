@@ -0,0 +1,27 @@
+# tests/test_drivers.py
+import pandas as pd
+import pytest
+from utils.drivers import compute_driver_analysis
+from utils.metrics import calculate_nps_metrics
+from utils.network import NETWORK_LABEL
+from utils.rollup import build_daily_rollup
+from utils.schema import normalize_responses
+from utils.synthetic import TEST_DATASET, generate_responses
+from utils.windows import day_end
+
+PERIODS = ['28D', '56D', '120D', '365D']
+
+
+@pytest.fixture(scope='module')
+def responses() -> pd.DataFrame:
+    return normalize_responses(generate_responses(**{**TEST_DATASET, 'days': 400}))
+
+
+def test_driver_windows_match_the_header(responses):
+    as_of = responses['Horodateur'].max().normalize() - pd.Timedelta(days=3)
+    analysis = compute_driver_analysis(responses, PERIODS, day_end(as_of))
+    rollup = build_daily_rollup(responses)
+
+    for period in PERIODS:
+        fit = analysis.fit[(analysis.fit['Club'] == NETWORK_LABEL) & (analysis.fit['Period'] == period)].iloc[0]
+        assert fit['n'] == calculate_nps_metrics(rollup, period, as_of=as_of).total_responses
@@ -0,0 +1,81 @@
+# tests/test_ingestion.py
+# Ingestion incrémentale d'un export : ajout, passage sans nouvelle ligne et export réécrit
+# doivent donner les mêmes agrégats que les réponses brutes, sans jamais compter deux fois.
+import csv
+import pandas as pd
+import pytest
+from utils.aggregate_store import AggregateStore
+from utils.ingestion import ingest_export
+from utils.rollup import build_daily_rollup
+from utils.schema import normalize_responses
+from utils.synthetic import generate_responses
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+ROLLUP_FRAMES = ['counts', 'score_sums', 'score_counts', 'score_sumsq']
+
+
+@pytest.fixture(scope='module')
+def responses() -> pd.DataFrame:
+    return generate_responses(n_responses=600, clubs=['Club A', 'Club B'], days=60, missing_rate=0.1)
+
+
+def write_export(path, rows: pd.DataFrame, mode: str = 'w'):
+    rows.to_csv(path, mode=mode, header=(mode == 'w'), index=False, date_format=DATE_FORMAT)
+
+
+def assert_store_matches(store: AggregateStore, rows: pd.DataFrame):
+    stored = store.load_rollup()
+    expected = build_daily_rollup(normalize_responses(rows))
+    for frame in ROLLUP_FRAMES:
+        pd.testing.assert_frame_equal(getattr(stored, frame), getattr(expected, frame),
+                                      check_dtype=False, check_index_type=False, check_names=False, check_freq=False)
+
+
+def test_append_then_noop(responses, tmp_path):
+    export, store = tmp_path / 'export.csv', AggregateStore(str(tmp_path / 'aggregates.sqlite'))
+    write_export(export, responses.iloc[:400])
+    assert ingest_export(store, str(export), date_format=DATE_FORMAT)['ingested'] == 400
+    assert_store_matches(store, responses.iloc[:400])
+
+    # Nouvelle ingestion sans ligne ajoutée : rien n'est compté
+    assert ingest_export(store, str(export), date_format=DATE_FORMAT)['ingested'] == 0
+    assert_store_matches(store, responses.iloc[:400])
+
+    # Lignes ajoutées en fin d'export : seules celles-ci sont lues
+    write_export(export, responses.iloc[400:], mode='a')
+    assert ingest_export(store, str(export), date_format=DATE_FORMAT)['ingested'] == 200
+    assert_store_matches(store, responses)
+
+
+def test_incomplete_last_line_waits_for_next_pass(responses, tmp_path):
+    export, store = tmp_path / 'export.csv', AggregateStore(str(tmp_path / 'aggregates.sqlite'))
+    write_export(export, responses.iloc[:300])
+    text = responses.iloc[300:301].to_csv(header=False, index=False, date_format=DATE_FORMAT)
+    with open(export, 'a', encoding='utf-8') as f:
+        f.write(text[:len(text) // 2])
+    assert ingest_export(store, str(export), date_format=DATE_FORMAT)['ingested'] == 300
+
+    with open(export, 'a', encoding='utf-8') as f:
+        f.write(text[len(text) // 2:])
+    assert ingest_export(store, str(export), date_format=DATE_FORMAT)['ingested'] == 1
+    assert_store_matches(store, responses.iloc[:301])
+
+
+@pytest.mark.parametrize('rewrite', ['reexported', 'truncated'])
+def test_rewritten_export_is_not_double_counted(responses, tmp_path, rewrite):
+    export, store = tmp_path / 'export.csv', AggregateStore(str(tmp_path / 'aggregates.sqlite'))
+    write_export(export, responses.iloc[:400])
+    ingest_export(store, str(export), date_format=DATE_FORMAT)
+
+    if rewrite == 'reexported':
+        # Réexport complet, valeurs entre guillemets : les octets ingérés ne correspondent plus
+        responses.iloc[:-100].to_csv(export, index=False, date_format=DATE_FORMAT, quoting=csv.QUOTE_ALL)
+        expected = pd.concat([responses.iloc[:400], responses.iloc[400:-100]])
+    else:
+        # Export remplacé par un fichier plus court contenant quelques réponses plus récentes
+        write_export(export, responses.iloc[500:520])
+        expected = pd.concat([responses.iloc[:400], responses.iloc[500:520]])
+
+    result = ingest_export(store, str(export), date_format=DATE_FORMAT)
+    assert result['ingested'] == len(expected) - 400
+    assert_store_matches(store, expected)
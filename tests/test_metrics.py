@@ -0,0 +1,112 @@
+# tests/test_metrics.py
+# Non-régression du regroupement vectorisé du graphique d'évolution : les résultats doivent
+# être identiques à ceux de l'implémentation d'origine (groupby sur les réponses brutes
+# avec des lambdas, table du graphique construite avec iterrows), conservée ici comme référence.
+import pandas as pd
+import pytest
+from utils.config import DEFAULT_CONFIG
+from utils.metrics import CHART_CATEGORIES, build_trend_chart_data, compute_rolling_nps, prepare_data_for_period
+from utils.rollup import build_daily_rollup
+from utils.schema import normalize_responses
+from utils.synthetic import TEST_DATASET, generate_responses
+from utils.windows import period_window
+
+# Colonnes produites par l'implémentation d'origine (la représentativité, depuis
+# fondée sur l'intervalle de confiance, est comparée via la table du graphique)
+REFERENCE_COLUMNS = ['Period_Start', 'total', 'promoteurs', 'passifs', 'detracteurs',
+                     'Display_Date', 'Sort_Key', 'NPS_Score']
+
+
+def reference_prepare_data_for_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['Horodateur'])
+    if period in ['28D', '56D']:
+        df['Period_Start'] = df['Date'].dt.to_period('W').dt.start_time
+        format_str = '%d %b'
+    else:
+        df['Period_Start'] = df['Date'].dt.to_period('M').dt.start_time
+        format_str = '%b %Y'
+
+    grouped = df.groupby('Period_Start').agg(
+        total=('NPS_Category', 'count'),
+        promoteurs=('NPS_Category', lambda x: sum(x == 'Promoteur')),
+        passifs=('NPS_Category', lambda x: sum(x == 'Passif')),
+        detracteurs=('NPS_Category', lambda x: sum(x == 'Détracteur'))
+    ).reset_index()
+
+    grouped['Display_Date'] = grouped['Period_Start'].dt.strftime(format_str)
+    grouped['Sort_Key'] = grouped['Period_Start'].dt.strftime('%Y-%m-%d')
+    grouped['NPS_Score'] = (grouped['promoteurs']/grouped['total'] * 100) - (grouped['detracteurs']/grouped['total'] * 100)
+    return grouped.sort_values('Period_Start')
+
+
+def reference_chart_data(agg_data: pd.DataFrame) -> pd.DataFrame:
+    chart_data = []
+    for _, row in agg_data.iterrows():
+        for cat, count in [
+            ('Détracteur', row['detracteurs']),
+            ('Passif', row['passifs']),
+            ('Promoteur', row['promoteurs'])
+        ]:
+            chart_data.append({
+                'Period': row['Display_Date'],
+                'Sort_Key': row['Sort_Key'],
+                'Catégorie': cat,
+                'Count': count,
+                'Total': row['total'],
+                'Est_Représentatif': row['Est_Representatif'],
+                'NPS': round(row['NPS_Score'], 1)
+            })
+    return pd.DataFrame(chart_data)
+
+
+@pytest.fixture(scope='module')
+def responses() -> pd.DataFrame:
+    # Même jeu que test_data() du tableau de bord
+    return normalize_responses(generate_responses(**TEST_DATASET))
+
+
+def period_responses(responses: pd.DataFrame, period: str) -> pd.DataFrame:
+    start_day, end_date = period_window(period, responses['Horodateur'].max())
+    return responses[responses['Horodateur'].between(start_day, end_date)]
+
+
+@pytest.mark.parametrize('period', list(DEFAULT_CONFIG['PERIODS'].values()))
+def test_prepare_data_for_period_matches_reference(responses, period):
+    window = period_responses(responses, period)
+    result = prepare_data_for_period(build_daily_rollup(window).counts, period)
+    expected = reference_prepare_data_for_period(window, period)
+
+    pd.testing.assert_frame_equal(
+        result[REFERENCE_COLUMNS].reset_index(drop=True),
+        expected[REFERENCE_COLUMNS].reset_index(drop=True)
+    )
+
+
+@pytest.mark.parametrize('period', list(DEFAULT_CONFIG['PERIODS'].values()))
+def test_build_trend_chart_data_matches_reference(responses, period):
+    agg_data = prepare_data_for_period(build_daily_rollup(period_responses(responses, period)).counts, period)
+    chart = build_trend_chart_data(agg_data)
+
+    # La table compacte garde les catégories en colonnes : dépliée, elle doit redonner la table d'origine
+    long = chart.melt(
+        id_vars=['Period', 'Sort_Key', 'Total', 'Est_Représentatif', 'NPS'],
+        value_vars=CHART_CATEGORIES, var_name='Catégorie', value_name='Count'
+    )
+    long['Catégorie'] = pd.Categorical(long['Catégorie'], categories=CHART_CATEGORIES)
+    long = long.sort_values(['Sort_Key', 'Catégorie'], kind='stable', ignore_index=True)
+    long['Catégorie'] = long['Catégorie'].astype(str)
+    expected = reference_chart_data(agg_data)
+
+    pd.testing.assert_frame_equal(long[expected.columns.tolist()], expected)
+
+
+def test_rolling_nps_stops_at_reference_day(responses):
+    as_of = responses['Horodateur'].max().normalize() - pd.Timedelta(days=30)
+    rolling = compute_rolling_nps(build_daily_rollup(responses), [7, 28], as_of)
+    assert rolling['Date'].max() == as_of
+
+    # Mêmes valeurs qu'avec les seules réponses antérieures à la date de référence
+    before = responses[responses['Horodateur'] < as_of + pd.Timedelta(days=1)]
+    expected = compute_rolling_nps(build_daily_rollup(before), [7, 28], as_of)
+    pd.testing.assert_frame_equal(rolling, expected)
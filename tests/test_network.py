@@ -0,0 +1,19 @@
+# tests/test_network.py
+import os
+from concurrent.futures import wait
+from utils.network import NetworkJob, get_executor
+
+
+def test_broken_pool_is_replaced_and_failed_job_reported():
+    executor = get_executor(1)
+    # Processus du pool tué en cours de calcul (comme par le noyau faute de mémoire)
+    job = NetworkJob('28D', {'Club A': executor.submit(os._exit, 1)})
+    wait(job.futures.values())
+
+    assert job.done() and job.failed()
+    replacement = get_executor(1)
+    assert replacement is not executor
+    retry = NetworkJob('28D', {'Club A': replacement.submit(abs, -2)})
+    wait(retry.futures.values(), timeout=60)
+    assert retry.done() and not retry.failed()
+    assert retry.futures['Club A'].result() == 2
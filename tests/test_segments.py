@@ -0,0 +1,41 @@
+# tests/test_segments.py
+# L'agrégat d'une sélection lu dans l'index (comptages de bits par bloc) doit être
+# identique à celui des réponses brutes filtrées.
+import pandas as pd
+import pytest
+from utils.rollup import build_daily_rollup
+from utils.schema import normalize_responses
+from utils.segments import build_segment_index
+from utils.synthetic import generate_responses
+from utils.windows import ensure_sorted
+
+ROLLUP_FRAMES = ['counts', 'score_sums', 'score_counts', 'score_sumsq']
+
+
+@pytest.fixture(scope='module')
+def responses() -> pd.DataFrame:
+    df = generate_responses(n_responses=5000, clubs=['Club A', 'Club B', 'Club C'], days=120, missing_rate=0.2)
+    return ensure_sorted(normalize_responses(df)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'Club': ['Club B']},
+    {'Club': ['Club A', 'Club C'], 'Abonnement': ['Annuel']},
+    {'Club': ['Club inconnu']}
+])
+def test_selection_rollup_matches_filtered_responses(responses, filters):
+    index = build_segment_index(responses)
+    selection = index.select(filters)
+    mask = pd.Series(True, index=responses.index)
+    for attribute, values in filters.items():
+        mask &= responses[attribute].astype(str).isin(values)
+
+    assert index.count(selection) == int(mask.sum())
+    assert index.positions(selection).tolist() == responses.index[mask].tolist()
+
+    rollup = index.rollup(selection)
+    expected = build_daily_rollup(responses[mask])
+    for frame in ROLLUP_FRAMES:
+        pd.testing.assert_frame_equal(getattr(rollup, frame), getattr(expected, frame),
+                                      check_dtype=False, check_freq=False)
@@ -0,0 +1,59 @@
+# tests/test_shared_data.py
+import threading
+import pandas as pd
+from utils.shared_data import DatasetVersion
+
+DAYS = pd.date_range('2024-01-01', periods=30, freq='D')
+
+
+def test_dated_entries_stay_bounded():
+    data = DatasetVersion('v1', dated_entries=2)
+    data.derive(('rollups',), lambda: 'undated')
+    for day in DAYS:
+        assert data.derive(('network', '28D'), lambda: day, as_of=day) == day
+        data.derive(('network', '365D'), lambda: day, as_of=day)
+
+    # Deux dates au plus par famille, les entrées non datées sont conservées
+    assert sorted(data.derived_keys, key=str) == sorted([
+        ('rollups',),
+        ('network', '28D', DAYS[-2]), ('network', '28D', DAYS[-1]),
+        ('network', '365D', DAYS[-2]), ('network', '365D', DAYS[-1])
+    ], key=str)
+
+
+def test_eviction_follows_the_last_requested_dates():
+    data = DatasetVersion('v1', dated_entries=2)
+    calls = []
+
+    def compute(day):
+        calls.append(day)
+        return day
+
+    data.derive(('grid',), lambda: compute(DAYS[0]), as_of=DAYS[0])
+    data.derive(('grid',), lambda: compute(DAYS[1]), as_of=DAYS[1])
+    # Date la plus ancienne redemandée : c'est l'autre qui est libérée par la suivante
+    data.derive(('grid',), lambda: compute(DAYS[0]), as_of=DAYS[0])
+    data.derive(('grid',), lambda: compute(DAYS[2]), as_of=DAYS[2])
+    assert set(data.derived_keys) == {('grid', DAYS[0]), ('grid', DAYS[2])}
+
+    data.derive(('grid',), lambda: compute(DAYS[1]), as_of=DAYS[1])
+    assert calls == [DAYS[0], DAYS[1], DAYS[2], DAYS[1]]
+
+
+def test_date_evicted_during_computation_is_not_stored():
+    data = DatasetVersion('v1', dated_entries=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'stale'
+
+    worker = threading.Thread(target=lambda: data.derive(('trend',), slow, as_of=DAYS[0]))
+    worker.start()
+    started.wait(5)
+    data.derive(('trend',), lambda: 'fresh', as_of=DAYS[1])
+    release.set()
+    worker.join(5)
+
+    assert data.derived_keys == [('trend', DAYS[1])]
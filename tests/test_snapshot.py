@@ -0,0 +1,80 @@
+# tests/test_snapshot.py
+# Aller-retour de l'instantané binaire : chaque vue relue doit être identique
+# au calcul à la demande sur les mêmes agrégats et à la même date de référence.
+from dataclasses import asdict
+import pandas as pd
+import pytest
+from utils.cache import dataset_fingerprint
+from utils.comparison import COMPARISON_MODES
+from utils.config import DEFAULT_CONFIG
+from utils.metrics import calculate_nps_metrics, compute_rolling_nps, compute_service_grid, compute_trend_buckets
+from utils.network import NETWORK_LABEL
+from utils.rollup import build_club_rollups, build_daily_rollup
+from utils.schema import normalize_responses
+from utils.snapshot import SNAPSHOT_MAGIC, Snapshot, write_snapshot
+from utils.synthetic import TEST_DATASET, generate_responses
+
+PERIODS = list(DEFAULT_CONFIG['PERIODS'].values())
+WINDOWS = DEFAULT_CONFIG['ROLLING_WINDOWS']
+CONFIDENCE = (DEFAULT_CONFIG['CONFIDENCE_LEVEL'], DEFAULT_CONFIG['CI_METHOD'])
+
+
+@pytest.fixture(scope='module')
+def rollups():
+    df = normalize_responses(generate_responses(**TEST_DATASET))
+    version = dataset_fingerprint(df)
+    return {NETWORK_LABEL: build_daily_rollup(df, version=version), **build_club_rollups(df, version)}
+
+
+@pytest.fixture(scope='module')
+def as_of(rollups):
+    # Date de référence antérieure aux dernières réponses : les vues doivent s'y arrêter
+    return rollups[NETWORK_LABEL].counts.index.max() - pd.Timedelta(days=10)
+
+
+@pytest.fixture(scope='module')
+def snapshot(rollups, as_of, tmp_path_factory):
+    path = tmp_path_factory.mktemp('snapshot') / 'nps_snapshot.bin'
+    write_snapshot(str(path), rollups, as_of=as_of, periods=PERIODS)
+    return Snapshot.open(str(path))
+
+
+def test_manifest_and_coverage(snapshot, rollups, as_of):
+    with open(snapshot.path, 'rb') as f:
+        assert f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+    assert snapshot.clubs == list(rollups)
+    assert snapshot.as_of == as_of
+    for club, rollup in rollups.items():
+        assert snapshot.covers(club, rollup.version, as_of, CONFIDENCE)
+        assert not snapshot.covers(club, rollup.version, as_of + pd.Timedelta(days=1), CONFIDENCE)
+        assert not snapshot.covers(club, 'autre version', as_of, CONFIDENCE)
+    assert snapshot.rolling(NETWORK_LABEL, WINDOWS, as_of + pd.Timedelta(days=1)) is None
+
+
+@pytest.mark.parametrize('period', PERIODS)
+def test_header_and_trend_match_live_computation(snapshot, rollups, as_of, period):
+    for club, rollup in rollups.items():
+        assert snapshot.header(club, period) == calculate_nps_metrics(rollup, period, *CONFIDENCE, as_of=as_of)
+
+        stored = snapshot.trend(club, period)
+        live = compute_trend_buckets(rollup, period, level=CONFIDENCE[0], method=CONFIDENCE[1], as_of=as_of)
+        assert stored.frequency == live.frequency
+        pd.testing.assert_frame_equal(stored.table, live.table[stored.table.columns].reset_index(drop=True),
+                                      check_dtype=False)
+        pd.testing.assert_frame_equal(stored.services, live.services, check_dtype=False)
+
+
+@pytest.mark.parametrize('comparison', list(COMPARISON_MODES))
+def test_grid_matches_live_computation(snapshot, rollups, as_of, comparison):
+    for club, rollup in rollups.items():
+        for period in PERIODS:
+            stored = pd.DataFrame([asdict(d) for d in snapshot.grid(club, period, comparison)])
+            live = pd.DataFrame([asdict(d) for d in compute_service_grid(rollup, period, comparison, as_of=as_of)])
+            pd.testing.assert_frame_equal(stored, live, check_dtype=False)
+
+
+def test_rolling_matches_live_computation(snapshot, rollups, as_of):
+    for club, rollup in rollups.items():
+        stored = snapshot.rolling(club, WINDOWS, as_of)
+        assert stored['Date'].max() == as_of
+        pd.testing.assert_frame_equal(stored, compute_rolling_nps(rollup, WINDOWS, as_of), check_dtype=False)
@@ -0,0 +1,29 @@
+# tests/test_synthetic.py
+import pandas as pd
+from utils.synthetic import generate_responses, write_responses
+
+
+def test_per_service_distribution_and_missing_rate():
+    df = generate_responses(
+        n_responses=20_000,
+        score_choices={'vestiaires': [1, 5], 'piscine': [3, 4, 5]},
+        score_probabilities={'vestiaires': [0.8, 0.2]},
+        missing_rate=0.1,
+        missing_rates={'piscine': 0.5}
+    )
+    shares = df['vestiaires'].value_counts(normalize=True)
+    assert abs(shares[1] - 0.8) < 0.02 and abs(shares[5] - 0.2) < 0.02
+    assert abs(df['piscine'].isna().mean() - 0.5) < 0.02
+    assert abs(df['vestiaires'].isna().mean() - 0.1) < 0.02
+    assert 'ambiance' not in df.columns
+
+
+def test_chunks_never_outnumber_days(tmp_path):
+    # 50 blocs de 100 réponses demandés sur 4 jours : un bloc par jour, aucune réponse perdue
+    path = write_responses(str(tmp_path / 'responses.csv'), n_responses=5000, chunk_size=100,
+                           start='2024-03-01', end='2024-03-04')
+    df = pd.read_csv(path, parse_dates=['Horodateur'])
+    assert len(df) == 5000
+    assert df['Horodateur'].is_monotonic_increasing
+    assert df['Horodateur'].dt.normalize().value_counts().sort_index().index.tolist() == \
+        list(pd.date_range('2024-03-01', '2024-03-04'))
@@ -0,0 +1,17 @@
+# tests/test_windows.py
+import pandas as pd
+import pytest
+from utils.rollup import day_slice
+from utils.windows import period_window
+
+
+@pytest.mark.parametrize('period, days', [('28D', 28), ('56D', 56), ('120D', 120), ('365D', 365)])
+def test_period_window_covers_as_many_days_as_its_label(period, days):
+    daily = pd.DataFrame({'total': 1}, index=pd.date_range('2025-01-01', '2026-12-31', freq='D'))
+    as_of = pd.Timestamp('2026-06-15 14:30')
+    start, end = period_window(period, as_of)
+
+    window = day_slice(daily, start, end)
+    assert len(window) == days
+    assert window.index[-1] == as_of.normalize()
+    assert start == as_of.normalize() - pd.Timedelta(days=days - 1)